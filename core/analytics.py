@@ -0,0 +1,227 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Case, Value, When
+from django.db.models.functions import ExtractYear
+
+from .models import Customer, CustomerArchivedTotals, Loan, LoanArchive
+from .money import paise, sum_paise
+from .utils import (
+    ARCHIVED_LOAN_STATS, approved_in_year, credit_score_components_from_stats, credit_scores_from_stats,
+    scores_from_components
+)
+
+# Report cache: the full-book scan takes seconds, ops dashboards poll it
+REPORT_CACHE_KEY = 'portfolio-report'
+REPORT_CACHE_TIMEOUT = 300
+
+FETCH_CHUNK_SIZE = 20000
+
+# EMI-to-income buckets; 0.5 is where eligibility starts rejecting
+EMI_TO_INCOME_BINS = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, np.inf]
+SCORE_BINS = list(range(0, 101, 10))
+
+
+def _today():
+    return datetime.now().date()
+
+
+def customer_filter(field, id_range=None, customer_ids=None):
+    # Q for `low < field <= high` (either bound may be None, i.e. open-ended) and, when
+    # customer_ids is given, `field IN customer_ids`
+    low, high = id_range or (None, None)
+    condition = models.Q()
+    if low is not None:
+        condition &= models.Q(**{f'{field}__gt': low})
+    if high is not None:
+        condition &= models.Q(**{f'{field}__lte': high})
+    if customer_ids is not None:
+        condition &= models.Q(**{f'{field}__in': customer_ids})
+    return condition
+
+
+def load_customer_frame(id_range=None, customer_ids=None):
+    # One query: every customer's salary and limit (paise), indexed by customer_id
+    rows = Customer.objects.filter(customer_filter('customer_id', id_range, customer_ids)).order_by().annotate(
+        salary_paise=paise('monthly_salary'), limit_paise=paise('approved_limit'),
+    ).values_list('customer_id', 'salary_paise', 'limit_paise')
+    frame = pd.DataFrame.from_records(
+        rows.iterator(chunk_size=FETCH_CHUNK_SIZE), columns=['customer_id', 'monthly_salary', 'approved_limit'],
+    )
+    return frame.astype({'monthly_salary': np.int64, 'approved_limit': np.int64}).set_index('customer_id')
+
+
+def _flag(condition):
+    return Case(When(condition, then=Value(1)), default=Value(0))
+
+
+def load_loan_frame(today=None, id_range=None, customer_ids=None):
+    # One query: the scoring columns of every loan. Money comes as paise and the date tests
+    # (running today, approved this year) are plain range comparisons done by the database.
+    # `id_range` / `customer_ids` keep only the loans of those customers.
+    today = today or _today()
+    rows = Loan.objects.filter(customer_filter('customer_id', id_range, customer_ids)).order_by().annotate(
+        amount_paise=paise('loan_amount'),
+        emi_paise=paise('monthly_payment'),
+        is_active=_flag(models.Q(end_date__gte=today)),
+        is_current_year=_flag(approved_in_year(today.year)),
+    ).values_list('customer_id', 'amount_paise', 'tenure', 'emi_paise', 'emis_paid_on_time',
+                  'is_active', 'is_current_year')
+    frame = pd.DataFrame.from_records(
+        rows.iterator(chunk_size=FETCH_CHUNK_SIZE),
+        columns=['customer_id', 'loan_amount', 'tenure', 'monthly_payment', 'emis_paid_on_time',
+                 'active', 'current_year'],
+    )
+    return frame.astype({column: np.int64 for column in frame.columns if column != 'customer_id'})
+
+
+def load_archived_frame(id_range=None, customer_ids=None):
+    # One query: every customer's archived totals (see core.archive) under their stats names,
+    # volume in paise, indexed by customer_id
+    columns = list(ARCHIVED_LOAN_STATS)
+    rows = CustomerArchivedTotals.objects.filter(
+        customer_filter('customer_id', id_range, customer_ids)
+    ).order_by().values_list('customer_id', 'loan_count', 'tenure_sum', 'on_time_emi_sum', 'total_volume_paise')
+    frame = pd.DataFrame.from_records(rows.iterator(chunk_size=FETCH_CHUNK_SIZE), columns=['customer_id', *columns])
+    return frame.astype({column: np.int64 for column in columns}).set_index('customer_id')
+
+
+def load_vintage_frame():
+    # Two grouped queries (live and archived loans): loan count, volume (paise) and EMI totals
+    # per approval year
+    frames = []
+    for model in (Loan, LoanArchive):
+        rows = model.objects.annotate(year=ExtractYear('date_of_approval')).values('year').order_by().annotate(
+            loans=models.Count('pk'),
+            volume=sum_paise('loan_amount'),
+            tenure=models.Sum('tenure'),
+            paid_on_time=models.Sum('emis_paid_on_time'),
+        )
+        frames.append(pd.DataFrame.from_records(rows, columns=['year', 'loans', 'volume', 'tenure', 'paid_on_time']))
+    vintages = pd.concat(frames).astype(np.int64).groupby('year', as_index=False).sum()
+    return vintages.sort_values('year', ignore_index=True)
+
+
+def loan_stats_frame(customers, loans, archived=None):
+    # Per-customer scoring inputs (same meaning as loan_stats_aggregates), money in paise.
+    # `loans` must have been loaded for the same day; `archived` (load_archived_frame) adds
+    # the customers' archived loans.
+    active = loans['active'].astype(bool)
+    grouped = loans.assign(
+        active_amount=loans['loan_amount'].where(active, 0),
+        active_emi=loans['monthly_payment'].where(active, 0),
+    ).groupby('customer_id')
+    stats = pd.DataFrame({
+        'num_loans': grouped.size(),
+        'total_emis': grouped['tenure'].sum(),
+        'total_onschedule_emis': grouped['emis_paid_on_time'].sum(),
+        'approved_volume': grouped['loan_amount'].sum(),
+        'current_year_loans': grouped['current_year'].sum(),
+        'sum_current_loans': grouped['active_amount'].sum(),
+        'sum_current_emis': grouped['active_emi'].sum(),
+    })
+    # Customers without loans score on all-zero stats; loans of unknown customers are dropped
+    stats = stats.reindex(customers.index, fill_value=0).astype(np.int64)
+    if archived is not None:
+        columns = list(ARCHIVED_LOAN_STATS)
+        stats[columns] += archived.reindex(customers.index, fill_value=0)[columns]
+    return stats
+
+
+def score_customers(customers=None, loans=None, today=None, archived=None):
+    # Credit score of every customer (same result as calculate_credit_score), with their stats
+    customers = load_customer_frame() if customers is None else customers
+    loans = load_loan_frame(today) if loans is None else loans
+    archived = load_archived_frame() if archived is None else archived
+    stats = loan_stats_frame(customers, loans, archived)
+    stats['credit_score'] = credit_scores_from_stats(customers['approved_limit'].to_numpy(), stats)
+    return customers.join(stats)
+
+
+def score_components(customers, loans, archived):
+    # The five factors and the score of every customer in `customers`, indexed by customer_id
+    stats = loan_stats_frame(customers, loans, archived)
+    components = pd.DataFrame(
+        credit_score_components_from_stats(customers['approved_limit'].to_numpy(), stats), index=stats.index
+    )
+    components['credit_score'] = scores_from_components(components)
+    return components
+
+
+def _histogram(values, bins, labels):
+    counts, _ = np.histogram(values, bins=bins)
+    return [{"bucket": label, "customers": int(count)} for label, count in zip(labels, counts)]
+
+
+def portfolio_report(today=None):
+    # Book-level numbers for ops: outstanding, EMI burden, score distribution, vintage repayment
+    today = today or _today()
+    customers = load_customer_frame()
+    loans = load_loan_frame(today)
+    archived = load_archived_frame()
+    book = score_customers(customers, loans, today, archived)
+
+    salary = book['monthly_salary'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi_to_income = np.where(salary > 0, book['sum_current_emis'].to_numpy() / salary, np.inf)
+    borrowers = book['sum_current_emis'].to_numpy() > 0
+
+    vintages = load_vintage_frame()
+
+    scores = book['credit_score'].to_numpy()
+    return {
+        "as_of": today.isoformat(),
+        "customers": int(len(book)),
+        "loans": int(len(loans) + archived['num_loans'].sum()),
+        "total_outstanding": int(book['sum_current_loans'].sum()) / 100,
+        "total_monthly_emi": int(book['sum_current_emis'].sum()) / 100,
+        "over_limit_customers": int((book['sum_current_loans'] > book['approved_limit']).sum()),
+        "emi_to_income": {
+            "borrowers": int(borrowers.sum()),
+            "over_50_percent": int((emi_to_income[borrowers] > 0.5).sum()),
+            "percentiles": {
+                f"p{p}": round(float(np.percentile(emi_to_income[borrowers], p)), 4) if borrowers.any() else None
+                for p in (50, 90, 99)
+            },
+            "histogram": _histogram(
+                emi_to_income[borrowers], EMI_TO_INCOME_BINS,
+                [f"{low:.0%}-{high:.0%}" if np.isfinite(high) else f"{low:.0%}+"
+                 for low, high in zip(EMI_TO_INCOME_BINS, EMI_TO_INCOME_BINS[1:])]
+            ),
+        },
+        "credit_score": {
+            "mean": round(float(scores.mean()), 2) if len(scores) else None,
+            # Buckets of the interest-rate slabs used for approval
+            "slabs": {
+                "above_50": int((scores > 50).sum()),
+                "31_to_50": int(((scores > 30) & (scores <= 50)).sum()),
+                "11_to_30": int(((scores > 10) & (scores <= 30)).sum()),
+                "10_or_below": int((scores <= 10).sum()),
+            },
+            "histogram": _histogram(
+                scores, SCORE_BINS,
+                [f"{low}-{high - 1}" if high < 100 else f"{low}-{high}" for low, high in zip(SCORE_BINS, SCORE_BINS[1:])]
+            ),
+        },
+        "on_time_by_vintage": [
+            {
+                "year": int(row.year),
+                "loans": int(row.loans),
+                "volume": int(row.volume) / 100,
+                "on_time_ratio": round(int(row.paid_on_time) / int(row.tenure), 4) if row.tenure else None,
+            }
+            for row in vintages.itertuples(index=False)
+        ],
+    }
+
+
+def cached_portfolio_report():
+    # Report served from cache for up to REPORT_CACHE_TIMEOUT seconds
+    report = cache.get(REPORT_CACHE_KEY)
+    if report is None:
+        report = portfolio_report()
+        cache.set(REPORT_CACHE_KEY, report, timeout=REPORT_CACHE_TIMEOUT)
+    return report
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registers cache invalidation handlers for Customer and Loan writes
+        from . import signals  # noqa: F401
+
+        # Times the queries of instrumented requests on every connection opened from now on
+        from django.db.backends.signals import connection_created
+        from .instrumentation import install_query_timer
+        connection_created.connect(install_query_timer, dispatch_uid='core.install_query_timer')
@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+
+from .models import Customer, CustomerArchivedTotals, Loan, LoanArchive
+from .money import to_paise
+from .utils import ARCHIVED_LOAN_STATS
+
+# Loans moved per transaction
+ARCHIVE_BATCH_SIZE = 2000
+
+ARCHIVED_FIELDS = [
+    'loan_id', 'customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_payment',
+    'emis_paid_on_time', 'date_of_approval', 'end_date',
+]
+TOTALS_FIELDS = list(ARCHIVED_LOAN_STATS.values())
+
+
+def _today():
+    return datetime.now().date()
+
+
+def live_or_archived(fields, live_filter, archived_filter, using=None):
+    # values() rows of the matching Loan rows and then LoanArchive rows, each table in loan_id
+    # order, from one UNION ALL query; each row's 'archived' tells which table it came from
+    def rows(model, loan_filter, archived):
+        return (
+            model.objects.using(using).filter(loan_filter)
+            .values(*fields, archived=models.Value(archived, output_field=models.BooleanField()))
+        )
+
+    return (
+        rows(Loan, live_filter, False).union(rows(LoanArchive, archived_filter, True), all=True)
+        .order_by('archived', 'loan_id')
+    )
+
+
+def archivable(today, after_days):
+    # Loans that ended more than after_days ago and were approved before this year: on this
+    # and every later day they are neither running nor current-year activity, so only their
+    # count, tenure, on-time EMIs and volume still matter to the score
+    return models.Q(end_date__lt=today - timedelta(days=after_days), date_of_approval__lt=date(today.year, 1, 1))
+
+
+def archive_loans(today=None, after_days=None, batch_size=ARCHIVE_BATCH_SIZE):
+    # Moves archivable loans from Loan to LoanArchive and adds them to their customers'
+    # CustomerArchivedTotals, batch_size loans per transaction. Scores, summaries and cached
+    # profiles are unchanged (they count archived totals too), so nothing is invalidated.
+    # Returns the number of loans archived.
+    today = today or _today()
+    after_days = settings.LOAN_ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    condition = archivable(today, after_days)
+    archived = 0
+    while True:
+        with transaction.atomic():
+            loan_ids = list(Loan.objects.filter(condition).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not loan_ids:
+                return archived
+            customer_ids = set(Loan.objects.filter(pk__in=loan_ids).values_list('customer_id', flat=True))
+            # Same per-customer lock as create-loan and score snapshots, which then never see
+            # a loan in both tables or in neither
+            list(Customer.objects.select_for_update().filter(pk__in=customer_ids).order_by('pk').values_list('pk'))
+            rows = list(Loan.objects.filter(condition, pk__in=loan_ids).values(*ARCHIVED_FIELDS))
+
+            totals = {
+                row.customer_id: row
+                for row in CustomerArchivedTotals.objects.filter(customer_id__in=customer_ids)
+            }
+            for row in rows:
+                total = totals.setdefault(row['customer_id'], CustomerArchivedTotals(customer_id=row['customer_id']))
+                total.loan_count += 1
+                total.tenure_sum += row['tenure']
+                total.on_time_emi_sum += row['emis_paid_on_time']
+                total.total_volume_paise += to_paise(row['loan_amount'])
+
+            LoanArchive.objects.bulk_create([LoanArchive(archived_on=today, **row) for row in rows])
+            CustomerArchivedTotals.objects.bulk_create(
+                totals.values(), update_conflicts=True, unique_fields=['customer'], update_fields=TOTALS_FIELDS,
+            )
+            # Plain DELETE: the post_delete handlers would discard summaries and scores that
+            # archiving leaves valid
+            Loan.objects.filter(pk__in=[row['loan_id'] for row in rows])._raw_delete(Loan.objects.db)
+        archived += len(rows)
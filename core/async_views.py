@@ -0,0 +1,155 @@
+# Async (ASGI) versions of the eligibility, create-loan and view-loan endpoints.
+# They answer with the same payloads as the DRF views in views.py but never block
+# the event loop on the database, so one ASGI worker can keep many requests in flight.
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views import View
+from rest_framework import status
+
+from .archive import live_or_archived
+from .fast_serializers import (
+    LOAN_DETAIL_FIELDS, row_etag, serialize_loan_detail, validate_create_loan, validate_eligibility
+)
+from .instrumentation import serialization_timer
+from .loans import create_loan
+from .models import Customer, Loan
+from .pagination import STREAM_CONTENT_TYPE, aloan_lines, aloan_page, next_page_headers
+from .profiles import aget_credit_profile
+from .renderers import dumps
+from .routers import areplica_reads
+from .serializers import LoanPageSerializer
+from .utils import check_loan_eligibility
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    # Same bytes as the DRF views' FastJSONRenderer (orjson when installed)
+    with serialization_timer():
+        content = dumps(data)
+    return HttpResponse(content, status=status_code, content_type='application/json')
+
+
+def not_found(model):
+    return json_response(
+        {"detail": f"No {model._meta.object_name} matches the given query."},
+        status.HTTP_404_NOT_FOUND
+    )
+
+
+def parse_body(request):
+    # Returns (data, error_response) with DRF's parse error message
+    try:
+        return json.loads(request.body or b'{}'), None
+    except ValueError as exc:
+        return None, json_response({"detail": f"JSON parse error - {exc}"}, status.HTTP_400_BAD_REQUEST)
+
+
+# ----------------------- Async Check Loan Eligibility API -----------------------
+class AsyncCheckEligibilityView(View):
+    """
+    Async twin of CheckEligibilityAPIView.
+    """
+
+    query_budget = 6  # same as CheckEligibilityAPIView
+
+    async def post(self, request):
+        data, error = parse_body(request)
+        if error:
+            return error
+        data, errors = validate_eligibility(data)
+        if errors:
+            return json_response(errors, status.HTTP_400_BAD_REQUEST)
+
+        async with areplica_reads(customer_ids=[data.customer_id]):
+            profile = await aget_credit_profile(data.customer_id)
+        if profile is None:
+            return not_found(Customer)
+
+        response_data = check_loan_eligibility(
+            profile.customer, profile.stats, data.loan_amount, data.interest_rate, data.tenure,
+            profile.credit_score
+        )
+        return json_response(response_data)
+
+
+# ----------------------- Async Create New Loan API -----------------------
+class AsyncCreateLoanView(View):
+    """
+    Async twin of CreateLoanAPIView.
+    The locked check-and-insert needs a transaction, which the async ORM can't hold,
+    so it runs in a worker thread while the event loop keeps serving other requests.
+    """
+
+    query_budget = 13  # same as CreateLoanAPIView
+
+    async def post(self, request):
+        data, error = parse_body(request)
+        if error:
+            return error
+        data, errors = validate_create_loan(data)
+        if errors:
+            return json_response(errors, status.HTTP_400_BAD_REQUEST)
+
+        try:
+            response_data, response_status = await sync_to_async(create_loan)(
+                data.customer_id, data.loan_amount, data.interest_rate, data.tenure
+            )
+        except Customer.DoesNotExist:
+            return not_found(Customer)
+        return json_response(response_data, response_status)
+
+
+# ----------------------- Async View Loan By Loan ID API -----------------------
+class AsyncViewLoanView(View):
+    """
+    Async twin of ViewLoanAPIView (one joined values() query, ETag / If-None-Match).
+    """
+
+    query_budget = 1  # the joined loan and customer query
+
+    async def get(self, request, loan_id):
+        loan = Q(loan_id=loan_id)
+        async with areplica_reads(loan_ids=[loan_id]):
+            row = await anext(aiter(live_or_archived(LOAN_DETAIL_FIELDS, loan, loan)[:1]), None)
+        if row is None:
+            return not_found(Loan)
+
+        etag = quote_etag(row_etag(row))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = json_response(serialize_loan_detail(row))
+        response["ETag"] = etag
+        return response
+
+
+# ----------------------- Async View All Loans for a Customer API -----------------------
+class AsyncViewLoansByCustomerView(View):
+    """
+    Async twin of ViewLoansByCustomerAPIView, with the same keyset pages and JSON-lines stream.
+    """
+
+    query_budget = 2  # customer check + one page
+
+    async def get(self, request, customer_id):
+        params = LoanPageSerializer(data=request.GET)
+        if not params.is_valid():
+            return json_response(params.errors, status.HTTP_400_BAD_REQUEST)
+        cursor = params.validated_data.get('cursor')
+        async with areplica_reads(customer_ids=[customer_id]) as using:
+            if not await Customer.objects.filter(customer_id=customer_id).aexists():
+                return not_found(Customer)
+
+            if params.validated_data['stream']:
+                return StreamingHttpResponse(
+                    aloan_lines(customer_id, cursor, using), content_type=STREAM_CONTENT_TYPE
+                )
+
+            results, next_cursor = await aloan_page(customer_id, cursor, params.validated_data['limit'])
+        response = json_response(results)
+        for header, value in next_page_headers(request, next_cursor).items():
+            response[header] = value
+        return response
@@ -0,0 +1,301 @@
+import decimal
+import hashlib
+import re
+from operator import attrgetter, itemgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .serializers import CheckEligibilitySerializer, CreateLoanSerializer, CustomerRegisterSerializer
+
+
+# ----------------------- Output: precompiled row/instance serializers -----------------------
+
+def compile_serializer(spec, getter=itemgetter):
+    # Builds a row -> dict function from {output key: (source, converter or None) or nested spec}.
+    # Sources are values() keys (getter=itemgetter), attribute names (getter=attrgetter) or callables.
+    # Lookups and converters are resolved once here instead of per field per request like DRF does;
+    # None is passed through unconverted, as DRF does.
+    steps = []
+    for key, source in spec.items():
+        if isinstance(source, dict):
+            steps.append((key, compile_serializer(source, getter)))
+            continue
+        field, convert = source
+        get = field if callable(field) else getter(field)
+        if convert is None:
+            steps.append((key, get))
+        else:
+            steps.append((key, lambda row, get=get, convert=convert: (
+                None if (value := get(row)) is None else convert(value)
+            )))
+    return lambda row: {key: step(row) for key, step in steps}
+
+
+def spec_fields(spec):
+    # The values() field names a spec reads, in order
+    fields = []
+    for source in spec.values():
+        fields.extend(spec_fields(source) if isinstance(source, dict) else [source[0]])
+    return tuple(fields)
+
+
+def row_etag(row):
+    # Strong validator for a values() row: changes whenever any selected column changes
+    return hashlib.md5(repr(tuple(row.values())).encode()).hexdigest()
+
+
+def decimal_string(max_digits, decimal_places):
+    # DecimalField.to_representation with COERCE_DECIMAL_TO_STRING (the DRF default)
+    quantum = decimal.Decimal('.1') ** decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = max_digits
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(quantum, context=context))
+    return convert
+
+
+# view-loan: loan and customer columns from a single joined values() query
+LOAN_DETAIL_SPEC = {
+    "loan_id": ('loan_id', None),
+    "customer": {
+        "id": ('customer__customer_id', None),
+        "first_name": ('customer__first_name', None),
+        "last_name": ('customer__last_name', None),
+        "phone_number": ('customer__phone_number', None),
+        "age": ('customer__age', None),
+    },
+    "loan_amount": ('loan_amount', float),
+    "interest_rate": ('interest_rate', None),
+    "monthly_installment": ('monthly_payment', float),
+    "tenure": ('tenure', None),
+}
+
+LOAN_DETAIL_FIELDS = spec_fields(LOAN_DETAIL_SPEC)
+
+serialize_loan_detail = compile_serializer(LOAN_DETAIL_SPEC)
+
+# register: same output as CustomerResponseSerializer(customer).data
+CUSTOMER_RESPONSE_SPEC = {
+    "customer_id": ('customer_id', None),
+    "name": (lambda customer: f"{customer.first_name} {customer.last_name}", None),
+    "age": ('age', int),
+    "monthly_income": ('monthly_salary', decimal_string(12, 2)),
+    "approved_limit": ('approved_limit', decimal_string(12, 2)),
+    "phone_number": ('phone_number', str),
+}
+
+serialize_customer = compile_serializer(CUSTOMER_RESPONSE_SPEC, getter=attrgetter)
+
+
+# ----------------------- Input: precompiled validators -----------------------
+
+class FastRequest:
+    """Validated request payload as plain slotted attributes (keyed by field source)."""
+
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class EligibilityRequest(FastRequest):
+    __slots__ = ('customer_id', 'loan_amount', 'interest_rate', 'tenure')
+
+
+class CreateLoanRequest(FastRequest):
+    __slots__ = ('customer_id', 'loan_amount', 'interest_rate', 'tenure')
+
+
+class RegisterRequest(FastRequest):
+    __slots__ = ('first_name', 'last_name', 'age', 'phone_number', 'monthly_salary')
+
+
+class _Reject(Exception):
+    # The fast path can't vouch for this input; the DRF serializer takes over
+    pass
+
+
+_MAX_STRING_LENGTH = 1000
+_INTEGER_SUFFIX = re.compile(r'\.0*\s*$')  # IntegerField accepts '1.0' as 1, not '1.2'
+
+
+def _integer(field):
+    def convert(value):
+        if type(value) is int:
+            return value
+        if isinstance(value, str) and len(value) > _MAX_STRING_LENGTH:
+            raise _Reject
+        try:
+            return int(_INTEGER_SUFFIX.sub('', str(value)))
+        except (ValueError, TypeError):
+            raise _Reject
+    return convert
+
+
+def _float(field):
+    def convert(value):
+        if isinstance(value, str) and len(value) > _MAX_STRING_LENGTH:
+            raise _Reject
+        try:
+            return float(value)
+        except (TypeError, ValueError, OverflowError):
+            raise _Reject
+    return convert
+
+
+def _decimal(field):
+    # DecimalField.to_internal_value + validate_precision + quantize, with the bounds precomputed
+    max_whole_digits = field.max_whole_digits
+    quantize = field.quantize
+
+    def convert(value):
+        text = str(value).strip()
+        if len(text) > _MAX_STRING_LENGTH:
+            raise _Reject
+        try:
+            number = decimal.Decimal(text)
+        except decimal.DecimalException:
+            raise _Reject
+        if not number.is_finite():
+            raise _Reject
+        _, digits, exponent = number.as_tuple()
+        if exponent >= 0:
+            total_digits = whole_digits = len(digits) + exponent
+            decimal_places = 0
+        elif len(digits) > -exponent:
+            total_digits = len(digits)
+            whole_digits = total_digits + exponent
+            decimal_places = -exponent
+        else:
+            total_digits = decimal_places = -exponent
+            whole_digits = 0
+        if (
+            (field.max_digits is not None and total_digits > field.max_digits)
+            or (field.decimal_places is not None and decimal_places > field.decimal_places)
+            or (max_whole_digits is not None and whole_digits > max_whole_digits)
+        ):
+            raise _Reject
+        return quantize(number)
+    return convert
+
+
+def _char(field):
+    def convert(value):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise _Reject
+        value = str(value)
+        return value.strip() if field.trim_whitespace else value
+    return convert
+
+
+# Exact DRF field classes the fast path understands
+_CONVERTERS = {
+    drf_fields.IntegerField: _integer,
+    drf_fields.FloatField: _float,
+    drf_fields.DecimalField: _decimal,
+    drf_fields.CharField: _char,
+}
+
+_SKIP = object()
+
+
+def _compile_field(name, field):
+    if type(field) not in _CONVERTERS or field.read_only:
+        raise TypeError(f"No fast validator for {name} ({type(field).__name__})")
+    if any(getattr(validator, 'requires_context', False) for validator in field.validators):
+        raise TypeError(f"No fast validator for {name}: it has context-aware validators")
+    convert = _CONVERTERS[type(field)](field)
+    validators = list(field.validators)
+    is_char = isinstance(field, drf_fields.CharField)
+    is_decimal = isinstance(field, drf_fields.DecimalField)
+
+    def check(data):
+        value = data.get(name, drf_fields.empty)
+        if value is drf_fields.empty:
+            if field.required:
+                raise _Reject
+            try:
+                return field.get_default()
+            except drf_fields.SkipField:
+                return _SKIP
+        # Blank strings are settled before the null check, as in CharField/DecimalField
+        if is_char and (value == '' or (field.trim_whitespace and str(value).strip() == '')):
+            if not field.allow_blank:
+                raise _Reject
+            return ''
+        if is_decimal and field.allow_null and str(value).strip() == '':
+            return None
+        if value is None:
+            if not field.allow_null:
+                raise _Reject
+            return None
+        value = convert(value)
+        for validator in validators:
+            try:
+                validator(value)
+            except (ValidationError, DjangoValidationError):
+                raise _Reject
+        return value
+    return check
+
+
+class FastValidator:
+    """
+    Precompiled stand-in for `serializer_class(data=...).is_valid()`.
+    Field rules are read once from the DRF serializer, so the two can't drift apart.
+    Inputs the fast path can't vouch for (including every invalid one) are handed to
+    the DRF serializer, which keeps error shapes and messages exactly as before.
+    """
+
+    def __init__(self, serializer_class, request_class):
+        serializer = serializer_class()
+        if type(serializer).validate is not serializers.Serializer.validate or any(
+            hasattr(serializer, f'validate_{name}') for name in serializer.fields
+        ):
+            raise TypeError(f"{serializer_class.__name__} has custom validation; use it directly")
+        self.serializer_class = serializer_class
+        self.request_class = request_class
+        self.checks = [
+            (field.source, _compile_field(name, field)) for name, field in serializer.fields.items()
+        ]
+        missing = {source for source, _ in self.checks} ^ set(request_class.__slots__)
+        if missing:
+            raise TypeError(f"{request_class.__name__} slots don't match the serializer: {sorted(missing)}")
+
+    def fast(self, data):
+        # Request object, or None when the DRF serializer has to decide
+        if type(data) is not dict:
+            return None
+        request = self.request_class.__new__(self.request_class)
+        try:
+            for source, check in self.checks:
+                value = check(data)
+                setattr(request, source, None if value is _SKIP else value)
+        except _Reject:
+            return None
+        return request
+
+    def __call__(self, data):
+        # Returns (request object, None) or (None, serializer errors)
+        request = self.fast(data)
+        if request is not None:
+            return request, None
+        serializer = self.serializer_class(data=data)
+        if serializer.is_valid():
+            return self.request_class(**serializer.validated_data), None
+        return None, serializer.errors
+
+
+validate_eligibility = FastValidator(CheckEligibilitySerializer, EligibilityRequest)
+validate_create_loan = FastValidator(CreateLoanSerializer, CreateLoanRequest)
+validate_register = FastValidator(CustomerRegisterSerializer, RegisterRequest)
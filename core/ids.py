@@ -0,0 +1,82 @@
+import os
+import threading
+
+from django.db import models, transaction
+
+from .models import IdSequence, Loan, LoanArchive
+
+# Ids a process reserves per round trip to the sequence row
+ID_BLOCK_SIZE = 100
+
+# Process-local reserved blocks: model label -> [next id, end (exclusive)]
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+# Other tables holding ids of a model's rows: archived loans keep the id they had in Loan
+ID_SHARING_TABLES = {Loan: [LoanArchive]}
+
+
+def next_free_id(model):
+    # First id above everything already stored, archived rows included
+    tables = [model, *ID_SHARING_TABLES.get(model, [])]
+    return max((table.objects.aggregate(top=models.Max('pk'))['top'] or 0) for table in tables) + 1
+
+
+def reserve_ids(model, count):
+    # Takes count consecutive ids from model's IdSequence row (bulk inserts use it directly),
+    # returns the range. Call it outside longer transactions: the sequence row stays locked
+    # until commit.
+    name = model._meta.label_lower
+    with transaction.atomic():
+        sequence = IdSequence.objects.select_for_update().filter(name=name).first()
+        if sequence is None:
+            # First use: start above existing rows (a concurrent first use just finds the row)
+            IdSequence.objects.get_or_create(name=name, defaults={'next_value': next_free_id(model)})
+            sequence = IdSequence.objects.select_for_update().get(name=name)
+        IdSequence.objects.filter(name=name).update(next_value=models.F('next_value') + count)
+    return range(sequence.next_value, sequence.next_value + count)
+
+
+def allocate_id(model):
+    # Mints the next primary key for model. Ids come from a block of ID_BLOCK_SIZE reserved by
+    # this process, so most calls don't touch the database. Ids are unique but only roughly
+    # ordered across processes, and a restart leaves the rest of a block unused.
+    label = model._meta.label_lower
+    with _blocks_lock:
+        block = _blocks.get(label)
+        if block and block[0] < block[1]:
+            block[0] += 1
+            return block[0] - 1
+
+    reserved = reserve_ids(model, ID_BLOCK_SIZE)
+    # The rest of the block is only kept once the reservation is committed: ids from a
+    # rolled-back reservation can be handed out again by another process
+    transaction.on_commit(lambda: _keep_block(label, reserved))
+    return reserved[0]
+
+
+def _keep_block(label, reserved):
+    with _blocks_lock:
+        block = _blocks.get(label)
+        if not block or block[0] >= block[1]:
+            _blocks[label] = [reserved[0] + 1, reserved[-1] + 1]
+
+
+def reset_id_blocks():
+    # Forgets this process's reserved blocks; forked workers must not share their parent's
+    with _blocks_lock:
+        _blocks.clear()
+
+
+os.register_at_fork(after_in_child=reset_id_blocks)
+
+
+def advance_sequence(model):
+    # Moves model's sequence past rows inserted with explicit ids (file imports), so
+    # allocated ids don't collide with them
+    top = next_free_id(model)
+    name = model._meta.label_lower
+    _, created = IdSequence.objects.get_or_create(name=name, defaults={'next_value': top})
+    if not created:
+        IdSequence.objects.filter(name=name, next_value__lt=top).update(next_value=top)
@@ -0,0 +1,330 @@
+import os
+import time
+
+import pandas as pd
+from django.db import transaction
+
+from .ids import advance_sequence
+from .models import Customer, Loan, LoanArchive
+from .profiles import invalidate_credit_profiles
+from .snapshots import discard_credit_scores
+from .summaries import rebuild_loan_summaries
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:  # optional: pandas falls back to openpyxl, about 5x slower to parse a sheet
+    EXCEL_ENGINE = None
+
+# Spreadsheet column -> model field
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Age': 'age',
+    'Phone Number': 'phone_number',
+    'Monthly Salary': 'monthly_salary',
+    'Approved Limit': 'approved_limit',
+}
+
+LOAN_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'Loan ID': 'loan_id',
+    'Loan Amount': 'loan_amount',
+    'Tenure': 'tenure',
+    'Interest Rate': 'interest_rate',
+    'Monthly payment': 'monthly_payment',
+    'EMIs paid on Time': 'emis_paid_on_time',
+    'Date of Approval': 'date_of_approval',
+    'End Date': 'end_date',
+}
+
+
+class IngestStats:
+    """Row counters and timing for one ingested file."""
+
+    def __init__(self, label):
+        self.label = label
+        self.loaded = 0
+        self.rejected = 0
+        self.archived = 0  # rows for loans already moved to the archive, left out
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return (self.loaded + self.rejected + self.archived) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        archived = f", {self.archived} already archived" if self.archived else ""
+        return (
+            f"{self.label}: {self.loaded} rows loaded, {self.rejected} rejected{archived} "
+            f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/sec)"
+        )
+
+
+class IngestError(ValueError):
+    """Raised when a source file can't be read or lacks required columns."""
+
+
+# File extension -> reader format
+FORMAT_EXTENSIONS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+FORMATS = sorted(set(FORMAT_EXTENSIONS.values()))
+
+
+def detect_format(path):
+    extension = os.path.splitext(str(path))[1].lower()
+    try:
+        return FORMAT_EXTENSIONS[extension]
+    except KeyError:
+        raise IngestError(f"Can't detect the format of {path}; pass one of: {', '.join(FORMATS)}")
+
+
+def _read_excel(path, chunk_size, columns):
+    # Neither Excel engine reads in chunks, so the sheet is parsed once and then sliced
+    frame = pd.read_excel(path, usecols=lambda column: column in columns, engine=EXCEL_ENGINE)
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+
+def _read_csv(path, chunk_size, columns):
+    # Only the mapped columns are parsed, and ids/phones stay text until validation
+    yield from pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        usecols=lambda column: column in columns,
+        dtype=str,
+    )
+
+
+def _read_jsonl(path, chunk_size, columns):
+    for frame in pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False):
+        yield frame[[column for column in frame.columns if column in columns]]
+
+
+def _read_parquet(path, chunk_size, columns):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise IngestError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+    parquet_file = pq.ParquetFile(path)
+    wanted = [column for column in parquet_file.schema_arrow.names if column in columns]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=wanted):
+        yield batch.to_pandas()
+
+
+READERS = {
+    'excel': _read_excel,
+    'csv': _read_csv,
+    'jsonl': _read_jsonl,
+    'parquet': _read_parquet,
+}
+
+
+def read_chunks(path, chunk_size, columns, file_format=None):
+    # Streams the source as frames of at most chunk_size rows, checking the header up front
+    reader = READERS[file_format or detect_format(path)]
+    for frame in reader(path, chunk_size, columns):
+        missing = [column for column in columns if column not in frame.columns and column != 'Age']
+        if missing:
+            raise IngestError(f"{path} is missing required columns: {', '.join(missing)}")
+        yield frame
+
+
+def _numeric(frame, column):
+    return pd.to_numeric(frame[column], errors='coerce')
+
+
+def _dates(frame, column):
+    # JSON writers emit epoch milliseconds, everything else arrives as dates or date strings
+    series = frame[column]
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_datetime(series, unit='ms', errors='coerce')
+    return pd.to_datetime(series, errors='coerce')
+
+
+def clean_customers(frame):
+    # Vectorized validation, returns (valid rows as model-field frame, rejected count)
+    frame = frame.rename(columns=CUSTOMER_COLUMNS)
+    ids = _numeric(frame, 'customer_id')
+    salary = _numeric(frame, 'monthly_salary')
+    limit = _numeric(frame, 'approved_limit')
+    age = _numeric(frame, 'age') if 'age' in frame else pd.Series(pd.NA, index=frame.index)
+
+    valid = ids.notna() & salary.notna() & limit.notna()
+    valid &= frame['first_name'].notna() & frame['last_name'].notna() & frame['phone_number'].notna()
+
+    cleaned = pd.DataFrame({
+        'customer_id': ids[valid].astype('int64'),
+        'first_name': frame.loc[valid, 'first_name'].astype(str).str.strip(),
+        'last_name': frame.loc[valid, 'last_name'].astype(str).str.strip(),
+        'age': age[valid].astype('Int64'),
+        'phone_number': frame.loc[valid, 'phone_number'].astype(str).str.strip(),
+        'monthly_salary': salary[valid],
+        'approved_limit': limit[valid],
+    })
+    # Last occurrence wins, same as the row-by-row update_or_create
+    cleaned = cleaned.drop_duplicates('customer_id', keep='last')
+    return cleaned, int((~valid).sum())
+
+
+def clean_loans(frame, known_customer_ids):
+    # Vectorized validation against the preloaded customer ids, returns (valid frame, rejected count)
+    frame = frame.rename(columns=LOAN_COLUMNS)
+    customer_ids = _numeric(frame, 'customer_id')
+    loan_ids = _numeric(frame, 'loan_id')
+    numeric = {
+        field: _numeric(frame, field)
+        for field in ('loan_amount', 'tenure', 'interest_rate', 'monthly_payment', 'emis_paid_on_time')
+    }
+    approval = _dates(frame, 'date_of_approval')
+    end_date = _dates(frame, 'end_date')
+
+    valid = customer_ids.notna() & loan_ids.notna() & approval.notna() & end_date.notna()
+    for series in numeric.values():
+        valid &= series.notna()
+    valid &= customer_ids.isin(known_customer_ids)
+
+    cleaned = pd.DataFrame({
+        'customer_id': customer_ids[valid].astype('int64'),
+        'loan_id': loan_ids[valid].astype('int64'),
+        'loan_amount': numeric['loan_amount'][valid],
+        'tenure': numeric['tenure'][valid].astype('int64'),
+        'interest_rate': numeric['interest_rate'][valid].astype(float),
+        'monthly_payment': numeric['monthly_payment'][valid],
+        'emis_paid_on_time': numeric['emis_paid_on_time'][valid].astype('int64'),
+        'date_of_approval': approval[valid].dt.date,
+        'end_date': end_date[valid].dt.date,
+    })
+    cleaned = cleaned.drop_duplicates('loan_id', keep='last')
+    return cleaned, int((~valid).sum())
+
+
+def _int_or_none(value):
+    return None if pd.isna(value) else int(value)
+
+
+def build_customers(cleaned):
+    pk = Customer._meta.pk.to_python
+    return [
+        Customer(
+            customer_id=pk(int(row.customer_id)),
+            first_name=row.first_name,
+            last_name=row.last_name,
+            age=_int_or_none(row.age),
+            phone_number=row.phone_number,
+            monthly_salary=row.monthly_salary,
+            approved_limit=row.approved_limit,
+        )
+        for row in cleaned.itertuples(index=False)
+    ]
+
+
+def build_loans(cleaned):
+    customer_pk = Customer._meta.pk.to_python
+    loan_pk = Loan._meta.pk.to_python
+    return [
+        Loan(
+            customer_id=customer_pk(int(row.customer_id)),
+            loan_id=loan_pk(int(row.loan_id)),
+            loan_amount=row.loan_amount,
+            tenure=int(row.tenure),
+            interest_rate=float(row.interest_rate),
+            monthly_payment=row.monthly_payment,
+            emis_paid_on_time=int(row.emis_paid_on_time),
+            date_of_approval=row.date_of_approval,
+            end_date=row.end_date,
+        )
+        for row in cleaned.itertuples(index=False)
+    ]
+
+
+def _values_for_loan_ids(model, loan_ids, field, batch_size=900):
+    # Set of field values of model rows with the given loan ids (one query per batch)
+    loan_ids = list(loan_ids)
+    values = set()
+    for start in range(0, len(loan_ids), batch_size):
+        values.update(model.objects.filter(pk__in=loan_ids[start:start + batch_size]).values_list(field, flat=True))
+    return values
+
+
+def archived_loan_ids(loan_ids, batch_size=900):
+    # The given loan ids that are in LoanArchive
+    return _values_for_loan_ids(LoanArchive, loan_ids, 'pk', batch_size)
+
+
+def current_loan_owners(loan_ids, batch_size=900):
+    # Customers the given loans belong to before an upsert, which may move a loan to another
+    # customer
+    return _values_for_loan_ids(Loan, loan_ids, 'customer_id', batch_size)
+
+
+def upsert(model, objects, unique_field):
+    # Single INSERT ... ON CONFLICT DO UPDATE per batch. What's left of a load's time is mostly
+    # here, in the ORM preparing each field value for the statement, not in running it.
+    update_fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    with transaction.atomic():
+        model.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=[unique_field],
+            update_fields=update_fields,
+        )
+
+
+def ingest_customers(chunks):
+    stats = IngestStats('Customers')
+    for chunk in chunks:
+        cleaned, rejected = clean_customers(chunk)
+        customers = build_customers(cleaned)
+        upsert(Customer, customers, 'customer_id')
+        # bulk_create skips model signals, so latest scores and cached profiles are dropped here
+        customer_ids = [customer.pk for customer in customers]
+        discard_credit_scores(customer_ids)
+        invalidate_credit_profiles(customer_ids)
+        stats.loaded += len(cleaned)
+        stats.rejected += rejected
+    advance_sequence(Customer)  # registrations continue above the imported ids
+    return stats
+
+
+def ingest_loans(chunks):
+    stats = IngestStats('Loans')
+    # One query resolves every customer id the loan file may reference
+    known_customer_ids = pd.to_numeric(
+        pd.Series(list(Customer.objects.values_list('pk', flat=True)), dtype=object), errors='coerce'
+    ).dropna().astype('int64').unique()
+    for chunk in chunks:
+        cleaned, rejected = clean_loans(chunk, known_customer_ids)
+        # Archived loans already count through CustomerArchivedTotals; re-inserting them from a
+        # full book reload would count them twice
+        archived = cleaned['loan_id'].isin(archived_loan_ids(cleaned['loan_id'].tolist()))
+        cleaned = cleaned[~archived]
+        loans = build_loans(cleaned)
+        # Both the previous and the new owner of a re-ingested loan have changed totals
+        touched = current_loan_owners(loan.pk for loan in loans)
+        upsert(Loan, loans, 'loan_id')
+        touched.update(loan.customer_id for loan in loans)
+        rebuild_loan_summaries(touched)
+        discard_credit_scores(touched)
+        invalidate_credit_profiles(touched)
+        stats.loaded += len(cleaned)
+        stats.rejected += rejected
+        stats.archived += int(archived.sum())
+    advance_sequence(Loan)
+    return stats
@@ -0,0 +1,252 @@
+# Per-request performance instrumentation: wall time, DB query count and time, and response
+# serialization time per view. Exposed as a Server-Timing header on every response and as
+# Prometheus metrics on /metrics. Views can declare a `query_budget`; when
+# settings.ENFORCE_QUERY_BUDGETS is on (the test suite), going over it raises.
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRIC_PREFIX = 'credit_approval'
+
+# Request duration histogram buckets (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metrics of the request being handled; copied into sync_to_async threads with the context
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more DB queries than its declared query_budget."""
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled."""
+
+    __slots__ = ('started', 'queries', 'db_time', 'serialize_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    def server_timing(self, total):
+        # Server-Timing header value, durations in milliseconds
+        return (
+            f'total;dur={total * 1000:.2f}, '
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_time * 1000:.2f}'
+        )
+
+
+def _time_query(execute, sql, params, many, context):
+    # execute_wrapper installed on every connection; a no-op outside instrumented requests
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # connection_created receiver (see CoreConfig.ready). Connections are per thread, including
+    # sync_to_async worker threads, so the wrapper is attached to each one as it is opened.
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@contextmanager
+def serialization_timer():
+    # Counts the wrapped block as response serialization time of the current request
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serialize_time += time.perf_counter() - started
+
+
+class ViewTotals:
+    """Running totals for one view."""
+
+    __slots__ = ('buckets', 'count', 'duration', 'queries', 'db_time', 'serialize_time')
+
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    def add(self, duration, metrics):
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[index] += 1
+        self.count += 1
+        self.duration += duration
+        self.queries += metrics.queries
+        self.db_time += metrics.db_time
+        self.serialize_time += metrics.serialize_time
+
+
+class MetricsRegistry:
+    """Process-local per-view aggregates, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}      # (view, status code) -> count
+            self.views = {}         # view -> ViewTotals
+            self.budgets = {}       # view -> declared query budget
+
+    def observe(self, view, status_code, duration, metrics, budget=None):
+        with self._lock:
+            key = (view, status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.views.setdefault(view, ViewTotals()).add(duration, metrics)
+            if budget is not None:
+                self.budgets[view] = budget
+
+    def render(self):
+        with self._lock:
+            lines = []
+
+            def metric(name, kind, description, samples):
+                name = f'{METRIC_PREFIX}_{name}'
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(f'{name}{suffix}{{{labels}}} {value}' for suffix, labels, value in samples)
+
+            views = sorted(self.views.items())
+            metric('requests_total', 'counter', 'Requests handled, by view and status code.', [
+                ('', f'view="{view}",status="{code}"', count) for (view, code), count in sorted(self.requests.items())
+            ])
+            metric('request_duration_seconds', 'histogram', 'Wall time spent handling requests, by view.', [
+                sample
+                for view, totals in views
+                for sample in [
+                    *(('_bucket', f'view="{view}",le="{bound}"', count)
+                      for bound, count in zip(DURATION_BUCKETS, totals.buckets)),
+                    ('_bucket', f'view="{view}",le="+Inf"', totals.count),
+                    ('_sum', f'view="{view}"', f'{totals.duration:.6f}'),
+                    ('_count', f'view="{view}"', totals.count),
+                ]
+            ])
+            metric('db_queries_total', 'counter', 'DB queries run, by view.', [
+                ('', f'view="{view}"', totals.queries) for view, totals in views
+            ])
+            metric('db_duration_seconds_total', 'counter', 'Time spent in DB queries, by view.', [
+                ('', f'view="{view}"', f'{totals.db_time:.6f}') for view, totals in views
+            ])
+            metric('serialize_duration_seconds_total', 'counter', 'Time spent serializing responses, by view.', [
+                ('', f'view="{view}"', f'{totals.serialize_time:.6f}') for view, totals in views
+            ])
+            metric('query_budget', 'gauge', 'Declared per-request DB query budget, by view.', [
+                ('', f'view="{view}"', budget) for view, budget in sorted(self.budgets.items())
+            ])
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def view_label(request):
+    # URL name of the matched route (the view's dotted path when unnamed)
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match._func_path
+
+
+def query_budget(request):
+    # The matched view's declared `query_budget`, if any
+    match = getattr(request, 'resolver_match', None)
+    view_class = getattr(match.func, 'view_class', None) if match else None
+    return getattr(view_class, 'query_budget', None)
+
+
+class PerformanceMiddleware:
+    """
+    Times every request (wall, DB and serialization) for the Server-Timing header and the
+    /metrics endpoint. Place it first in MIDDLEWARE so the wall time covers the whole stack.
+    Works under WSGI and ASGI: DB time is collected by an execute_wrapper that follows the
+    request's context into sync_to_async threads.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that render
+        render = response.render
+
+        def timed_render():
+            with serialization_timer():
+                return render()
+        response.render = timed_render
+        return response
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        view = view_label(request)
+        if view == 'metrics':
+            return response
+
+        budget = query_budget(request)
+        registry.observe(view, response.status_code, duration, metrics, budget)
+        response['Server-Timing'] = metrics.server_timing(duration)
+
+        if budget is not None and metrics.queries > budget and getattr(settings, 'ENFORCE_QUERY_BUDGETS', False):
+            raise QueryBudgetExceeded(
+                f"{view} ran {metrics.queries} DB queries, over its query_budget of {budget}"
+            )
+        return response
+
+
+def metrics_view(request):
+    # Prometheus scrape endpoint; only answers the addresses in settings.METRICS_ALLOWED_IPS
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if '*' not in allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type=METRICS_CONTENT_TYPE)
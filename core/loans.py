@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from rest_framework import status
+
+from .ids import allocate_id
+from .models import Customer, Loan
+from .money import customer_paise_annotations, to_paise
+from .summaries import get_loan_stats
+from .utils import apply_interest_slab, calculate_monthly_installment, credit_score_from_stats
+
+
+def create_loan(customer_id, loan_amount, interest_rate, tenure):
+    # Eligibility re-check and insert for create-loan, returns (response_data, http_status).
+    # Raises Customer.DoesNotExist for unknown customers.
+    #
+    # The check and the insert run in one transaction holding a row lock on the customer,
+    # so concurrent requests for the same customer can't both pass the limit check, while
+    # requests for different customers never wait on each other.
+    loan_id = allocate_id(Loan)  # minted up front so the sequence row isn't locked with the customer
+
+    with transaction.atomic():
+        customer = Customer.objects.select_for_update().annotate(
+            **customer_paise_annotations()
+        ).get(customer_id=customer_id)
+
+        # Authoritative stats read under the lock (loan writers and summary rebuilds take this
+        # same lock before writing the summary row); money is compared in integer paise.
+        # The summary is read by its own query, not joined into the locking one: on PostgreSQL
+        # a row joined there comes from the snapshot taken before waiting for the lock.
+        stats = get_loan_stats([customer], locked=True)[customer.pk]
+        credit_score = credit_score_from_stats(customer.limit_paise, stats)
+
+        # EMI burden check: current EMIs over half the salary
+        if stats['sum_current_emis'] * 2 > customer.salary_paise:
+            return {
+                "loan_id": None,
+                "customer_id": customer.customer_id,
+                "loan_approved": False,
+                "message": "Total EMIs exceed 50% of monthly salary.",
+                "monthly_installment": 0
+            }, status.HTTP_400_BAD_REQUEST
+
+        # Interest rate check based on credit score
+        approved, corrected_interest_rate = apply_interest_slab(credit_score, interest_rate)
+
+        # Approved limit check
+        if stats['sum_current_loans'] + to_paise(loan_amount) > customer.limit_paise:
+            approved = False
+
+        # Calculate EMI
+        emi = calculate_monthly_installment(float(loan_amount), tenure, corrected_interest_rate)
+
+        if not approved:
+            return {
+                "loan_id": None,
+                "customer_id": customer.customer_id,
+                "loan_approved": False,
+                "message": "Loan not approved due to credit rating or limits.",
+                "monthly_installment": emi
+            }, status.HTTP_400_BAD_REQUEST
+
+        # Create loan in DB; repayment starts today
+        today = datetime.now().date()
+        loan = Loan.objects.create(
+            customer=customer,
+            loan_id=loan_id,
+            loan_amount=loan_amount,
+            tenure=tenure,
+            interest_rate=corrected_interest_rate,
+            monthly_payment=emi,
+            emis_paid_on_time=0,
+            date_of_approval=today,
+            end_date=today + relativedelta(months=tenure)
+        )
+        return {
+            "loan_id": loan.loan_id,
+            "customer_id": customer.customer_id,
+            "loan_approved": True,
+            "message": "Loan approved successfully.",
+            "monthly_installment": emi
+        }, status.HTTP_201_CREATED
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.archive import ARCHIVE_BATCH_SIZE, archive_loans
+
+class Command(BaseCommand):
+    help = 'Moves loans that ended long ago to the loan archive (scores are unchanged)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-days', type=int,
+                            help='Days past end_date before a loan is archived (default LOAN_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Loans moved per transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = archive_loans(after_days=options['after_days'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} loans in {elapsed:.2f}s"))
@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from core.replay import generate_request_mix, replay_wsgi
+
+class Command(BaseCommand):
+    help = (
+        'Replays the same check-eligibility / view-loans requests through the WSGI app in-process '
+        'with a new database connection per request, with persistent connections and (on Postgres '
+        'with psycopg 3) with the connection pool, and reports how much of each request went to '
+        'opening its connection.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode')
+        parser.add_argument('--seed', type=int, default=0, help='Request mix seed')
+
+    def handle(self, *args, **options):
+        try:
+            requests = generate_request_mix(options['requests'], {'check-eligibility': 1, 'view-loans': 1},
+                                            seed=options['seed'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        application = get_wsgi_application()
+
+        modes = [
+            ('connection per request', {'CONN_MAX_AGE': 0}, None),
+            ('persistent connections', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}, None),
+        ]
+        if connection.vendor == 'postgresql':
+            from django.db.backends.postgresql.psycopg_any import is_psycopg3
+            if is_psycopg3:
+                modes.append(('psycopg pool', {'CONN_MAX_AGE': 0}, {'min_size': 1, 'max_size': 4}))
+            else:
+                self.stdout.write(self.style.WARNING('Skipping the pool: it needs psycopg 3 (pip install "psycopg[pool]")'))
+
+        settings = connection.settings_dict
+        saved = dict(settings, OPTIONS=dict(settings['OPTIONS']))
+        try:
+            for label, overrides, pool in modes:
+                connection.close()
+                settings.update(overrides)
+                settings['OPTIONS'].pop('pool', None)
+                if pool:
+                    settings['OPTIONS']['pool'] = pool
+                self.run_mode(label, application, requests)
+                connection.close()
+                if pool:
+                    connection.close_pool()
+        finally:
+            settings.clear()
+            settings.update(saved)
+
+    def run_mode(self, label, application, requests):
+        # Times every connection the app opens (a pool checkout, with a pool) during the replay
+        connects = []
+        get_new_connection = connection.get_new_connection
+
+        def timed_get_new_connection(conn_params):
+            started = time.perf_counter()
+            try:
+                return get_new_connection(conn_params)
+            finally:
+                connects.append(time.perf_counter() - started)
+
+        connection.get_new_connection = timed_get_new_connection
+        try:
+            stats = replay_wsgi(requests, application=application)
+        finally:
+            del connection.get_new_connection
+
+        row = stats.summary()['all']
+        connect_ms = sum(connects) * 1000
+        latencies = stats.total.latencies
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        self.stdout.write(
+            f"{row['requests']} requests, {row['errors']} errors, {len(connects)} connections opened "
+            f"({connect_ms / max(1, len(connects)):.3f} ms each)"
+        )
+        self.stdout.write(
+            f"  {row['requests_per_second']:,.0f} req/s  mean {statistics.mean(latencies) * 1000:.2f} ms  "
+            f"p50 {row['p50_ms']:.2f} ms  p99 {row['p99_ms']:.2f} ms  "
+            f"connect {connect_ms / row['requests']:.3f} ms/request"
+        )
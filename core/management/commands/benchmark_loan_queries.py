@@ -0,0 +1,97 @@
+import statistics
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from core.models import Loan
+from core.synthetic import seed_database
+from core.utils import aggregate_loan_stats, approved_in_year
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the hot Loan queries (active sums, current-year count, full score aggregate) '
+        'and prints query plans, optionally with the composite indexes dropped for a before/after view. '
+        'Run it against a scratch database: it can seed synthetic rows and temporarily drop indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=1000000, help='Seed synthetic loans up to this many rows')
+        parser.add_argument('--customers', type=int, default=None, help='Synthetic customers (default loans / 8)')
+        parser.add_argument('--samples', type=int, default=200, help='Customers sampled per query')
+        parser.add_argument('--compare-indexes', action='store_true',
+                            help='Also measure with the composite indexes dropped (re-created afterwards)')
+
+    def handle(self, *args, **options):
+        existing = Loan.objects.count()
+        if existing < options['loans']:
+            missing = options['loans'] - existing
+            customers = options['customers'] or max(1, missing // 8)
+            self.stdout.write(f"Seeding {customers} customers and {missing} loans...")
+            seed_database(customers, missing, stdout=self.stdout)
+
+        sample = list(
+            Loan.objects.order_by().values_list('customer_id', flat=True).distinct()[:options['samples']]
+        )
+        if not sample:
+            raise CommandError('No loans to benchmark')
+
+        if options['compare_indexes']:
+            indexes = Loan._meta.indexes
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(Loan, index)
+            try:
+                self.run_suite('without composite indexes', sample)
+            finally:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(Loan, index)
+        self.run_suite('with composite indexes', sample)
+
+    def hot_queries(self):
+        today = datetime.now().date()
+        return {
+            'active sums': lambda customer_id: Loan.objects.filter(
+                customer_id=customer_id, end_date__gte=today
+            ).aggregate(principal=models.Sum('loan_amount'), emi=models.Sum('monthly_payment')),
+            'current year (__year)': lambda customer_id: Loan.objects.filter(
+                customer_id=customer_id, date_of_approval__year=today.year
+            ).count(),
+            'current year (date range)': lambda customer_id: Loan.objects.filter(
+                approved_in_year(today.year), customer_id=customer_id
+            ).count(),
+            'score aggregate': lambda customer_id: aggregate_loan_stats(
+                Loan.objects.filter(customer_id=customer_id)
+            ),
+        }
+
+    def explain(self, name, customer_id):
+        today = datetime.now().date()
+        querysets = {
+            'active sums': Loan.objects.filter(customer_id=customer_id, end_date__gte=today)
+            .values('customer_id').annotate(models.Sum('loan_amount'), models.Sum('monthly_payment')),
+            'current year (__year)': Loan.objects.filter(customer_id=customer_id, date_of_approval__year=today.year),
+            'current year (date range)': Loan.objects.filter(approved_in_year(today.year), customer_id=customer_id),
+        }
+        if name in querysets:
+            return querysets[name].explain()
+        return None
+
+    def run_suite(self, label, sample):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        for name, query in self.hot_queries().items():
+            timings = []
+            for customer_id in sample:
+                started = time.perf_counter()
+                query(customer_id)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{name:<28} mean {statistics.mean(timings):7.3f} ms   p95 {p95:7.3f} ms   ({len(timings)} runs)"
+            )
+            plan = self.explain(name, sample[0])
+            if plan:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
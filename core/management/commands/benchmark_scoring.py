@@ -0,0 +1,134 @@
+import math
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from core.models import Customer
+from core.money import to_paise
+from core.utils import (
+    EMPTY_LOAN_STATS, apply_interest_slab, calculate_monthly_installment, check_loan_eligibility,
+    credit_score_from_stats, score_from_components
+)
+
+MONEY_STATS = ('approved_volume', 'sum_current_loans', 'sum_current_emis')
+
+
+# Scoring as it was done before money moved to integer paise: Decimal stats, float
+# conversions per request. Kept as the benchmark baseline and as the reference the tests
+# compare the paise path against.
+def decimal_stats(stats):
+    return {key: Decimal(value) / 100 if key in MONEY_STATS else value for key, value in stats.items()}
+
+
+def decimal_credit_score(approved_limit, stats):
+    total_emis = stats['total_emis'] or 1
+    paid_on_time_ratio = stats['total_onschedule_emis'] / total_emis
+    volume_ratio = float(stats['approved_volume']) / float(approved_limit) if approved_limit else math.inf
+    return score_from_components({
+        'on_time_factor': min(30, paid_on_time_ratio * 30),
+        'loan_count_factor': min(20, max(0, 20 - stats['num_loans'])),
+        'current_year_factor': min(20, stats['current_year_loans'] * 4),
+        'volume_factor': min(30, max(0, 30 - volume_ratio * 30)),
+        'limit_breached': stats['sum_current_loans'] > approved_limit,
+    })
+
+
+def decimal_check_loan_eligibility(customer, stats, loan_amount, interest_rate, tenure, credit_score=None):
+    if credit_score is None:
+        credit_score = decimal_credit_score(customer.approved_limit, stats)
+    approval, corrected_interest_rate = False, float(interest_rate)
+    if not float(stats['sum_current_emis']) > float(customer.monthly_salary) * 0.5:
+        approval, corrected_interest_rate = apply_interest_slab(credit_score, float(interest_rate))
+        if float(stats['sum_current_loans']) > float(customer.approved_limit):
+            approval = False
+    return {
+        "customer_id": customer.customer_id,
+        "approval": approval,
+        "interest_rate": float(interest_rate),
+        "corrected_interest_rate": corrected_interest_rate,
+        "tenure": tenure,
+        "monthly_installment": calculate_monthly_installment(float(loan_amount), int(tenure), corrected_interest_rate)
+    }
+
+
+def random_case(rng):
+    # A customer, their loan stats (money in paise) and an application, with amounts in
+    # whole paise as they come out of the database
+    salary = rng.randrange(1000000, 50000000)
+    customer = Customer(
+        customer_id=rng.randrange(1, 10**6), monthly_salary=Decimal(salary) / 100,
+        approved_limit=Decimal(round(36 * salary, -7)) / 100,
+    )
+    num_loans = rng.randrange(0, 30)
+    stats = dict(EMPTY_LOAN_STATS)
+    if num_loans:
+        total_emis = rng.randrange(num_loans, num_loans * 240)
+        stats.update(
+            num_loans=num_loans, total_emis=total_emis, total_onschedule_emis=rng.randrange(0, total_emis + 1),
+            approved_volume=rng.randrange(0, 2 * to_paise(customer.approved_limit) + 1),
+            current_year_loans=rng.randrange(0, num_loans + 1),
+            sum_current_loans=rng.randrange(0, to_paise(customer.approved_limit) * 3 // 2 + 1),
+            sum_current_emis=rng.randrange(0, salary + 1),
+        )
+    application = (Decimal(rng.randrange(1000000, 100000000)) / 100, rng.choice([8.0, 10.5, 12.0, 14.0, 16.5, 20.0]),
+                   rng.choice([6, 12, 24, 36, 60]))
+    return customer, stats, application
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark of the per-request scoring work on check-eligibility (credit score, EMI burden and '
+        'limit checks, EMI): Decimal/float money vs integer paise. Runs single-threaded on in-memory '
+        'profiles, so the figures are CPU time per request for this layer alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200000, help='Applications scored per measurement')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        cases = [random_case(rng) for _ in range(1000)]
+        before_cases = [(customer, decimal_stats(stats), application) for customer, stats, application in cases]
+        for customer, _, _ in cases:
+            # As loaded by the credit profile query (see customer_paise_annotations)
+            customer.salary_paise = to_paise(customer.monthly_salary)
+            customer.limit_paise = to_paise(customer.approved_limit)
+
+        def decimal_score(case):
+            customer, stats, _ = case
+            return decimal_credit_score(customer.approved_limit, stats)
+
+        def paise_score(case):
+            customer, stats, _ = case
+            return credit_score_from_stats(customer.limit_paise, stats)
+
+        def decimal_check(case):
+            customer, stats, (loan_amount, interest_rate, tenure) = case
+            return decimal_check_loan_eligibility(customer, stats, loan_amount, interest_rate, tenure, 40)
+
+        def paise_check(case):
+            customer, stats, (loan_amount, interest_rate, tenure) = case
+            return check_loan_eligibility(customer, stats, loan_amount, interest_rate, tenure, 40)
+
+        iterations = options['iterations']
+        for name, before, after in [
+            ('credit score', decimal_score, paise_score),
+            ('eligibility check', decimal_check, paise_check),
+        ]:
+            before_time = self.measure(before, before_cases, iterations)
+            after_time = self.measure(after, cases, iterations)
+            self.stdout.write(
+                f"{name:<18} Decimal {before_time * 1e6:>6.2f} us   paise {after_time * 1e6:>6.2f} us   "
+                f"saved {(before_time - after_time) * 1e6:>5.2f} us/request"
+            )
+
+    def measure(self, run, cases, iterations):
+        # Seconds per call
+        for case in cases:  # warm-up
+            run(case)
+        started = time.perf_counter()
+        for index in range(iterations):
+            run(cases[index % len(cases)])
+        return (time.perf_counter() - started) / iterations
@@ -0,0 +1,87 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from core.fast_serializers import serialize_customer, validate_create_loan, validate_eligibility, validate_register
+from core.models import Customer
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import (
+    CheckEligibilitySerializer, CreateLoanSerializer, CustomerRegisterSerializer, CustomerResponseSerializer
+)
+
+REGISTER_PAYLOAD = {
+    "first_name": "Alice", "last_name": "Smith", "age": 28, "monthly_income": "50000.00", "phone_number": "9876543210"
+}
+LOAN_PAYLOAD = {"customer_id": 1, "loan_amount": "200000", "interest_rate": 12, "tenure": 24}
+ELIGIBILITY_RESPONSE = {
+    "customer_id": "1", "approval": True, "interest_rate": 12.0,
+    "corrected_interest_rate": 12.0, "tenure": 24, "monthly_installment": 9414.69
+}
+CREATE_LOAN_RESPONSE = {
+    "loan_id": "9001", "customer_id": "1", "loan_approved": True,
+    "message": "Loan approved successfully.", "monthly_installment": 9414.69
+}
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark of the request validation + response rendering work done per request on the '
+        'register, check-eligibility and create-loan endpoints: DRF serializers vs the precompiled fast path. '
+        'Runs single-threaded, so the figures are requests/sec per core for this layer alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000, help='Requests simulated per measurement')
+
+    def handle(self, *args, **options):
+        customer = Customer(
+            customer_id='1', first_name="Alice", last_name="Smith", age=28, phone_number="9876543210",
+            monthly_salary=Decimal('50000.00'), approved_limit=Decimal('1800000')
+        )
+        drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+        def drf_register():
+            serializer = CustomerRegisterSerializer(data=REGISTER_PAYLOAD)
+            serializer.is_valid()
+            return drf_renderer.render(CustomerResponseSerializer(customer).data)
+
+        def fast_register():
+            validate_register(REGISTER_PAYLOAD)
+            return fast_renderer.render(serialize_customer(customer))
+
+        def drf_request(serializer_class, response):
+            def run():
+                serializer = serializer_class(data=LOAN_PAYLOAD)
+                serializer.is_valid()
+                return drf_renderer.render(response)
+            return run
+
+        def fast_request(validator, response):
+            def run():
+                validator(LOAN_PAYLOAD)
+                return fast_renderer.render(response)
+            return run
+
+        cases = [
+            ('register', drf_register, fast_register),
+            ('check-eligibility', drf_request(CheckEligibilitySerializer, ELIGIBILITY_RESPONSE),
+             fast_request(validate_eligibility, ELIGIBILITY_RESPONSE)),
+            ('create-loan', drf_request(CreateLoanSerializer, CREATE_LOAN_RESPONSE),
+             fast_request(validate_create_loan, CREATE_LOAN_RESPONSE)),
+        ]
+        self.stdout.write(f"JSON encoder on the fast path: {'orjson' if orjson else 'stdlib json'}")
+        for name, before, after in cases:
+            before_rate = self.measure(before, options['iterations'])
+            after_rate = self.measure(after, options['iterations'])
+            self.stdout.write(
+                f"{name:<18} DRF {before_rate:>10,.0f} req/s/core   fast {after_rate:>10,.0f} req/s/core   "
+                f"x{after_rate / before_rate:.1f}"
+            )
+
+    def measure(self, run, iterations):
+        for _ in range(min(1000, iterations)):  # warm-up
+            run()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        return iterations / (time.perf_counter() - started)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from core.synthetic import DATASET_FORMATS, LOANS_PER_CUSTOMER, seed_database, write_dataset
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic customers and loans shaped like customer_data.xlsx / loan_data.xlsx, '
+        'from 10k to 10M loans. Writes customers/loans files that inject_data loads, or with --load '
+        'inserts them straight into the database. The same --seed gives the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=10000, help='Loans to generate')
+        parser.add_argument('--customers', type=int, default=None,
+                            help=f'Customers to generate (default loans / {LOANS_PER_CUSTOMER})')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--format', choices=DATASET_FORMATS, default='csv', help='Output file format')
+        parser.add_argument('--out', default='synthetic_data', help='Output directory')
+        parser.add_argument('--chunk-size', type=int, default=100000, help='Rows generated and written at a time')
+        parser.add_argument('--load', action='store_true',
+                            help='Insert into the database (ids above the existing ones) instead of writing files')
+
+    def handle(self, *args, **options):
+        loans = options['loans']
+        customers = options['customers'] or max(1, round(loans / LOANS_PER_CUSTOMER))
+        if options['load']:
+            seed_database(customers, loans, batch_size=options['chunk_size'], seed=options['seed'], stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f"Inserted {customers} customers and {loans} loans"))
+            return
+        customer_path, loan_path = write_dataset(
+            options['out'], loans, customers, file_format=options['format'], seed=options['seed'],
+            chunk_size=options['chunk_size'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {customers} customers to {customer_path} and {loans} loans to {loan_path}"))
+        self.stdout.write(f"Load them with: python manage.py inject_data --customers {customer_path} --loans {loan_path}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.replay import DEFAULT_MIX, generate_request_mix, parse_mix, write_request_mix
+
+class Command(BaseCommand):
+    help = (
+        'Writes a request mix (register / check-eligibility / create-loan / view-loans, one JSON '
+        'request per line) against customers already in the database, for replay_requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000, help='Requests to generate')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help='Relative weight per endpoint, e.g. "check-eligibility=8,view-loans=2"')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--samples', type=int, default=10000, help='Distinct customers the requests are spread over')
+        parser.add_argument('--out', default='request_mix.jsonl', help='Output JSONL file')
+
+    def handle(self, *args, **options):
+        try:
+            requests = generate_request_mix(
+                options['requests'], parse_mix(options['mix']), seed=options['seed'], samples=options['samples']
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        write_request_mix(options['out'], requests)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(requests)} requests to {options['out']}"))
@@ -1,13 +1,59 @@
 import pandas as pd
-from django.core.management.base import BaseCommand
-from core.models import Customer, Loan
+from django.core.management.base import BaseCommand, CommandError
+from core.ids import advance_sequence
+from core.models import Customer, Loan, LoanArchive
+from core.ingest import (
+    CUSTOMER_COLUMNS, LOAN_COLUMNS, FORMATS, IngestError,
+    detect_format, read_chunks, ingest_customers, ingest_loans
+)
 
 class Command(BaseCommand):
-    help = 'Injects customer and loan data from Excel files'
+    help = 'Injects customer and loan data from Excel, CSV, Parquet or JSONL files'
 
-    def handle(self, *args, **kwargs):
-        customers = pd.read_excel('customer_data.xlsx')  # Load customer data
-        loans = pd.read_excel('loan_data.xlsx')  # Load loan data
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', default='customer_data.xlsx', help='Customer data file path')
+        parser.add_argument('--loans', default='loan_data.xlsx', help='Loan data file path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Source format for both files (detected from the extension by default)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows upserted per bulk statement and transaction')
+        parser.add_argument('--row-by-row', action='store_true',
+                            help='Use the slower update_or_create path (one query per row)')
+
+    def handle(self, *args, **options):
+        if options['row_by_row']:
+            self.handle_row_by_row(options['customers'], options['loans'])
+        else:
+            chunk_size = options['chunk_size']
+            file_format = options['format']
+            try:
+                customer_stats = ingest_customers(
+                    read_chunks(options['customers'], chunk_size, CUSTOMER_COLUMNS, file_format)
+                )
+                self.stdout.write(customer_stats.summary())
+                loan_stats = ingest_loans(
+                    read_chunks(options['loans'], chunk_size, LOAN_COLUMNS, file_format)
+                )
+                self.stdout.write(loan_stats.summary())
+            except IngestError as exc:
+                raise CommandError(str(exc))
+            if customer_stats.rejected or loan_stats.rejected:
+                self.stdout.write(self.style.WARNING(
+                    f"Rejected {customer_stats.rejected} customer rows and {loan_stats.rejected} loan rows "
+                    "(missing/invalid values or unknown customer)"
+                ))
+
+        self.stdout.write(self.style.SUCCESS('Data injection is complete. Please check your database tables to confirm if the Excel sheet data has been inserted.'))  # Print success message
+
+    def handle_row_by_row(self, customers_path, loans_path):
+        try:
+            formats = {detect_format(customers_path), detect_format(loans_path)}
+        except IngestError as exc:
+            raise CommandError(str(exc))
+        if formats != {'excel'}:
+            raise CommandError("--row-by-row only reads Excel files")
+        customers = pd.read_excel(customers_path)  # Load customer data
+        loans = pd.read_excel(loans_path)  # Load loan data
 
         for _, row in customers.iterrows():  # Iterate through customer records
             customer_id = str(row['Customer ID']).strip()
@@ -40,6 +86,8 @@ class Command(BaseCommand):
                 continue
             if pd.isna(loan_id) or loan_id == "":
                 continue
+            if LoanArchive.objects.filter(loan_id=int(loan_id)).exists():
+                continue  # already counted through the customer's archived totals
 
             try:
                 customer = Customer.objects.get(customer_id=int(customer_id))
@@ -69,4 +117,6 @@ class Command(BaseCommand):
                 }
             )
 
-        self.stdout.write(self.style.SUCCESS('Data injection is complete. Please check your database tables to confirm if the Excel sheet data has been inserted.'))  # Print success message
+        # Keep allocated ids above the imported ones
+        advance_sequence(Customer)
+        advance_sequence(Loan)
@@ -0,0 +1,88 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Customer, Loan
+
+class Command(BaseCommand):
+    help = (
+        'Fires concurrent requests at a running server and reports throughput and latency. '
+        'Run it once against the sync (WSGI) deployment and once against the ASGI one with the '
+        'same worker count, with --async for the async endpoints.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api/', help='API base URL')
+        parser.add_argument('--endpoint', choices=['check-eligibility', 'view-loan', 'view-loans'],
+                            default='check-eligibility')
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='Hit the async/ twins of the endpoint')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests')
+        parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight at once')
+        parser.add_argument('--samples', type=int, default=500,
+                            help='Distinct customers/loans taken from the database for the payloads')
+
+    def handle(self, *args, **options):
+        prefix = options['url'].rstrip('/') + '/' + ('async/' if options['use_async'] else '')
+        requests = list(islice(cycle(self.build_requests(prefix, options)), options['requests']))
+
+        latencies = []
+        failures = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for ok, elapsed in pool.map(self.send, requests):
+                latencies.append(elapsed)
+                failures += not ok
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        self.stdout.write(
+            f"{options['endpoint']}{' (async)' if options['use_async'] else ''}: "
+            f"{len(latencies)} requests, {failures} failed, concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"  {len(latencies) / wall:,.0f} req/s  mean {statistics.mean(latencies) * 1000:.1f} ms  "
+            f"p50 {percentile(0.50):.1f} ms  p95 {percentile(0.95):.1f} ms  p99 {percentile(0.99):.1f} ms"
+        )
+
+    def build_requests(self, prefix, options):
+        # (url, body) pairs; bodies are None for GETs
+        samples = options['samples']
+        if options['endpoint'] == 'view-loan':
+            ids = list(Loan.objects.order_by('pk').values_list('pk', flat=True)[:samples])
+            requests = [(f"{prefix}view-loan/{loan_id}", None) for loan_id in ids]
+        else:
+            ids = list(Customer.objects.order_by('pk').values_list('pk', flat=True)[:samples])
+            if options['endpoint'] == 'view-loans':
+                requests = [(f"{prefix}view-loans/{customer_id}", None) for customer_id in ids]
+            else:
+                requests = [
+                    (f"{prefix}check-eligibility", json.dumps({
+                        "customer_id": int(customer_id), "loan_amount": 100000, "interest_rate": 12.0, "tenure": 12
+                    }).encode())
+                    for customer_id in ids
+                ]
+        if not requests:
+            raise CommandError('No customers or loans in the database to build requests from')
+        return requests
+
+    def send(self, request):
+        # Returns (succeeded, seconds)
+        url, body = request
+        http_request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(http_request, timeout=60) as response:
+                response.read()
+                ok = response.status < 500
+        except urllib.error.HTTPError as exc:
+            ok = exc.code < 500
+        except OSError:
+            ok = False
+        return ok, time.perf_counter() - started
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.summaries import rebuild_all_loan_summaries, expire_loan_summaries
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-customer loan summary table, or only rows whose loans expired (nightly sweep)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expired-only', action='store_true',
+                            help='Only rebuild rows where a running loan passed its end_date or the year changed')
+        parser.add_argument('--batch-size', type=int, default=900, help='Customers per aggregate/upsert batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['expired_only']:
+            count = expire_loan_summaries(batch_size=options['batch_size'])
+        else:
+            count = rebuild_all_loan_summaries(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} loan summaries in {elapsed:.2f}s"))
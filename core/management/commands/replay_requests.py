@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+from core.replay import load_request_mix, replay_asgi, replay_wsgi
+
+class Command(BaseCommand):
+    help = (
+        'Replays a request mix file at the WSGI and/or ASGI application in-process (no server, no '
+        'network) against the configured database, and reports throughput, latency percentiles '
+        'and DB queries per request for each endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='request_mix.jsonl', help='Request mix from generate_request_mix')
+        parser.add_argument('--app', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Requests in flight at once (threads for WSGI, tasks for ASGI)')
+        parser.add_argument('--async-endpoints', action='store_true',
+                            help='Under ASGI, send requests to the async/ twins of the endpoints')
+        parser.add_argument('--json-out', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        requests = load_request_mix(options['file'])
+        runs = []
+        if options['app'] in ('wsgi', 'both'):
+            runs.append(replay_wsgi(requests, options['concurrency']))
+        if options['app'] in ('asgi', 'both'):
+            runs.append(replay_asgi(requests, options['concurrency'], async_endpoints=options['async_endpoints']))
+
+        for stats in runs:
+            self.stdout.write(stats.report())
+        if options['json_out']:
+            with open(options['json_out'], 'w') as handle:
+                json.dump({stats.app: stats.summary() for stats in runs}, handle, indent=2)
+            self.stdout.write(f"Results written to {options['json_out']}")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.rescoring import DEFAULT_RANGE_SIZE, CheckpointMismatch, rescore_customers
+
+class Command(BaseCommand):
+    help = (
+        'Re-scores every customer in parallel (nightly batch): customers are split into id ranges, '
+        'each range is scored in bulk by a worker process, which appends a credit score snapshot per '
+        'customer and updates their latest score. Progress is checkpointed, so rerunning after a '
+        'crash with the same options resumes the same run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: one per CPU core; 1 scores in this process)')
+        parser.add_argument('--range-size', type=int, default=DEFAULT_RANGE_SIZE,
+                            help='Customers per id range (unit of work and of checkpointing)')
+        parser.add_argument('--checkpoint', default='rescore_checkpoint.json',
+                            help='Checkpoint file; an existing one is resumed')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only re-score customers whose loans or limit changed, or whose latest '
+                                 'score expired, since their last snapshot')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start a new run')
+
+    def handle(self, *args, **options):
+        def progress(stats, id_range, count):
+            self.stdout.write(
+                f"[{stats.resumed + stats.completed}/{stats.ranges}] ids {id_range[0] or '-'}..{id_range[1] or '-'}: "
+                f"{count} customers ({stats.customers_per_second:,.0f} customers/sec so far)"
+            )
+
+        try:
+            stats = rescore_customers(
+                options['checkpoint'], workers=options['workers'], range_size=options['range_size'],
+                restart=options['restart'], incremental=options['incremental'], on_range_done=progress,
+            )
+        except CheckpointMismatch as exc:
+            raise CommandError(str(exc))
+        if stats.resumed:
+            self.stdout.write(f"Resumed run: {stats.resumed} ranges were already done")
+        self.stdout.write(self.style.SUCCESS(stats.summary()))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLoanSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='loan_summary', serialize=False, to='core.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('tenure_sum', models.IntegerField(default=0)),
+                ('on_time_emi_sum', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('active_principal', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('active_emi', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('current_year_count', models.IntegerField(default=0)),
+                ('as_of', models.DateField()),
+                ('next_expiry', models.DateField(blank=True, null=True)),
+            ],
+        ),
+    ]
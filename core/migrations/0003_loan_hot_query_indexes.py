@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_customerloansummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date', 'loan_amount', 'monthly_payment'], name='loan_customer_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'date_of_approval'], name='loan_customer_approval_idx'),
+        ),
+    ]
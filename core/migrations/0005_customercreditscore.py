@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_idsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditScore',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_score', serialize=False, to='core.customer')),
+                ('credit_score', models.IntegerField()),
+                ('scored_on', models.DateField()),
+            ],
+        ),
+    ]
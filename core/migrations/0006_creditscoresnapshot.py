@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_customercreditscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customercreditscore',
+            name='valid_until',
+            field=models.DateField(null=True),
+        ),
+        migrations.CreateModel(
+            name='CreditScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credit_score', models.IntegerField()),
+                ('on_time_factor', models.FloatField()),
+                ('loan_count_factor', models.IntegerField()),
+                ('current_year_factor', models.IntegerField()),
+                ('volume_factor', models.FloatField()),
+                ('limit_breached', models.BooleanField()),
+                ('as_of', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_snapshots', to='core.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', '-as_of'], name='snapshot_customer_as_of_idx')],
+            },
+        ),
+    ]
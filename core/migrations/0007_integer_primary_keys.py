@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_renumber_non_numeric_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='customer_id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='loan_id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
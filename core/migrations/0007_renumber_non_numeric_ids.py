@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+def _numeric_top(model):
+    return max((int(pk) for pk in model.objects.values_list('pk', flat=True) if pk.isdigit()), default=0)
+
+
+def renumber_non_numeric_ids(apps, schema_editor):
+    # Rows registered before ids were allocated got an empty primary key; give them (and any
+    # other non-numeric key) the next free numbers so the columns can be cast to integers
+    Customer = apps.get_model('core', 'Customer')
+    Loan = apps.get_model('core', 'Loan')
+    related = [apps.get_model('core', name) for name in ('CustomerLoanSummary', 'CustomerCreditScore')]
+    CreditScoreSnapshot = apps.get_model('core', 'CreditScoreSnapshot')
+
+    next_loan_id = _numeric_top(Loan) + 1
+    for loan_id in [pk for pk in Loan.objects.values_list('pk', flat=True) if not pk.isdigit()]:
+        Loan.objects.filter(pk=loan_id).update(loan_id=str(next_loan_id))
+        next_loan_id += 1
+
+    next_customer_id = _numeric_top(Customer) + 1
+    for customer in [customer for customer in Customer.objects.all() if not customer.pk.isdigit()]:
+        old_id = customer.pk
+        customer.pk = str(next_customer_id)
+        customer.save(force_insert=True)
+        Loan.objects.filter(customer_id=old_id).update(customer_id=customer.pk)
+        CreditScoreSnapshot.objects.filter(customer_id=old_id).update(customer_id=customer.pk)
+        for model in related:  # Derived rows, rebuilt on next use
+            model.objects.filter(customer_id=old_id).delete()
+        Customer.objects.filter(pk=old_id).delete()
+        next_customer_id += 1
+
+
+class Migration(migrations.Migration):
+    # Runs in its own transaction: on PostgreSQL the foreign key checks it defers must fire
+    # before 0007_integer_primary_keys alters the key columns
+
+    dependencies = [
+        ('core', '0006_creditscoresnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_non_numeric_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_integer_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerArchivedTotals',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archived_totals', serialize=False, to='core.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('tenure_sum', models.IntegerField(default=0)),
+                ('on_time_emi_sum', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanArchive',
+            fields=[
+                ('loan_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('tenure', models.IntegerField()),
+                ('interest_rate', models.FloatField()),
+                ('monthly_payment', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('emis_paid_on_time', models.IntegerField()),
+                ('date_of_approval', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_on', models.DateField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='core.customer')),
+            ],
+        ),
+    ]
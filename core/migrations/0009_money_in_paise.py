@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:05
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Round
+
+# (model, old rupee column, new paise column)
+MONEY_COLUMNS = [
+    ('CustomerLoanSummary', 'total_volume', 'total_volume_paise'),
+    ('CustomerLoanSummary', 'active_principal', 'active_principal_paise'),
+    ('CustomerLoanSummary', 'active_emi', 'active_emi_paise'),
+    ('CustomerArchivedTotals', 'total_volume', 'total_volume_paise'),
+]
+
+
+def copy_to_paise(apps, schema_editor):
+    # One UPDATE per column: paise = ROUND(rupees * 100)
+    for model_name, rupees, paise in MONEY_COLUMNS:
+        apps.get_model('core', model_name).objects.update(
+            **{paise: Cast(Round(models.F(rupees) * 100), models.BigIntegerField())}
+        )
+
+
+def copy_to_rupees(apps, schema_editor):
+    for model_name, rupees, paise in MONEY_COLUMNS:
+        apps.get_model('core', model_name).objects.update(
+            **{rupees: Cast(models.F(paise), models.DecimalField(max_digits=17, decimal_places=2)) / 100}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_loan_archive'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name.lower(),
+                name=paise,
+                field=models.BigIntegerField(default=0),
+            )
+            for model_name, _, paise in MONEY_COLUMNS
+        ],
+        migrations.RunPython(copy_to_paise, copy_to_rupees),
+        *[
+            migrations.RemoveField(
+                model_name=model_name.lower(),
+                name=rupees,
+            )
+            for model_name, rupees, _ in MONEY_COLUMNS
+        ],
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+def keep_latest_snapshot_per_day(apps, schema_editor):
+    # Earlier runs could snapshot a customer more than once a day; keep the newest of each day
+    CreditScoreSnapshot = apps.get_model('core', 'CreditScoreSnapshot')
+    duplicated = (
+        CreditScoreSnapshot.objects.values('customer_id', 'as_of')
+        .annotate(count=models.Count('pk'), newest=models.Max('pk')).filter(count__gt=1)
+    )
+    for row in duplicated.iterator():
+        CreditScoreSnapshot.objects.filter(customer_id=row['customer_id'], as_of=row['as_of']).exclude(
+            pk=row['newest']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_money_in_paise'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_snapshot_per_day, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='creditscoresnapshot',
+            constraint=models.UniqueConstraint(fields=('customer', 'as_of'), name='snapshot_customer_day_unique'),
+        ),
+    ]
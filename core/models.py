@@ -1,7 +1,7 @@
 from django.db import models
 
 class Customer(models.Model):
-    customer_id = models.CharField(max_length=20, primary_key=True)  # Unique customer identifier
+    customer_id = models.BigIntegerField(primary_key=True)           # Unique customer identifier (see ids.allocate_id)
     first_name = models.CharField(max_length=50)                     # Customer's first name
     last_name = models.CharField(max_length=50)                      # Customer's last name
     age = models.IntegerField(null=True, blank=True)                 # Optional age field
@@ -11,7 +11,7 @@ class Customer(models.Model):
 
 class Loan(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="loans")  # Link to customer
-    loan_id = models.CharField(max_length=20, primary_key=True)                             # Unique loan identifier
+    loan_id = models.BigIntegerField(primary_key=True)                                      # Unique loan identifier (see ids.allocate_id)
     loan_amount = models.DecimalField(max_digits=12, decimal_places=2)                      # Total loan amount
     tenure = models.IntegerField()                                                          # Loan duration in months
     interest_rate = models.FloatField()                                                     # Annual interest rate
@@ -19,3 +19,93 @@ class Loan(models.Model):
     emis_paid_on_time = models.IntegerField()                                               # Count of EMIs paid on time
     date_of_approval = models.DateField()                                                   # Date when loan was approved
     end_date = models.DateField()                                                           # Date when loan ends
+
+    class Meta:
+        indexes = [
+            # Active-loan sums: customer + end_date range, with the summed columns in the key so
+            # the aggregate is answered from the index alone
+            models.Index(fields=['customer', 'end_date', 'loan_amount', 'monthly_payment'],
+                         name='loan_customer_active_idx'),
+            # Current-year activity: customer + date_of_approval range
+            models.Index(fields=['customer', 'date_of_approval'], name='loan_customer_approval_idx'),
+        ]
+
+class LoanArchive(models.Model):
+    # Loans moved out of Loan by core.archive once they ended long enough ago; same columns
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="archived_loans")  # Link to customer
+    loan_id = models.BigIntegerField(primary_key=True)                                      # Id the loan had in Loan
+    loan_amount = models.DecimalField(max_digits=12, decimal_places=2)                      # Total loan amount
+    tenure = models.IntegerField()                                                          # Loan duration in months
+    interest_rate = models.FloatField()                                                     # Annual interest rate
+    monthly_payment = models.DecimalField(max_digits=12, decimal_places=2)                  # EMI that was paid monthly
+    emis_paid_on_time = models.IntegerField()                                               # Count of EMIs paid on time
+    date_of_approval = models.DateField()                                                   # Date when loan was approved
+    end_date = models.DateField()                                                           # Date when loan ended
+    archived_on = models.DateField()                                                        # Day the loan was archived
+
+class CustomerArchivedTotals(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True,
+                                    related_name="archived_totals")                       # One totals row per customer
+    loan_count = models.IntegerField(default=0)                                             # Number of archived loans
+    tenure_sum = models.IntegerField(default=0)                                             # Sum of their tenures
+    on_time_emi_sum = models.IntegerField(default=0)                                        # Sum of their EMIs paid on time
+    total_volume_paise = models.BigIntegerField(default=0)                                  # Sum of their loan amounts (paise)
+
+class CustomerLoanSummary(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True,
+                                    related_name="loan_summary")                          # One summary row per customer
+    loan_count = models.IntegerField(default=0)                                             # Number of loans ever taken (archived included)
+    tenure_sum = models.IntegerField(default=0)                                             # Sum of tenures (total EMIs)
+    on_time_emi_sum = models.IntegerField(default=0)                                        # Sum of EMIs paid on time
+    total_volume_paise = models.BigIntegerField(default=0)                                  # Sum of all loan amounts (paise)
+    active_principal_paise = models.BigIntegerField(default=0)                              # Principal of running loans (paise)
+    active_emi_paise = models.BigIntegerField(default=0)                                    # EMIs of running loans (paise)
+    current_year_count = models.IntegerField(default=0)                                     # Loans approved in as_of's year
+    as_of = models.DateField()                                                              # Day the active/current-year figures were computed for
+    next_expiry = models.DateField(null=True, blank=True)                                   # Earliest end_date among running loans
+
+    def is_current(self, today):
+        # Figures stay exact until a running loan passes its end_date or the year changes
+        return (
+            self.as_of <= today
+            and self.as_of.year == today.year
+            and (self.next_expiry is None or self.next_expiry >= today)
+        )
+
+class IdSequence(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)                               # Model label the ids are minted for
+    next_value = models.BigIntegerField()                                                   # Next id to hand out
+
+class CustomerCreditScore(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True,
+                                    related_name="credit_score")                          # Latest snapshot's score per customer
+    credit_score = models.IntegerField()                                                    # Score from the latest snapshot
+    scored_on = models.DateField()                                                          # Day the score was computed for
+    valid_until = models.DateField(null=True)                                               # Last day it holds without loan changes
+
+    def is_current(self, today):
+        # Loan and limit changes delete the row; otherwise the score holds until a running
+        # loan passes its end_date or the year (current-year activity) changes
+        return self.valid_until is not None and self.scored_on <= today <= self.valid_until
+
+class CreditScoreSnapshot(models.Model):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE,
+                                 related_name="score_snapshots")                          # Score history per customer
+    credit_score = models.IntegerField()                                                    # Final score (0-100)
+    on_time_factor = models.FloatField()                                                    # On-time EMI ratio x 30, max 30
+    loan_count_factor = models.IntegerField()                                               # 20 minus loans ever taken, 0-20
+    current_year_factor = models.IntegerField()                                             # 4 per loan approved this year, max 20
+    volume_factor = models.FloatField()                                                     # 30 minus volume/limit x 30, 0-30
+    limit_breached = models.BooleanField()                                                  # Running principal over the limit (score 0)
+    as_of = models.DateField()                                                              # Day the score was computed for
+    created_at = models.DateTimeField(auto_now_add=True)                                    # When the snapshot was taken
+
+    class Meta:
+        indexes = [
+            # A customer's history, newest first
+            models.Index(fields=['customer', '-as_of'], name='snapshot_customer_as_of_idx'),
+        ]
+        constraints = [
+            # One snapshot per customer and day: a re-run or a same-day re-score overwrites it
+            models.UniqueConstraint(fields=['customer', 'as_of'], name='snapshot_customer_day_unique'),
+        ]
@@ -0,0 +1,52 @@
+# Money in the scoring hot path is plain integer paise (1 rupee = 100 paise): sums, EMI burden
+# and limit checks are exact integer arithmetic, with no Decimal objects built per request.
+# Rupee amounts are converted at the edges only: to_paise for model/request values,
+# to_rupees for response bodies, and paise()/sum_paise() let the database do it in SQL.
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import models
+from django.db.models.functions import Cast, Round
+
+PAISE_PER_RUPEE = 100
+
+_CENT = Decimal('0.01')
+
+
+def to_paise(amount):
+    # Exact paise of a rupee amount (Decimal, int, float or numeric string), rounded to the
+    # paisa the way Django stores a DecimalField with 2 decimal places
+    if isinstance(amount, int):
+        return amount * PAISE_PER_RUPEE
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(amount.quantize(_CENT, rounding=ROUND_HALF_EVEN) * PAISE_PER_RUPEE)
+
+
+def to_rupees(paise):
+    # Float rupees for responses; the same float as float() of the 2-decimal Decimal
+    return paise / PAISE_PER_RUPEE
+
+
+def paise(field):
+    # Money column as exact integer paise, converted in SQL so no Decimal objects are built
+    return Cast(Round(models.F(field) * PAISE_PER_RUPEE), models.BigIntegerField())
+
+
+def sum_paise(field, **kwargs):
+    # SUM of a money column in paise. The outer cast keeps it an integer on Postgres, where
+    # SUM(bigint) is numeric.
+    return Cast(models.Sum(paise(field), **kwargs), models.BigIntegerField())
+
+
+def customer_paise_annotations():
+    # Salary and approved limit in paise, for Customer queries feeding eligibility checks
+    return {'salary_paise': paise('monthly_salary'), 'limit_paise': paise('approved_limit')}
+
+
+def customer_paise(customer):
+    # (monthly salary, approved limit) in paise, from the customer_paise_annotations() columns
+    # when the customer was loaded with them
+    try:
+        return customer.salary_paise, customer.limit_paise
+    except AttributeError:
+        return to_paise(customer.monthly_salary), to_paise(customer.approved_limit)
@@ -0,0 +1,82 @@
+import json
+
+from django.db.models import BooleanField, Q, Value
+from rest_framework.utils.urls import replace_query_param
+
+from .archive import live_or_archived
+from .models import LoanArchive
+
+# Only the columns the loan list needs are selected
+LOAN_LIST_FIELDS = ('loan_id', 'loan_amount', 'interest_rate', 'monthly_payment', 'tenure', 'emis_paid_on_time')
+
+STREAM_CHUNK_SIZE = 2000
+STREAM_CONTENT_TYPE = 'application/x-ndjson'
+
+# Cursors of pages that ended among the archived loans carry this prefix
+ARCHIVED_CURSOR_PREFIX = 'a'
+
+
+def loan_list_item(row):
+    # One view-loans entry from a values() row
+    return {
+        "loan_id": row['loan_id'],
+        "loan_amount": float(row['loan_amount']),
+        "interest_rate": row['interest_rate'],
+        "monthly_installment": float(row['monthly_payment']),
+        "repayments_left": max(0, row['tenure'] - row['emis_paid_on_time'])
+    }
+
+
+def customer_loans(customer_id, cursor=None, using=None):
+    # Keyset-ordered loans of one customer, live loans by loan_id then archived ones, starting
+    # after the cursor (one query either way)
+    if cursor is not None and cursor.startswith(ARCHIVED_CURSOR_PREFIX):
+        return (
+            LoanArchive.objects.using(using)
+            .filter(customer_id=customer_id, loan_id__gt=int(cursor[len(ARCHIVED_CURSOR_PREFIX):]))
+            .order_by('loan_id').values(*LOAN_LIST_FIELDS, archived=Value(True, output_field=BooleanField()))
+        )
+    loans = Q(customer_id=customer_id)
+    live = loans if cursor is None else loans & Q(loan_id__gt=int(cursor))
+    # Archived loans are listed from the start once the live ones run out
+    return live_or_archived(LOAN_LIST_FIELDS, live, loans, using)
+
+
+def page_from_rows(rows, limit):
+    # Returns (items, next cursor or None); rows holds up to limit + 1 rows, the extra one
+    # only tells whether another page exists
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = f"{ARCHIVED_CURSOR_PREFIX if last['archived'] else ''}{last['loan_id']}"
+    return [loan_list_item(row) for row in rows[:limit]], next_cursor
+
+
+def loan_page(customer_id, cursor=None, limit=500):
+    rows = list(customer_loans(customer_id, cursor)[:limit + 1])
+    return page_from_rows(rows, limit)
+
+
+async def aloan_page(customer_id, cursor=None, limit=500):
+    rows = [row async for row in customer_loans(customer_id, cursor)[:limit + 1]]
+    return page_from_rows(rows, limit)
+
+
+def loan_lines(customer_id, cursor=None, using=None):
+    # JSON lines for every loan after the cursor, fetched chunk by chunk so memory stays flat.
+    # The body is read after the view returns, so the database alias is passed explicitly.
+    for row in customer_loans(customer_id, cursor, using).iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield json.dumps(loan_list_item(row)) + '\n'
+
+
+async def aloan_lines(customer_id, cursor=None, using=None):
+    async for row in customer_loans(customer_id, cursor, using).aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield json.dumps(loan_list_item(row)) + '\n'
+
+
+def next_page_headers(request, next_cursor):
+    # Link / X-Next-Cursor headers pointing at the next keyset page (none on the last page)
+    if next_cursor is None:
+        return {}
+    next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+    return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": next_cursor}
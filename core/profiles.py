@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Customer
+from .money import customer_paise, customer_paise_annotations
+from .snapshots import latest_credit_score
+from .summaries import get_loan_stats, read_loan_summaries, rebuild_loan_summaries, summary_stats
+from .utils import credit_score_from_stats
+
+# Versioned with the profile layout (v2: money in paise) so old cached entries are never read
+KEY_PREFIX = 'credit-profile-v2'
+
+_counter_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+class CreditProfile:
+    """Everything the loan endpoints need about a customer: the row, loan stats and score."""
+
+    def __init__(self, customer, stats):
+        self.customer = customer
+        self.stats = stats
+        # The latest snapshot's score while it holds, otherwise computed from the stats
+        self.credit_score = latest_credit_score(customer)
+        if self.credit_score is None:
+            self.credit_score = credit_score_from_stats(customer_paise(customer)[1], stats)
+
+
+def _today():
+    return datetime.now().date()
+
+
+def _count(name, amount=1):
+    with _counter_lock:
+        _counters[name] += amount
+
+
+def cache_stats():
+    # Process-local hit/miss/invalidation counters
+    with _counter_lock:
+        return dict(_counters)
+
+
+def reset_cache_stats():
+    with _counter_lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def profile_key(customer_id, day=None):
+    # "Active" loans depend on today's date, so the date is part of the key
+    return f"{KEY_PREFIX}:{(day or _today()).isoformat()}:{customer_id}"
+
+
+def _timeout():
+    # Entries never outlive the day they were computed for
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, min(settings.CREDIT_PROFILE_CACHE_TIMEOUT, int((midnight - now).total_seconds())))
+
+
+def load_credit_profiles(customer_ids):
+    # Builds profiles from the DB: customers joined to their summary and latest score rows in
+    # one query, salary and limit read as paise (stale or missing summaries cost one extra
+    # aggregate and upsert)
+    customers = Customer.objects.select_related('loan_summary', 'credit_score').annotate(
+        **customer_paise_annotations()
+    ).in_bulk(customer_ids)
+    stats_by_customer = get_loan_stats(customers.values())
+    return {pk: CreditProfile(customer, stats_by_customer[pk]) for pk, customer in customers.items()}
+
+
+def get_credit_profiles(customer_ids):
+    # Cached profiles keyed by customer pk; unknown customers are left out
+    to_pk = Customer._meta.pk.to_python
+    customer_ids = {to_pk(customer_id) for customer_id in customer_ids}
+    day = _today()
+    keys = {profile_key(customer_id, day): customer_id for customer_id in customer_ids}
+
+    cached = cache.get_many(keys.keys())
+    profiles = {keys[key]: profile for key, profile in cached.items()}
+    missing = customer_ids - profiles.keys()
+    _count('hits', len(profiles))
+    _count('misses', len(missing))
+
+    if missing:
+        loaded = load_credit_profiles(missing)
+        cache.set_many(
+            {profile_key(customer_id, day): profile for customer_id, profile in loaded.items()},
+            timeout=_timeout()
+        )
+        profiles.update(loaded)
+    return profiles
+
+
+async def aload_credit_profiles(customer_ids):
+    # Async twin of load_credit_profiles: the customer/summary join runs on the async ORM and
+    # only stale summaries fall back to the (transactional, sync) rebuild
+    customers = {
+        customer.pk: customer
+        async for customer in Customer.objects.select_related('loan_summary', 'credit_score').annotate(
+            **customer_paise_annotations()
+        ).filter(pk__in=customer_ids)
+    }
+    stats_by_customer, stale = read_loan_summaries(customers.values())
+    if stale:
+        rebuilt = await sync_to_async(rebuild_loan_summaries)(stale)
+        stats_by_customer.update((pk, summary_stats(summary)) for pk, summary in rebuilt.items())
+    return {pk: CreditProfile(customer, stats_by_customer[pk]) for pk, customer in customers.items()}
+
+
+async def aget_credit_profiles(customer_ids):
+    # Async version of get_credit_profiles, same keys and counters
+    to_pk = Customer._meta.pk.to_python
+    customer_ids = {to_pk(customer_id) for customer_id in customer_ids}
+    day = _today()
+    keys = {profile_key(customer_id, day): customer_id for customer_id in customer_ids}
+
+    cached = await cache.aget_many(keys.keys())
+    profiles = {keys[key]: profile for key, profile in cached.items()}
+    missing = customer_ids - profiles.keys()
+    _count('hits', len(profiles))
+    _count('misses', len(missing))
+
+    if missing:
+        loaded = await aload_credit_profiles(missing)
+        await cache.aset_many(
+            {profile_key(customer_id, day): profile for customer_id, profile in loaded.items()},
+            timeout=_timeout()
+        )
+        profiles.update(loaded)
+    return profiles
+
+
+def get_credit_profile(customer_id):
+    # Single-customer lookup, None when the customer doesn't exist
+    return get_credit_profiles([customer_id]).get(Customer._meta.pk.to_python(customer_id))
+
+
+async def aget_credit_profile(customer_id):
+    return (await aget_credit_profiles([customer_id])).get(Customer._meta.pk.to_python(customer_id))
+
+
+def invalidate_credit_profiles(customer_ids):
+    # Drops today's cached profiles for these customers (older days are already unreachable)
+    day = _today()
+    keys = [profile_key(customer_id, day) for customer_id in customer_ids]
+    if keys:
+        cache.delete_many(keys)
+        _count('invalidations', len(keys))
+
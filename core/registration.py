@@ -0,0 +1,42 @@
+from django.db import transaction
+
+from .fast_serializers import validate_register
+from .ids import reserve_ids
+from .models import Customer
+from .serializers import approved_limit_for
+from .summaries import create_empty_summaries
+
+# Customers inserted per transaction by bulk registration
+REGISTER_BATCH_SIZE = 2000
+
+
+def register_customers(items, batch_size=REGISTER_BATCH_SIZE):
+    # Bulk registration: every item is validated like a single register call, then the valid
+    # ones get a reserved id range and are inserted with bulk_create, batch_size customers
+    # (plus their empty summary rows) per transaction. Returns, in input order, the created
+    # Customer or the item's serializer errors.
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        data, errors = validate_register(item)
+        if errors:
+            results[index] = errors
+        else:
+            valid.append((index, data))
+    if not valid:
+        return results
+
+    ids = reserve_ids(Customer, len(valid))  # one round trip for the whole request
+    for start in range(0, len(valid), batch_size):
+        batch = []
+        for (index, data), customer_id in zip(valid[start:start + batch_size], ids[start:start + batch_size]):
+            customer = Customer(
+                customer_id=customer_id, approved_limit=approved_limit_for(data.monthly_salary), **data.as_dict()
+            )
+            results[index] = customer
+            batch.append(customer)
+        # bulk_create skips the post_save signal, so the summaries are created here
+        with transaction.atomic():
+            Customer.objects.bulk_create(batch)
+            create_empty_summaries(customer.pk for customer in batch)
+    return results
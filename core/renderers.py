@@ -0,0 +1,38 @@
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: everything falls back to the stdlib json encoder
+    orjson = None
+
+_encoder = JSONEncoder()
+
+# Dates go through DRF's encoder so they render exactly as before
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def dumps(data):
+    # Compact UTF-8 JSON bytes, same output as JSONRenderer for API payloads
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # e.g. integers beyond 64 bits; let the stdlib encoder handle them
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+    Indented output (`Accept: application/json; indent=4`) still uses the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+# Renderers for the hot endpoints: fast JSON first, the browsable API kept for humans
+FAST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
@@ -0,0 +1,321 @@
+# Replays a recorded request mix (one JSON request per line) at the WSGI or ASGI application
+# in-process, so a benchmark measures Django, the views and the database without a server or
+# network in the way. Reports throughput, latency percentiles and DB queries per request
+# (read back from the Server-Timing header set by PerformanceMiddleware).
+import asyncio
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from asgiref.sync import async_to_sync
+
+from .models import Customer
+
+# Endpoint -> default share of the mix
+DEFAULT_MIX = {
+    'register': 1,
+    'check-eligibility': 6,
+    'create-loan': 1,
+    'view-loans': 2,
+}
+
+# Endpoints with an async/ twin (see async_views)
+ASYNC_ENDPOINTS = {'check-eligibility', 'create-loan', 'view-loan', 'view-loans'}
+
+API_PREFIX = '/api/'
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def parse_mix(text):
+    # "register=1,check-eligibility=6" -> {'register': 1, 'check-eligibility': 6}
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint {name!r}; pick from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def generate_request_mix(count, mix=None, seed=0, samples=10000):
+    # count request dicts ({name, method, path, body}) drawn from mix, against up to samples
+    # random customers already in the database. Amounts, tenures and rates follow loan_data.xlsx.
+    mix = mix or DEFAULT_MIX
+    rng = np.random.default_rng(seed)
+    customer_ids = list(Customer.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=20000))
+    if not customer_ids and set(mix) != {'register'}:
+        raise ValueError('No customers in the database to build requests from')
+    if len(customer_ids) > samples:
+        customer_ids = rng.choice(customer_ids, size=samples, replace=False).tolist()
+
+    names = list(mix)
+    weights = np.array([mix[name] for name in names], dtype=float)
+    picks = rng.choice(len(names), size=count, p=weights / weights.sum())
+    owners = rng.choice(customer_ids or [0], size=count).tolist()
+    amounts = (np.round(rng.uniform(1, 10, size=count)) * 100000).astype(int).tolist()
+    tenures = (rng.integers(2, 21, size=count) * 3).tolist()
+    rates = np.round(rng.uniform(8.0, 18.0, size=count), 2).tolist()
+    incomes = (rng.integers(30, 301, size=count) * 1000).tolist()
+    ages = rng.integers(20, 71, size=count).tolist()
+
+    requests = []
+    for index, pick in enumerate(picks):
+        name = names[pick]
+        if name == 'register':
+            request = ('POST', 'register', {
+                'first_name': f'Replay{index}', 'last_name': 'Customer', 'age': ages[index],
+                'monthly_income': incomes[index], 'phone_number': 9000000000 + index,
+            })
+        elif name == 'view-loans':
+            request = ('GET', f'view-loans/{owners[index]}', None)
+        else:
+            request = ('POST', name, {
+                'customer_id': owners[index], 'loan_amount': amounts[index],
+                'interest_rate': rates[index], 'tenure': tenures[index],
+            })
+        method, path, body = request
+        requests.append({'name': name, 'method': method, 'path': API_PREFIX + path, 'body': body})
+    return requests
+
+
+def write_request_mix(path, requests):
+    with open(path, 'w') as handle:
+        for request in requests:
+            handle.write(json.dumps(request) + '\n')
+
+
+def load_request_mix(path):
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def async_twin(request):
+    # The same request aimed at the endpoint's async/ twin, when it has one
+    if request['name'] not in ASYNC_ENDPOINTS:
+        return request
+    return dict(request, path=request['path'].replace(API_PREFIX, API_PREFIX + 'async/', 1))
+
+
+class EndpointStats:
+    """Latencies, statuses and query counts of one endpoint's requests."""
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.statuses = {}
+
+    def add(self, status, elapsed, queries):
+        self.latencies.append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if queries is not None:
+            self.queries.append(queries)
+
+    @property
+    def errors(self):
+        return sum(count for status, count in self.statuses.items() if status >= 500)
+
+    def summary(self, wall):
+        latencies = np.sort(np.array(self.latencies)) * 1000
+        percentile = lambda p: float(latencies[min(len(latencies) - 1, int(p * len(latencies)))])
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'requests_per_second': len(latencies) / wall if wall else 0.0,
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'max_ms': float(latencies[-1]),
+            'queries_per_request': float(np.mean(self.queries)) if self.queries else None,
+        }
+
+
+class ReplayStats:
+    """Per-endpoint results of one replay run."""
+
+    def __init__(self, app, concurrency):
+        self.app = app
+        self.concurrency = concurrency
+        self.endpoints = {}
+        self.total = EndpointStats()
+        self.wall = 0.0
+
+    def add(self, name, status, elapsed, headers):
+        match = _QUERIES.search(headers.get('server-timing', ''))
+        queries = int(match.group(1)) if match else None
+        self.endpoints.setdefault(name, EndpointStats()).add(status, elapsed, queries)
+        self.total.add(status, elapsed, queries)
+
+    def summary(self):
+        results = {name: stats.summary(self.wall) for name, stats in sorted(self.endpoints.items())}
+        results['all'] = self.total.summary(self.wall)
+        return results
+
+    def report(self):
+        # Text table, one row per endpoint plus the total
+        lines = [
+            f"{self.app.upper()} app, concurrency {self.concurrency}: "
+            f"{len(self.total.latencies)} requests in {self.wall:.2f}s",
+            f"  {'endpoint':<20}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p90 ms':>9}"
+            f"{'p99 ms':>9}{'max ms':>9}{'queries':>9}",
+        ]
+        for name, row in self.summary().items():
+            queries = row['queries_per_request']
+            lines.append(
+                f"  {name:<20}{row['requests']:>9}{row['errors']:>8}{row['requests_per_second']:>10,.0f}"
+                f"{row['p50_ms']:>9.2f}{row['p90_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['max_ms']:>9.2f}"
+                f"{'-' if queries is None else f'{queries:.1f}':>9}"
+            )
+        return '\n'.join(lines)
+
+
+def _split_path(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+def _body(request):
+    return b'' if request.get('body') is None else json.dumps(request['body']).encode()
+
+
+def _call_wsgi(application, request):
+    # One request through the WSGI callable; returns (status, lower-cased headers, seconds)
+    body = _body(request)
+    path, query = _split_path(request['path'])
+    environ = {
+        'REQUEST_METHOD': request['method'],
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = {name.lower(): value for name, value in headers}
+
+    started = time.perf_counter()
+    chunks = application(environ, start_response)
+    try:
+        for _ in chunks:
+            pass
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()   # fires request_finished, like a real server
+    return response['status'], response['headers'], time.perf_counter() - started
+
+
+async def _call_asgi(application, request):
+    # One request through the ASGI callable; returns (status, lower-cased headers, seconds)
+    body = _body(request)
+    path, query = _split_path(request['path'])
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': request['method'],
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    response = {}
+    done = asyncio.Event()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # Django listens for a disconnect while the view runs; the client only leaves once answered
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {name.decode().lower(): value.decode() for name, value in message['headers']}
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    done.set()
+    return response['status'], response['headers'], time.perf_counter() - started
+
+
+def replay_wsgi(requests, concurrency=1, application=None):
+    # Fires requests at the WSGI app from concurrency threads (inline when 1)
+    if application is None:
+        from django.core.wsgi import get_wsgi_application
+        application = get_wsgi_application()
+    stats = ReplayStats('wsgi', concurrency)
+
+    def run(request):
+        return request['name'], _call_wsgi(application, request)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        for name, (status, headers, elapsed) in map(run, requests):
+            stats.add(name, status, elapsed, headers)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, (status, headers, elapsed) in pool.map(run, requests):
+                stats.add(name, status, elapsed, headers)
+    stats.wall = time.perf_counter() - started
+    return stats
+
+
+async def _replay_asgi(application, requests, stats):
+    pending = iter(requests)
+
+    async def worker():
+        for request in pending:
+            status, headers, elapsed = await _call_asgi(application, request)
+            stats.add(request['name'], status, elapsed, headers)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(stats.concurrency)))
+    stats.wall = time.perf_counter() - started
+
+
+def replay_asgi(requests, concurrency=1, application=None, async_endpoints=False):
+    # Fires requests at the ASGI app from concurrency tasks on one event loop. Run through
+    # async_to_sync so the sync views' thread-sensitive work stays on this thread, like a
+    # single uvicorn worker. async_endpoints sends requests to the async/ twins.
+    if application is None:
+        from django.core.asgi import get_asgi_application
+        application = get_asgi_application()
+    if async_endpoints:
+        requests = [async_twin(request) for request in requests]
+    stats = ReplayStats('asgi (async endpoints)' if async_endpoints else 'asgi', concurrency)
+    async_to_sync(_replay_asgi)(application, requests, stats)
+    return stats
@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from multiprocessing import get_context
+
+import django
+from django.db import connections
+
+from .models import Customer
+from .snapshots import refresh_credit_scores, snapshot_credit_scores
+
+DEFAULT_RANGE_SIZE = 5000
+
+
+def _today():
+    return datetime.now().date()
+
+
+class RescoreStats:
+    """Customer/range counters and timing for one re-scoring run."""
+
+    def __init__(self, ranges, workers):
+        self.ranges = ranges
+        self.workers = workers
+        self.resumed = 0        # Ranges already done by an earlier, interrupted run
+        self.completed = 0
+        self.scored = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def customers_per_second(self):
+        return self.scored / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"Scored {self.scored} customers in {self.completed} ranges with {self.workers} worker(s) "
+            f"in {self.elapsed:.2f}s ({self.customers_per_second:,.0f} customers/sec)"
+        )
+
+
+class CheckpointMismatch(ValueError):
+    """Raised when a saved checkpoint belongs to a run with other options than the one resuming it."""
+
+
+class Checkpoint:
+    """
+    Progress of a re-scoring run, kept in a JSON file: the day being scored, the run's options
+    (mode, range size), the id ranges and the ranges already written. It is rewritten after
+    every finished range, so a killed run picks up where it stopped, and removed once the run
+    completes.
+    """
+
+    def __init__(self, path, scored_on, ranges, done=(), incremental=False, range_size=None):
+        self.path = path
+        self.scored_on = scored_on
+        self.incremental = incremental
+        self.range_size = range_size
+        self.ranges = [tuple(id_range) for id_range in ranges]
+        self.done = {tuple(id_range) for id_range in done}
+
+    @classmethod
+    def load(cls, path):
+        # The saved run, or None when there is nothing to resume
+        try:
+            with open(path) as handle:
+                state = json.load(handle)
+        except FileNotFoundError:
+            return None
+        return cls(
+            path, date.fromisoformat(state['scored_on']), state['ranges'], state['done'],
+            state.get('incremental', False), state.get('range_size')
+        )
+
+    def save(self):
+        # Write-then-rename, so a crash mid-write never leaves a truncated checkpoint
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump({
+                'scored_on': self.scored_on.isoformat(),
+                'incremental': self.incremental,
+                'range_size': self.range_size,
+                'ranges': self.ranges,
+                'done': [id_range for id_range in self.ranges if id_range in self.done],
+            }, handle)
+        os.replace(temporary, self.path)
+
+    def check_options(self, incremental, range_size):
+        # Resuming is only safe with the options the run started with
+        saved = {'--incremental': self.incremental, '--range-size': self.range_size}
+        requested = {'--incremental': incremental, '--range-size': range_size}
+        differing = [
+            option for option in saved
+            if saved[option] is not None and saved[option] != requested[option]
+        ]
+        if differing:
+            raise CheckpointMismatch(
+                f"{self.path} belongs to a run with other options "
+                f"({', '.join(f'{option} {saved[option]}' for option in differing)}); rerun with the "
+                "same options to resume it, or pass --restart to start a new run"
+            )
+
+    def mark_done(self, id_range):
+        self.done.add(tuple(id_range))
+        self.save()
+
+    def pending(self):
+        return [id_range for id_range in self.ranges if id_range not in self.done]
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def customer_id_ranges(range_size=DEFAULT_RANGE_SIZE):
+    # Consecutive (low, high] customer id ranges of range_size customers each, from one
+    # streamed pk scan. The last range is open-ended so customers registered after the
+    # split (e.g. before a resume) are still scored.
+    ranges, low = [], None
+    ids = Customer.objects.order_by('customer_id').values_list('customer_id', flat=True)
+    for position, customer_id in enumerate(ids.iterator(chunk_size=20000), start=1):
+        if position % range_size == 0:
+            ranges.append((low, customer_id))
+            low = customer_id
+    ranges.append((low, None))
+    return ranges
+
+
+def score_range(id_range, today=None, incremental=False):
+    # Snapshots every customer in one id range (a few range queries, bulk writes), or only
+    # the stale ones when incremental. Returns the number of customers scored.
+    if incremental:
+        return refresh_credit_scores(today, id_range)
+    return snapshot_credit_scores(today, id_range=id_range)
+
+
+def _score_range_task(id_range, today, incremental):
+    return id_range, score_range(id_range, today, incremental)
+
+
+def rescore_customers(checkpoint_path, workers=None, range_size=DEFAULT_RANGE_SIZE, restart=False,
+                      today=None, incremental=False, on_range_done=None):
+    # Snapshots the whole customer base (or only its stale customers when incremental), one id
+    # range per task, resuming a saved checkpoint unless restart is set (raises
+    # CheckpointMismatch if it was saved with other options). workers=1 scores in this process;
+    # more spawns a process pool.
+    # on_range_done(stats, id_range, count) is called after each range is written.
+    workers = workers or os.cpu_count() or 1
+    checkpoint = None if restart else Checkpoint.load(checkpoint_path)
+    if checkpoint is None:
+        today = today or _today()
+        checkpoint = Checkpoint(
+            checkpoint_path, today, customer_id_ranges(range_size), incremental=incremental, range_size=range_size
+        )
+        checkpoint.save()
+    else:
+        checkpoint.check_options(incremental, range_size)
+
+    pending = checkpoint.pending()
+    stats = RescoreStats(len(checkpoint.ranges), workers)
+    stats.resumed = len(checkpoint.ranges) - len(pending)
+
+    def finished(id_range, count):
+        checkpoint.mark_done(id_range)
+        stats.completed += 1
+        stats.scored += count
+        if on_range_done:
+            on_range_done(stats, id_range, count)
+
+    if workers == 1:
+        for id_range in pending:
+            finished(*_score_range_task(id_range, checkpoint.scored_on, checkpoint.incremental))
+    else:
+        # Workers are spawned, not forked, so no connection is shared with them: each runs
+        # django.setup() and opens its own database connection, kept for all its ranges.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=django.setup) as pool:
+            futures = [
+                pool.submit(_score_range_task, id_range, checkpoint.scored_on, checkpoint.incremental)
+                for id_range in pending
+            ]
+            for future in as_completed(futures):
+                finished(*future.result())
+
+    checkpoint.remove()
+    return stats
@@ -0,0 +1,88 @@
+# Read-replica routing. Read-only endpoints wrap their work in replica_reads(), which picks
+# one replica per request (round-robin) for ReplicaRouter to send that request's reads to.
+# Everything else stays on the primary ('default'): writes, reads inside a transaction,
+# and reads for customers/loans written in the last REPLICA_PIN_SECONDS (read-your-writes
+# across replica lag).
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PREFIX = 'replica'
+
+# Replica alias serving the current request's reads, if any
+_replica = ContextVar('replica_alias', default=None)
+
+_round_robin = itertools.count()
+_round_robin_lock = threading.Lock()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def _pin_keys(customer_ids=(), loan_ids=()):
+    return (
+        [f"primary-pin:customer:{customer_id}" for customer_id in customer_ids]
+        + [f"primary-pin:loan:{loan_id}" for loan_id in loan_ids]
+    )
+
+
+def pin_to_primary(customer_ids=(), loan_ids=()):
+    # Called on writes: reads of these rows stay on the primary until replicas have caught up
+    if replica_aliases():
+        cache.set_many(dict.fromkeys(_pin_keys(customer_ids, loan_ids), True), timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def _next_replica():
+    replicas = replica_aliases()
+    if not replicas:
+        return None
+    with _round_robin_lock:
+        return replicas[next(_round_robin) % len(replicas)]
+
+
+@contextmanager
+def replica_reads(customer_ids=(), loan_ids=()):
+    # Routes reads in the block to the next replica, unless none is configured or one of the
+    # given rows was written recently. Yields the alias (None means the primary).
+    alias = _next_replica()
+    if alias is not None and cache.get_many(_pin_keys(customer_ids, loan_ids)):
+        alias = None
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+@asynccontextmanager
+async def areplica_reads(customer_ids=(), loan_ids=()):
+    alias = _next_replica()
+    if alias is not None and await cache.aget_many(_pin_keys(customer_ids, loan_ids)):
+        alias = None
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Sends reads made inside replica_reads() to that request's replica."""
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # primary; transactions read their own writes
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Same data on every alias
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from .models import Customer, Loan
 
+def approved_limit_for(monthly_salary):
+    return round(36 * monthly_salary, -5)  # Calculates and rounds limit to nearest lakh
+
 class CustomerRegisterSerializer(serializers.ModelSerializer):
     monthly_income = serializers.DecimalField(max_digits=12, decimal_places=2, source='monthly_salary')  # Maps to model field
     
@@ -9,9 +12,7 @@ class CustomerRegisterSerializer(serializers.ModelSerializer):
         fields = ['first_name', 'last_name', 'age', 'phone_number', 'monthly_income']
     
     def create(self, validated_data):
-        monthly_salary = validated_data['monthly_salary']
-        approved_limit = round(36 * monthly_salary, -5)  # Calculates and rounds limit to nearest lakh
-        validated_data['approved_limit'] = approved_limit
+        validated_data['approved_limit'] = approved_limit_for(validated_data['monthly_salary'])
         return Customer.objects.create(**validated_data)
 
 class CustomerResponseSerializer(serializers.ModelSerializer):
@@ -39,6 +40,19 @@ class CheckEligibilityResponseSerializer(serializers.Serializer):
     tenure = serializers.IntegerField()  # Tenure in months
     monthly_installment = serializers.DecimalField(max_digits=15, decimal_places=2)  # EMI value
 
+class LoanQuoteSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()  # ID of the customer asking for quotes
+    loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2)  # Requested loan amount
+    tenures = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=60)  # Tenures in months
+    interest_rates = serializers.ListField(child=serializers.FloatField(), min_length=1, max_length=60)  # Offered rates
+
+class LoanQuoteResponseSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()  # ID of the applicant
+    loan_amount = serializers.FloatField()  # Requested loan amount
+    tenures = serializers.ListField(child=serializers.IntegerField())  # Row labels of the grid
+    interest_rates = serializers.ListField(child=serializers.FloatField())  # Column labels of the grid
+    quotes = serializers.ListField(child=serializers.ListField(child=serializers.DictField()))  # quotes[tenure][rate]
+
 class CreateLoanSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()  # ID of loan applicant
     loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2)  # Requested amount
@@ -52,6 +66,11 @@ class CreateLoanResponseSerializer(serializers.Serializer):
     message = serializers.CharField()  # Status message
     monthly_installment = serializers.DecimalField(max_digits=15, decimal_places=2)  # EMI if approved
 
+class LoanPageSerializer(serializers.Serializer):
+    cursor = serializers.RegexField(r'^a?\d+$', required=False)  # Last loan_id of the previous page ('a' prefix: archived)
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=500)  # Loans per page
+    stream = serializers.BooleanField(default=False)  # Stream every remaining loan as JSON lines
+
 class LoanDetailSerializer(serializers.ModelSerializer):
     monthly_installment = serializers.DecimalField(max_digits=15, decimal_places=2)  # EMI value
     
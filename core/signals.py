@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .ids import allocate_id
+from .models import Customer, Loan
+from .profiles import invalidate_credit_profiles
+from .routers import pin_to_primary
+from .snapshots import discard_credit_score
+from .summaries import apply_new_loan, create_empty_summary, discard_loan_summary
+
+
+def _invalidate(customer_id):
+    # Drop now, and again after commit so a reader can't re-cache pre-commit data.
+    # Reads of the customer also stay on the primary until replicas have the change.
+    invalidate_credit_profiles([customer_id])
+    pin_to_primary(customer_ids=[customer_id])
+    transaction.on_commit(lambda: invalidate_credit_profiles([customer_id]))
+
+
+@receiver(pre_save, sender=Customer)
+@receiver(pre_save, sender=Loan)
+def assign_id(sender, instance, **kwargs):
+    # Rows created without a primary key (e.g. registration) get the next allocated id
+    if instance.pk is None:
+        instance.pk = allocate_id(sender)
+
+
+@receiver(post_save, sender=Loan)
+def loan_saved(sender, instance, created, **kwargs):
+    # New loans are folded into the summary row, edits force a rebuild
+    if created:
+        apply_new_loan(instance)
+    else:
+        discard_loan_summary(instance.customer_id)
+    discard_credit_score(instance.customer_id)
+    pin_to_primary(loan_ids=[instance.pk])
+    _invalidate(instance.customer_id)
+
+
+@receiver(post_delete, sender=Loan)
+def loan_deleted(sender, instance, **kwargs):
+    discard_loan_summary(instance.customer_id)
+    discard_credit_score(instance.customer_id)
+    _invalidate(instance.customer_id)
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, **kwargs):
+    if created:
+        create_empty_summary(instance.pk)
+    else:
+        discard_credit_score(instance.pk)  # the approved limit may have changed
+    _invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    _invalidate(instance.pk)
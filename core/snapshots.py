@@ -0,0 +1,132 @@
+from datetime import date, datetime
+
+from django.db import models, transaction
+
+from .analytics import (
+    customer_filter, load_archived_frame, load_customer_frame, load_loan_frame, score_components
+)
+from .models import CreditScoreSnapshot, Customer, CustomerCreditScore, Loan
+
+# Customers snapshotted per transaction by the incremental refresh
+SNAPSHOT_BATCH_SIZE = 900
+WRITE_BATCH_SIZE = 2000
+
+# Columns a same-day re-score overwrites in the day's snapshot
+SNAPSHOT_UPDATE_FIELDS = [
+    'credit_score', 'on_time_factor', 'loan_count_factor', 'current_year_factor', 'volume_factor',
+    'limit_breached', 'created_at',
+]
+
+
+def _today():
+    return datetime.now().date()
+
+
+def load_next_expiry(today, id_range=None, customer_ids=None):
+    # Earliest end_date among each customer's running loans (one grouped query)
+    rows = Loan.objects.filter(
+        customer_filter('customer_id', id_range, customer_ids), end_date__gte=today
+    ).values('customer_id').order_by().annotate(next_expiry=models.Min('end_date'))
+    return {row['customer_id']: row['next_expiry'] for row in rows}
+
+
+def snapshot_credit_scores(today=None, id_range=None, customer_ids=None):
+    # Scores the selected customers, records one CreditScoreSnapshot each (replacing that
+    # day's, if any) and points their CustomerCreditScore row at it. Returns the number of
+    # customers snapshotted.
+    #
+    # The customers are row-locked while their loans are read and the results written, so a
+    # loan created meanwhile by create-loan or moved by an archive run (which hold the same
+    # lock) can't be missed or counted twice by a score that is then recorded as valid.
+    today = today or _today()
+    year_end = date(today.year, 12, 31)
+    with transaction.atomic():
+        locked = Customer.objects.select_for_update().filter(customer_filter('pk', id_range, customer_ids))
+        locked_ids = list(locked.order_by().values_list('pk', flat=True))
+        if not locked_ids:
+            return 0
+        # A range stays a range scan; an id list is read back by id
+        scope = {'id_range': id_range} if customer_ids is None else {'customer_ids': locked_ids}
+        customers = load_customer_frame(**scope)
+        components = score_components(
+            customers, load_loan_frame(today, **scope), load_archived_frame(**scope)
+        )
+        next_expiry = load_next_expiry(today, **scope)
+
+        snapshots, latest = [], []
+        for customer_id, row in zip(components.index, components.to_dict('records')):
+            score = int(row['credit_score'])
+            snapshots.append(CreditScoreSnapshot(
+                customer_id=customer_id, credit_score=score, as_of=today,
+                on_time_factor=float(row['on_time_factor']),
+                loan_count_factor=int(row['loan_count_factor']),
+                current_year_factor=int(row['current_year_factor']),
+                volume_factor=float(row['volume_factor']),
+                limit_breached=bool(row['limit_breached']),
+            ))
+            expiry = next_expiry.get(customer_id)
+            latest.append(CustomerCreditScore(
+                customer_id=customer_id, credit_score=score, scored_on=today,
+                valid_until=min(expiry, year_end) if expiry else year_end,
+            ))
+        # Idempotent per customer and day, so a resumed or restarted run never adds a second
+        # snapshot for a day it already covered
+        CreditScoreSnapshot.objects.bulk_create(
+            snapshots, batch_size=WRITE_BATCH_SIZE, update_conflicts=True, unique_fields=['customer', 'as_of'],
+            update_fields=SNAPSHOT_UPDATE_FIELDS,
+        )
+        CustomerCreditScore.objects.bulk_create(
+            latest, batch_size=WRITE_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['customer'], update_fields=['credit_score', 'scored_on', 'valid_until'],
+        )
+    return len(latest)
+
+
+def stale_customer_ids(today=None, id_range=None):
+    # Customers whose latest score is missing (new customer, or loans/limit changed since the
+    # last snapshot) or no longer current (see CustomerCreditScore.is_current)
+    today = today or _today()
+    stale = (
+        models.Q(credit_score__isnull=True)
+        | models.Q(credit_score__valid_until__isnull=True)
+        | models.Q(credit_score__valid_until__lt=today)
+        | models.Q(credit_score__scored_on__gt=today)
+    )
+    return Customer.objects.filter(customer_filter('pk', id_range), stale).order_by('pk').values_list('pk', flat=True)
+
+
+def refresh_credit_scores(today=None, id_range=None, batch_size=SNAPSHOT_BATCH_SIZE):
+    # Incremental recomputation: snapshots only the stale customers, in batches
+    today = today or _today()
+    customer_ids = list(stale_customer_ids(today, id_range))
+    count = 0
+    for start in range(0, len(customer_ids), batch_size):
+        count += snapshot_credit_scores(today, customer_ids=customer_ids[start:start + batch_size])
+    return count
+
+
+def latest_credit_score(customer, today=None):
+    # Score of the customer's latest snapshot if it still holds, else None.
+    # Load customers with select_related('credit_score') to read it without a query.
+    try:
+        latest = customer.credit_score
+    except CustomerCreditScore.DoesNotExist:
+        return None
+    return latest.credit_score if latest.is_current(today or _today()) else None
+
+
+def discard_credit_score(customer_id):
+    # Loan and limit changes invalidate the latest score; the history is kept
+    CustomerCreditScore.objects.filter(customer_id=customer_id).delete()
+
+
+def discard_credit_scores(customer_ids, batch_size=900):
+    # discard_credit_score for many customers, one DELETE per batch (bulk writes skip signals)
+    customer_ids = list(customer_ids)
+    for start in range(0, len(customer_ids), batch_size):
+        CustomerCreditScore.objects.filter(customer_id__in=customer_ids[start:start + batch_size]).delete()
+
+
+def score_history(customer_id):
+    # A customer's snapshots, newest first
+    return CreditScoreSnapshot.objects.filter(customer_id=customer_id).order_by('-as_of', '-pk')
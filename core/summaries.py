@@ -0,0 +1,189 @@
+from datetime import date, datetime
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.functions import Coalesce, Least
+
+from .models import Customer, CustomerLoanSummary, Loan
+from .money import to_paise
+from .utils import customer_loan_stats, normalize_loan_stats
+
+SUMMARY_FIELDS = [
+    'loan_count', 'tenure_sum', 'on_time_emi_sum', 'total_volume_paise',
+    'active_principal_paise', 'active_emi_paise', 'current_year_count', 'as_of', 'next_expiry',
+]
+
+
+def _today():
+    return datetime.now().date()
+
+
+def summary_stats(summary):
+    # Converts a summary row into the stats dict used by credit_score_from_stats
+    return {
+        'num_loans': summary.loan_count,
+        'total_emis': summary.tenure_sum,
+        'total_onschedule_emis': summary.on_time_emi_sum,
+        'approved_volume': summary.total_volume_paise,
+        'current_year_loans': summary.current_year_count,
+        'sum_current_loans': summary.active_principal_paise,
+        'sum_current_emis': summary.active_emi_paise,
+    }
+
+
+def _current_filter(today):
+    # Rows whose figures are still exact today (see CustomerLoanSummary.is_current)
+    return (
+        models.Q(as_of__lte=today, as_of__gte=date(today.year, 1, 1))
+        & (models.Q(next_expiry__isnull=True) | models.Q(next_expiry__gte=today))
+    )
+
+
+def rebuild_loan_summaries(customer_ids, today=None, batch_size=900, locked=False):
+    # Recomputes summary rows from the Loan table and archived totals (one lock, one grouped
+    # aggregate and one upsert per batch). locked=True skips the lock: the caller's
+    # transaction already holds these customers' row locks.
+    today = today or _today()
+    next_expiry = models.Min('loans__end_date', filter=models.Q(loans__end_date__gte=today))
+    customer_ids = list(customer_ids)
+    summaries = {}
+    for start in range(0, len(customer_ids), batch_size):
+        batch = customer_ids[start:start + batch_size]
+        if locked:
+            summaries.update(_rebuild_batch(batch, today, next_expiry))
+            continue
+        with transaction.atomic():
+            # Same per-customer lock as create-loan: rebuilds also run from unlocked read
+            # paths, and an upsert of figures read before a concurrent loan committed would
+            # overwrite the summary apply_new_loan just updated
+            list(Customer.objects.select_for_update().filter(pk__in=batch).order_by('pk').values_list('pk'))
+            batch_summaries = _rebuild_batch(batch, today, next_expiry)
+        summaries.update(batch_summaries)
+    return summaries
+
+
+def _rebuild_batch(batch, today, next_expiry):
+    # Read from the primary even inside replica_reads(): the rows are written there, and
+    # figures from a lagging replica would overwrite newer ones
+    stats = customer_loan_stats(batch, today, next_expiry=next_expiry).using(DEFAULT_DB_ALIAS)
+    rows = {row['pk']: row for row in stats}
+    built = []
+    for customer_id in batch:
+        row = rows.get(customer_id, {})
+        stats = normalize_loan_stats(row)
+        built.append(CustomerLoanSummary(
+            customer_id=customer_id,
+            loan_count=stats['num_loans'],
+            tenure_sum=stats['total_emis'],
+            on_time_emi_sum=stats['total_onschedule_emis'],
+            total_volume_paise=stats['approved_volume'],
+            active_principal_paise=stats['sum_current_loans'],
+            active_emi_paise=stats['sum_current_emis'],
+            current_year_count=stats['current_year_loans'],
+            as_of=today,
+            next_expiry=row.get('next_expiry'),
+        ))
+    CustomerLoanSummary.objects.bulk_create(
+        built,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=SUMMARY_FIELDS,
+    )
+    return {summary.customer_id: summary for summary in built}
+
+
+def rebuild_all_loan_summaries(today=None, batch_size=900):
+    # Full rebuild for every customer, returns the number of rows written
+    customer_ids = Customer.objects.order_by('pk').values_list('pk', flat=True)
+    return len(rebuild_loan_summaries(customer_ids.iterator(), today, batch_size))
+
+
+def expire_loan_summaries(today=None, batch_size=900):
+    # Sweep: rebuilds only rows where a running loan has ended or the year rolled over
+    today = today or _today()
+    stale = (
+        CustomerLoanSummary.objects.exclude(_current_filter(today))
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    return len(rebuild_loan_summaries(stale.iterator(), today, batch_size))
+
+
+def read_loan_summaries(customers, today=None):
+    # Stats from the customers' already-loaded summary rows, without touching the database.
+    # Returns (stats per customer pk, pks whose row is missing or stale).
+    today = today or _today()
+    stats = {}
+    stale = []
+    for customer in customers:
+        try:
+            summary = customer.loan_summary
+        except CustomerLoanSummary.DoesNotExist:
+            summary = None
+        if summary is None or not summary.is_current(today):
+            stale.append(customer.pk)
+        else:
+            stats[customer.pk] = summary_stats(summary)
+    return stats, stale
+
+
+def get_loan_stats(customers, today=None, locked=False):
+    # Stats per customer pk read from summary rows; missing or stale rows are rebuilt first
+    # (locked as in rebuild_loan_summaries). Load customers with select_related('loan_summary')
+    # to read them without extra queries.
+    today = today or _today()
+    customers = {customer.pk: customer for customer in customers}
+    stats, stale = read_loan_summaries(customers.values(), today)
+    if stale:
+        for customer_id, summary in rebuild_loan_summaries(stale, today, locked=locked).items():
+            stats[customer_id] = summary_stats(summary)
+            # Keep the instance in sync so callers holding it see the fresh row
+            customers[customer_id].loan_summary = summary
+    return stats
+
+
+def apply_new_loan(loan, today=None):
+    # Folds a newly created loan into its customer's summary with a single UPDATE
+    today = today or _today()
+    values = {
+        name: Loan._meta.get_field(name).to_python(getattr(loan, name))
+        for name in ('loan_amount', 'tenure', 'monthly_payment', 'emis_paid_on_time',
+                     'date_of_approval', 'end_date')
+    }
+    amount_paise, emi_paise = to_paise(values['loan_amount']), to_paise(values['monthly_payment'])
+    updates = {
+        'loan_count': models.F('loan_count') + 1,
+        'tenure_sum': models.F('tenure_sum') + values['tenure'],
+        'on_time_emi_sum': models.F('on_time_emi_sum') + values['emis_paid_on_time'],
+        'total_volume_paise': models.F('total_volume_paise') + amount_paise,
+        'as_of': today,
+    }
+    if values['end_date'] >= today:
+        end_date = models.Value(values['end_date'], output_field=models.DateField())
+        updates['active_principal_paise'] = models.F('active_principal_paise') + amount_paise
+        updates['active_emi_paise'] = models.F('active_emi_paise') + emi_paise
+        updates['next_expiry'] = Least(Coalesce('next_expiry', end_date), end_date)
+    if values['date_of_approval'].year == today.year:
+        updates['current_year_count'] = models.F('current_year_count') + 1
+
+    summaries = CustomerLoanSummary.objects.filter(customer_id=loan.customer_id)
+    if not summaries.filter(_current_filter(today)).update(**updates):
+        # Stale row: drop it so the next read rebuilds it from the Loan table
+        summaries.delete()
+
+
+def create_empty_summary(customer_id, today=None):
+    # New customers start with an all-zero summary so the first read needs no rebuild
+    create_empty_summaries([customer_id], today)
+
+
+def create_empty_summaries(customer_ids, today=None):
+    # Bulk twin of create_empty_summary for customers inserted with bulk_create
+    today = today or _today()
+    CustomerLoanSummary.objects.bulk_create(
+        [CustomerLoanSummary(customer_id=customer_id, as_of=today) for customer_id in customer_ids],
+        ignore_conflicts=True,
+    )
+
+
+def discard_loan_summary(customer_id):
+    # Loan edits and deletes are rare, so the row is simply rebuilt on next read
+    CustomerLoanSummary.objects.filter(customer_id=customer_id).delete()
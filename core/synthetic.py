@@ -0,0 +1,160 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .ids import reserve_ids
+from .ingest import CUSTOMER_COLUMNS, LOAN_COLUMNS
+from .models import Customer, Loan
+from .utils import calculate_monthly_installments
+
+# Shape of loan_data.xlsx: 782 loans over 300 customers (about 6% of them without loans),
+# approved over the 14 years before the export
+LOANS_PER_CUSTOMER = 2.6
+HISTORY_DAYS = 14 * 365
+
+DATASET_FORMATS = ['csv', 'jsonl', 'parquet']
+
+
+def _add_months(dates, months):
+    # Vectorized "same day, N months later" on numpy datetime64[D] arrays (day clipped to 28)
+    month_start = dates.astype('datetime64[M]')
+    day = np.minimum((dates - month_start).astype(int), 27)
+    return (month_start + months.astype('timedelta64[M]')).astype('datetime64[D]') + day
+
+
+def customer_frame(count, start_id=1, seed=0):
+    # Customers shaped like customer_data.xlsx, as model-field columns: salaries of 30k-300k in
+    # whole thousands, ages 20-70, limit = 36x salary rounded to the nearest lakh
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start_id, start_id + count)
+    salaries = rng.integers(30, 301, size=count) * 1000
+    labels = pd.Series(ids).astype(str)
+    return pd.DataFrame({
+        'customer_id': ids,
+        'first_name': 'First' + labels,
+        'last_name': 'Last' + labels,
+        'age': rng.integers(20, 71, size=count),
+        'phone_number': rng.integers(9000000000, 10000000000, size=count).astype(str),
+        'monthly_salary': salaries,
+        'approved_limit': np.round(36 * salaries, -5),
+    })
+
+
+def loan_frame(customer_ids, count, start_id=1, seed=0, today=None):
+    # Loans shaped like loan_data.xlsx, as model-field columns, owned by random customer_ids
+    # (so loans per customer come out roughly Poisson, like the sheet)
+    rng = np.random.default_rng(seed + 1)
+    today = np.datetime64(today or datetime.now().date(), 'D')
+    amounts = np.round(rng.uniform(1, 10, size=count)) * 100000   # whole lakhs, 1L and 10L half as common
+    tenures = rng.integers(1, 61, size=count) * 3                    # 3-180 months in steps of 3
+    rates = np.round(rng.uniform(8.0, 18.0, size=count), 2)
+    approvals = today - rng.integers(0, HISTORY_DAYS, size=count).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'customer_id': rng.choice(np.asarray(customer_ids), size=count),
+        'loan_id': np.arange(start_id, start_id + count),
+        'loan_amount': amounts.astype(np.int64),
+        'tenure': tenures,
+        'interest_rate': rates,
+        'monthly_payment': np.round(calculate_monthly_installments(amounts, tenures, rates)).astype(np.int64),
+        'emis_paid_on_time': np.floor(tenures * rng.uniform(0.5, 1.0, size=count)).astype(np.int64),  # 50-100%
+        'date_of_approval': approvals,
+        'end_date': _add_months(approvals, tenures),
+    })
+
+
+def generate_customers(count, start_id=1, seed=0):
+    # Unsaved Customer instances (see customer_frame)
+    to_pk = Customer._meta.pk.to_python
+    return [
+        Customer(**dict(row, customer_id=to_pk(row['customer_id'])))
+        for row in customer_frame(count, start_id, seed).to_dict('records')
+    ]
+
+
+def generate_loans(customer_ids, count, start_id=1, seed=0, today=None):
+    # Unsaved Loan instances (see loan_frame)
+    to_pk = Loan._meta.pk.to_python
+    frame = loan_frame(customer_ids, count, start_id, seed, today)
+    frame['date_of_approval'] = frame['date_of_approval'].dt.date
+    frame['end_date'] = frame['end_date'].dt.date
+    return [Loan(**dict(row, loan_id=to_pk(row['loan_id']))) for row in frame.to_dict('records')]
+
+
+def seed_database(customers, loans, batch_size=10000, seed=0, stdout=None):
+    # Bulk-inserts synthetic customers and loans, with ids reserved from the id sequences
+    customer_start = reserve_ids(Customer, customers)[0] if customers else 0
+    loan_start = reserve_ids(Loan, loans)[0] if loans else 0
+    customer_ids = []
+    for offset in range(0, customers, batch_size):
+        batch = generate_customers(min(batch_size, customers - offset), customer_start + offset, seed + offset)
+        with transaction.atomic():
+            Customer.objects.bulk_create(batch)
+        customer_ids.extend(customer.pk for customer in batch)
+    for offset in range(0, loans, batch_size):
+        batch = generate_loans(customer_ids, min(batch_size, loans - offset), loan_start + offset, seed + offset)
+        with transaction.atomic():
+            Loan.objects.bulk_create(batch)
+        if stdout:
+            stdout.write(f"Seeded {offset + len(batch)}/{loans} loans")
+    return customer_ids
+
+
+class _DatasetWriter:
+    # Appends frames to one csv / jsonl / parquet file, with the spreadsheet's column headers
+
+    def __init__(self, path, file_format, columns):
+        self.path = path
+        self.file_format = file_format
+        self.headers = {field: header for header, field in columns.items()}
+        self.parquet = None
+        self.rows = 0
+
+    def write(self, frame):
+        frame = frame.rename(columns=self.headers)
+        if self.file_format == 'csv':
+            frame.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False,
+                         date_format='%Y-%m-%d')
+        elif self.file_format == 'jsonl':
+            with open(self.path, 'a' if self.rows else 'w') as handle:
+                frame.to_json(handle, orient='records', lines=True, date_format='iso')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+def write_dataset(directory, loans, customers=None, file_format='csv', seed=0, chunk_size=100000,
+                  today=None, stdout=None):
+    # Writes customers.<format> and loans.<format> for inject_data, generated chunk by chunk so
+    # memory stays flat at any scale. Ids start at 1; the same seed gives the same files.
+    # Returns the two paths.
+    customers = customers or max(1, round(loans / LOANS_PER_CUSTOMER))
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"{name}.{file_format}") for name in ('customers', 'loans')]
+    customer_writer = _DatasetWriter(paths[0], file_format, CUSTOMER_COLUMNS)
+    loan_writer = _DatasetWriter(paths[1], file_format, LOAN_COLUMNS)
+    try:
+        for chunk, offset in enumerate(range(0, customers, chunk_size)):
+            customer_writer.write(customer_frame(min(chunk_size, customers - offset), 1 + offset, seed + chunk))
+        customer_ids = np.arange(1, customers + 1)
+        for chunk, offset in enumerate(range(0, loans, chunk_size)):
+            loan_writer.write(
+                loan_frame(customer_ids, min(chunk_size, loans - offset), 1 + offset, seed + chunk, today)
+            )
+            if stdout:
+                stdout.write(f"Wrote {loan_writer.rows}/{loans} loans")
+    finally:
+        customer_writer.close()
+        loan_writer.close()
+    return paths
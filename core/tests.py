@@ -1,8 +1,59 @@
+from django.conf import settings
+from django.core.management import call_command, CommandError
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, models, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
 from decimal import Decimal
-from .models import Customer, Loan
+from datetime import date, timedelta
+from .models import (
+    CreditScoreSnapshot, Customer, CustomerArchivedTotals, CustomerCreditScore, CustomerLoanSummary, IdSequence, Loan,
+    LoanArchive
+)
+from .money import to_paise, to_rupees
+from .management.commands.benchmark_scoring import (
+    decimal_check_loan_eligibility, decimal_credit_score, decimal_stats, random_case
+)
+from .ids import ID_BLOCK_SIZE, advance_sequence, allocate_id, reset_id_blocks
+from .instrumentation import QueryBudgetExceeded, registry
+from .fast_serializers import serialize_customer, validate_create_loan, validate_eligibility, validate_register
+from .renderers import FastJSONRenderer, dumps
+from .serializers import (
+    CheckEligibilitySerializer, CreateLoanSerializer, CustomerRegisterSerializer, CustomerResponseSerializer
+)
+from .analytics import portfolio_report, score_customers
+from .archive import archive_loans
+from .ingest import CUSTOMER_COLUMNS, LOAN_COLUMNS
+from .profiles import get_credit_profile, cache_stats, reset_cache_stats
+from .rescoring import Checkpoint, customer_id_ranges, rescore_customers
+from .snapshots import refresh_credit_scores, score_history, snapshot_credit_scores, stale_customer_ids
+from .replay import generate_request_mix, load_request_mix, parse_mix, replay_asgi, replay_wsgi, write_request_mix
+from .synthetic import customer_frame, loan_frame, seed_database, write_dataset
+from .summaries import summary_stats, get_loan_stats, expire_loan_summaries, rebuild_all_loan_summaries
+from .registration import register_customers
+from .routers import ReplicaRouter, pin_to_primary, replica_reads
+from .views import BulkRegisterCustomersAPIView, CheckEligibilityAPIView
+from .utils import (
+    aggregate_loan_stats, aggregate_loan_stats_by_customer, calculate_credit_score, check_loan_eligibility, credit_score_from_stats, credit_score_components,
+    customer_loan_stats, score_from_components, approved_in_year, calculate_monthly_installment, calculate_monthly_installments, round_to_paise, amortization_schedules
+)
+from io import StringIO
+import random
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+import json
+import os
+import tempfile
 
 
 class CustomerRegistrationTests(APITestCase):
@@ -101,8 +152,8 @@ class CreateLoanTests(APITestCase):
             interest_rate=15.0,
             monthly_payment=Decimal('150000'),
             emis_paid_on_time=12,
-            date_of_approval='2024-01-01',
-            end_date='2026-01-01'
+            date_of_approval=date.today() - timedelta(days=365),
+            end_date=date.today() + timedelta(days=365)  # still running, so it counts against the limit
         )
 
         url = reverse('create_loan')
@@ -191,3 +242,1727 @@ class ViewLoansByCustomerTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
 
+
+
+class CreditScoreAggregationTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id=9001,
+            first_name="Frank",
+            last_name="Miller",
+            age=38,
+            phone_number="9990001111",
+            monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        today = date.today()
+        # One running loan approved this year and one closed loan
+        Loan.objects.create(
+            customer=self.customer,
+            loan_id=9101,
+            loan_amount=Decimal('300000'),
+            tenure=24,
+            interest_rate=12.0,
+            monthly_payment=Decimal('14122.04'),
+            emis_paid_on_time=6,
+            date_of_approval=date(today.year, 1, 1),
+            end_date=today + timedelta(days=365)
+        )
+        Loan.objects.create(
+            customer=self.customer,
+            loan_id=9102,
+            loan_amount=Decimal('100000'),
+            tenure=12,
+            interest_rate=14.0,
+            monthly_payment=Decimal('8978.71'),
+            emis_paid_on_time=12,
+            date_of_approval='2020-01-01',
+            end_date='2021-01-01'
+        )
+
+    def test_stats_collected_in_one_query(self):
+        loans = Loan.objects.filter(customer=self.customer)
+        with self.assertNumQueries(1):
+            stats = aggregate_loan_stats(loans)
+        self.assertEqual(stats['num_loans'], 2)
+        self.assertEqual(stats['total_emis'], 36)
+        self.assertEqual(stats['total_onschedule_emis'], 18)
+        self.assertEqual(stats['approved_volume'], 40000000)  # paise
+        self.assertEqual(stats['current_year_loans'], 1)
+        self.assertEqual(stats['sum_current_loans'], 30000000)
+        self.assertEqual(stats['sum_current_emis'], 1412204)
+
+    def test_score_for_customer_without_loans(self):
+        stats = aggregate_loan_stats(Loan.objects.none())
+        self.assertEqual(stats['approved_volume'], 0)
+        self.assertEqual(credit_score_from_stats(to_paise(self.customer.approved_limit), stats), 50)
+
+    def test_score_matches_formula(self):
+        # 18/36 on time -> 15, 2 loans -> 18, 1 loan this year -> 4, volume 400k/3.2M -> 26.25
+        score = calculate_credit_score(self.customer, Loan.objects.filter(customer=self.customer))
+        self.assertEqual(score, 63)
+
+    def test_check_eligibility_query_count(self):
+        url = reverse('check_eligibility')
+        data = {
+            "customer_id": 9001,
+            "loan_amount": "200000",
+            "interest_rate": 10.0,
+            "tenure": 12
+        }
+        # Customer joined to its loan summary row
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['approval'])
+
+
+class BatchCheckEligibilityTests(APITestCase):
+    def setUp(self):
+        for customer_id, salary in ((9201, '50000'), (9202, '20000')):
+            Customer.objects.create(
+                customer_id=customer_id,
+                first_name="Grace",
+                last_name="Hopper",
+                age=45,
+                phone_number="9000000000",
+                monthly_salary=Decimal(salary),
+                approved_limit=Decimal(salary) * 36
+            )
+        # Heavy EMI burden for the second customer
+        Loan.objects.create(
+            customer_id=9202,
+            loan_id=9301,
+            loan_amount=Decimal('300000'),
+            tenure=36,
+            interest_rate=12.0,
+            monthly_payment=Decimal('15000'),
+            emis_paid_on_time=3,
+            date_of_approval=date.today(),
+            end_date=date.today() + timedelta(days=1000)
+        )
+
+    def test_batch_matches_single_endpoint_in_input_order(self):
+        items = [
+            {"customer_id": 9202, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12},
+            {"customer_id": 9201, "loan_amount": "100000", "interest_rate": 8.0, "tenure": 24},
+            {"customer_id": 9201, "loan_amount": "abc", "interest_rate": 8.0, "tenure": 24},
+            {"customer_id": 9999, "loan_amount": "100000", "interest_rate": 8.0, "tenure": 24},
+        ]
+        # Customers joined to their summaries, independent of the batch size
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('check_eligibility_batch'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+
+        for index in (0, 1):
+            single = self.client.post(reverse('check_eligibility'), items[index], format='json')
+            self.assertEqual(response.data[index], single.data)
+        self.assertFalse(response.data[0]['approval'])
+        self.assertIn('loan_amount', response.data[2]['errors'])
+        self.assertEqual(response.data[3]['errors'], {"customer_id": ["Customer not found."]})
+
+    def test_batch_requires_list(self):
+        response = self.client.post(reverse('check_eligibility_batch'), {"customer_id": 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class VectorizedInstallmentTests(SimpleTestCase):
+    def test_matches_scalar_emi(self):
+        rng = np.random.default_rng(7)
+        principals = np.round(rng.uniform(1000, 5000000, 5000), 2)
+        tenures = rng.integers(1, 361, 5000)
+        rates = np.round(rng.uniform(0, 30, 5000), 2)
+        rates[:50] = 0
+        emis = calculate_monthly_installments(principals, tenures, rates)
+        expected = [
+            calculate_monthly_installment(float(p), int(n), float(r))
+            for p, n, r in zip(principals, tenures, rates)
+        ]
+        self.assertEqual(emis.tolist(), expected)
+
+    def test_rounding_on_half_paisa_ties(self):
+        values = np.arange(0, 100000) / 1000 + 0.005
+        self.assertEqual(round_to_paise(values).tolist(), [round(float(v), 2) for v in values])
+
+    def test_grid_broadcast(self):
+        emis = calculate_monthly_installments(200000, np.array([12, 24])[:, None], np.array([10.0, 14.0]))
+        self.assertEqual(emis.shape, (2, 2))
+        self.assertEqual(emis[1, 0], calculate_monthly_installment(200000.0, 24, 10.0))
+
+    def test_amortization_schedules(self):
+        schedule = amortization_schedules([100000, 50000], [12, 6], [12.0, 0])
+        self.assertEqual(schedule['principal'].shape, (2, 12))
+        np.testing.assert_allclose(schedule['principal'].sum(axis=1), [100000, 50000])
+        self.assertEqual(schedule['installment'][0, 0], calculate_monthly_installment(100000.0, 12, 12.0))
+        self.assertAlmostEqual(schedule['interest'][0, 0], 1000.0)
+        self.assertEqual(schedule['installment'][1, 6:].tolist(), [0.0] * 6)
+        self.assertEqual(schedule['balance'][:, -1].tolist(), [0.0, 0.0])
+
+
+class LoanQuoteTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id=9401,
+            first_name="Henry",
+            last_name="Ford",
+            age=52,
+            phone_number="9111111111",
+            monthly_salary=Decimal('100000'),
+            approved_limit=Decimal('3600000')
+        )
+        # Eleven loans push the score into the 30-50 slab
+        for index in range(11):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_id=9500 + index,
+                loan_amount=Decimal('100000'),
+                tenure=12,
+                interest_rate=12.0,
+                monthly_payment=Decimal('1000'),
+                emis_paid_on_time=6,
+                date_of_approval='2020-01-01',
+                end_date='2021-01-01'
+            )
+
+    def test_grid_matches_check_eligibility(self):
+        data = {
+            "customer_id": 9401,
+            "loan_amount": "250000",
+            "tenures": [12, 24, 36, 60],
+            "interest_rates": [8.0, 12.0, 15.5]
+        }
+        # One customer + summary lookup for the whole grid
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('loan_quotes'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['quotes']), 4)
+        self.assertEqual(len(response.data['quotes'][0]), 3)
+
+        for row, tenure in enumerate(data['tenures']):
+            for column, rate in enumerate(data['interest_rates']):
+                single = self.client.post(reverse('check_eligibility'), {
+                    "customer_id": 9401, "loan_amount": "250000", "interest_rate": rate, "tenure": tenure
+                }, format='json').data
+                cell = response.data['quotes'][row][column]
+                self.assertEqual(cell['approval'], single['approval'])
+                self.assertEqual(cell['corrected_interest_rate'], single['corrected_interest_rate'])
+                self.assertEqual(cell['monthly_installment'], single['monthly_installment'])
+        self.assertEqual(response.data['quotes'][0][0]['corrected_interest_rate'], 12.0)
+
+    def test_quote_requires_tenures(self):
+        data = {"customer_id": 9401, "loan_amount": "250000", "tenures": [], "interest_rates": [10.0]}
+        response = self.client.post(reverse('loan_quotes'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tenures', response.data)
+
+
+class InjectDataTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.customers_path = os.path.join(self.tmp.name, 'customers.xlsx')
+        self.loans_path = os.path.join(self.tmp.name, 'loans.xlsx')
+        pd.DataFrame({
+            'Customer ID': [1, 2, None],
+            'First Name': ['Ann', 'Ben', 'Nobody'],
+            'Last Name': ['Lee', 'Ray', 'Missing'],
+            'Age': [30, None, 40],
+            'Phone Number': [9000000001, 9000000002, 9000000003],
+            'Monthly Salary': [50000, 60000, 70000],
+            'Approved Limit': [1800000, 2200000, 2500000],
+        }).to_excel(self.customers_path, index=False)
+        pd.DataFrame({
+            'Customer ID': [1, 2, 3, 1],
+            'Loan ID': [10, 11, 12, 10],
+            'Loan Amount': [100000, 200000, 300000, 150000],
+            'Tenure': [12, 24, 36, 12],
+            'Interest Rate': [10.5, 11.0, 12.0, 10.5],
+            'Monthly payment': [8800, 9300, 10000, 13200],
+            'EMIs paid on Time': [12, 20, 30, 11],
+            'Date of Approval': pd.to_datetime(['2020-01-01', '2021-01-01', '2021-01-01', '2020-01-01']),
+            'End Date': pd.to_datetime(['2021-01-01', '2023-01-01', '2024-01-01', '2021-01-01']),
+        }).to_excel(self.loans_path, index=False)
+
+    def inject(self, *extra):
+        out = StringIO()
+        call_command('inject_data', '--customers', self.customers_path, '--loans', self.loans_path,
+                     *extra, stdout=out)
+        return out.getvalue()
+
+    def test_bulk_upsert_reports_and_rejects(self):
+        output = self.inject('--chunk-size', '2')
+        self.assertIn('Customers: 2 rows loaded, 1 rejected', output)
+        # Loan 10 appears in both chunks, so it is upserted twice
+        self.assertIn('Loans: 3 rows loaded, 1 rejected', output)
+        self.assertIn('rows/sec', output)
+
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertIsNone(Customer.objects.get(customer_id=2).age)
+        # Duplicate loan id keeps the last row, like update_or_create
+        loan = Loan.objects.get(loan_id=10)
+        self.assertEqual(loan.loan_amount, Decimal('150000'))
+        self.assertEqual(loan.date_of_approval, date(2020, 1, 1))
+
+        # Re-running updates rows in place instead of duplicating them
+        self.inject()
+        self.assertEqual(Loan.objects.count(), 2)
+
+    def test_moving_a_loan_refreshes_both_customers(self):
+        cache.clear()
+        self.inject()
+        self.assertEqual(get_credit_profile(1).stats['num_loans'], 1)
+        loans = pd.read_excel(self.loans_path)
+        loans['Customer ID'] = loans['Customer ID'].replace({1: 2})
+        loans.to_excel(self.loans_path, index=False)
+        self.inject()
+        self.assertEqual(Loan.objects.get(pk=10).customer_id, 2)
+        for customer_id, count in ((1, 0), (2, 2)):
+            with self.subTest(customer=customer_id):
+                self.assertEqual(get_credit_profile(customer_id).stats['num_loans'], count)
+                summary = CustomerLoanSummary.objects.get(customer_id=customer_id)
+                self.assertEqual(summary.loan_count, count)
+
+    def test_bulk_matches_row_by_row(self):
+        # The row-by-row path can't parse a blank customer id, so compare on clean rows only
+        customers = pd.read_excel(self.customers_path)
+        customers.dropna(subset=['Customer ID']).to_excel(self.customers_path, index=False)
+        self.inject()
+        bulk = list(Loan.objects.order_by('loan_id').values())
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        self.inject('--row-by-row')
+        self.assertEqual(list(Loan.objects.order_by('loan_id').values()), bulk)
+
+    def convert(self, extension, writer):
+        # Rewrites both fixture spreadsheets into another format
+        paths = []
+        for path in (self.customers_path, self.loans_path):
+            target = os.path.splitext(path)[0] + extension
+            writer(pd.read_excel(path), target)
+            paths.append(target)
+        self.customers_path, self.loans_path = paths
+
+    def assert_same_as_excel(self):
+        self.inject()
+        loaded = list(Loan.objects.order_by('loan_id').values())
+        customers = list(Customer.objects.order_by('customer_id').values())
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        self.customers_path = os.path.join(self.tmp.name, 'customers.xlsx')
+        self.loans_path = os.path.join(self.tmp.name, 'loans.xlsx')
+        self.inject()
+        self.assertEqual(list(Loan.objects.order_by('loan_id').values()), loaded)
+        self.assertEqual(list(Customer.objects.order_by('customer_id').values()), customers)
+
+    def test_excel_engines_load_the_same_rows(self):
+        self.inject()
+        loaded = list(Loan.objects.order_by('loan_id').values())
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        with mock.patch('core.ingest.EXCEL_ENGINE', None):  # openpyxl, when calamine isn't installed
+            self.inject()
+        self.assertEqual(list(Loan.objects.order_by('loan_id').values()), loaded)
+
+    def test_csv_source(self):
+        self.convert('.csv', lambda frame, path: frame.to_csv(path, index=False))
+        output = self.inject('--chunk-size', '1')
+        self.assertIn('Customers: 2 rows loaded, 1 rejected', output)
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        self.assert_same_as_excel()
+
+    def test_jsonl_source(self):
+        self.convert('.jsonl', lambda frame, path: frame.to_json(path, orient='records', lines=True))
+        self.assert_same_as_excel()
+
+    def test_parquet_source(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        self.convert('.parquet', lambda frame, path: frame.to_parquet(path, index=False))
+        self.assert_same_as_excel()
+
+    def test_reload_after_archiving_skips_archived_loans(self):
+        customers = pd.read_excel(self.customers_path)
+        customers.dropna(subset=['Customer ID']).to_excel(self.customers_path, index=False)
+        self.inject()
+        customers = list(Customer.objects.select_related('archived_totals').order_by('pk'))
+        before = aggregate_loan_stats_by_customer([customer.pk for customer in customers])
+        scores = [calculate_credit_score(customer, customer.loans.all()) for customer in customers]
+        self.assertEqual(archive_loans(after_days=30), 2)
+
+        for extra in ((), ('--row-by-row',)):
+            with self.subTest(extra=extra):
+                output = self.inject(*extra)
+                if not extra:
+                    self.assertIn('Loans: 0 rows loaded, 1 rejected, 2 already archived', output)
+                self.assertFalse(Loan.objects.exists())
+                customers = list(Customer.objects.select_related('archived_totals').order_by('pk'))
+                self.assertEqual(aggregate_loan_stats_by_customer([customer.pk for customer in customers]), before)
+                self.assertEqual([calculate_credit_score(customer) for customer in customers], scores)
+
+    def test_format_flag_and_missing_columns(self):
+        path = os.path.join(self.tmp.name, 'customers.data')
+        pd.DataFrame({'Customer ID': [1]}).to_csv(path, index=False)
+        with self.assertRaisesMessage(CommandError, "Can't detect the format"):
+            call_command('inject_data', '--customers', path, '--loans', self.loans_path, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'missing required columns: First Name'):
+            call_command('inject_data', '--customers', path, '--loans', self.loans_path,
+                         '--format', 'csv', stdout=StringIO())
+
+
+class CreditProfileCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.customer = Customer.objects.create(
+            customer_id=9601,
+            first_name="Ida",
+            last_name="Wells",
+            age=33,
+            phone_number="9222222222",
+            monthly_salary=Decimal('80000'),
+            approved_limit=Decimal('2900000')
+        )
+        self.payload = {"customer_id": 9601, "loan_amount": "100000", "interest_rate": 13.0, "tenure": 12}
+
+    def add_loan(self, loan_id):
+        return Loan.objects.create(
+            customer=self.customer,
+            loan_id=loan_id,
+            loan_amount=Decimal('500000'),
+            tenure=12,
+            interest_rate=12.0,
+            monthly_payment=Decimal('45000'),
+            emis_paid_on_time=1,
+            date_of_approval=date.today(),
+            end_date=date.today() + timedelta(days=365)
+        )
+
+    def test_repeat_checks_cost_no_queries(self):
+        url = reverse('check_eligibility')
+        with self.assertNumQueries(1):
+            first = self.client.post(url, self.payload, format='json')
+        with self.assertNumQueries(0):
+            second = self.client.post(url, self.payload, format='json')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_loan_write_invalidates_profile(self):
+        url = reverse('check_eligibility')
+        self.assertTrue(self.client.post(url, self.payload, format='json').data['approval'])
+        # New EMI burden exceeds half the salary
+        loan = self.add_loan(9602)
+        self.assertFalse(self.client.post(url, self.payload, format='json').data['approval'])
+        loan.delete()
+        self.assertTrue(self.client.post(url, self.payload, format='json').data['approval'])
+        self.assertGreaterEqual(cache_stats()['invalidations'], 2)
+
+    def test_customer_write_invalidates_profile(self):
+        get_credit_profile(9601)
+        self.customer.approved_limit = Decimal('100')
+        self.customer.save()
+        self.assertEqual(get_credit_profile(9601).customer.approved_limit, Decimal('100'))
+
+    def test_profiles_expire_on_date_rollover(self):
+        get_credit_profile(9601)
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch('core.profiles._today', return_value=tomorrow), CaptureQueriesContext(connection) as queries:
+            get_credit_profile(9601)
+        self.assertGreater(len(queries), 0)
+
+    def test_missing_customer(self):
+        self.assertIsNone(get_credit_profile(123456))
+        response = self.client.post(reverse('check_eligibility'), dict(self.payload, customer_id=123456),
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CustomerLoanSummaryTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.customer = Customer.objects.create(
+            customer_id=9701,
+            first_name="Jane",
+            last_name="Austen",
+            age=41,
+            phone_number="9333333333",
+            monthly_salary=Decimal('120000'),
+            approved_limit=Decimal('4300000')
+        )
+
+    def add_loan(self, loan_id, amount, end_date, approved=None):
+        return Loan.objects.create(
+            customer=self.customer,
+            loan_id=loan_id,
+            loan_amount=Decimal(amount),
+            tenure=24,
+            interest_rate=12.0,
+            monthly_payment=Decimal(amount) / 20,
+            emis_paid_on_time=10,
+            date_of_approval=approved or self.today,
+            end_date=end_date
+        )
+
+    def summary_as_stats(self):
+        return summary_stats(CustomerLoanSummary.objects.get(customer=self.customer))
+
+    def aggregated(self):
+        return aggregate_loan_stats(Loan.objects.filter(customer=self.customer))
+
+    def test_incremental_updates_match_aggregate(self):
+        self.add_loan(9711, '100000', self.today + timedelta(days=30))
+        self.add_loan(9712, '250000', '2019-01-01', approved='2017-01-01')
+        self.add_loan(9713, '50000', self.today + timedelta(days=900))
+        self.assertEqual(self.summary_as_stats(), self.aggregated())
+        summary = CustomerLoanSummary.objects.get(customer=self.customer)
+        self.assertEqual(summary.next_expiry, self.today + timedelta(days=30))
+
+    def test_score_reads_single_summary_row(self):
+        self.add_loan(9714, '300000', self.today + timedelta(days=60))
+        customer = Customer.objects.get(pk=9701)
+        with self.assertNumQueries(1):
+            score = calculate_credit_score(customer)
+        self.assertEqual(score, calculate_credit_score(customer, Loan.objects.filter(customer=customer)))
+
+    def test_loan_edit_and_delete_rebuild_on_read(self):
+        loan = self.add_loan(9715, '100000', self.today + timedelta(days=30))
+        loan.loan_amount = Decimal('175000')
+        loan.save()
+        self.assertFalse(CustomerLoanSummary.objects.filter(customer=self.customer).exists())
+        stats = get_loan_stats([Customer.objects.get(pk=9701)])[9701]
+        self.assertEqual(stats['approved_volume'], 17500000)
+        loan.delete()
+        stats = get_loan_stats([Customer.objects.get(pk=9701)])[9701]
+        self.assertEqual(stats['num_loans'], 0)
+
+    def test_expiry_sweep(self):
+        self.add_loan(9716, '100000', self.today + timedelta(days=10))
+        later = self.today + timedelta(days=11)
+        summary = CustomerLoanSummary.objects.get(customer=self.customer)
+        self.assertFalse(summary.is_current(later))
+
+        self.assertEqual(expire_loan_summaries(today=later), 1)
+        summary.refresh_from_db()
+        self.assertEqual(summary.active_principal_paise, 0)
+        self.assertIsNone(summary.next_expiry)
+        # Nothing left to expire
+        self.assertEqual(expire_loan_summaries(today=later), 0)
+
+    def test_rebuild_command(self):
+        self.add_loan(9717, '100000', self.today + timedelta(days=10))
+        CustomerLoanSummary.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_loan_summaries', stdout=out)
+        self.assertIn('Rebuilt 1 loan summaries', out.getvalue())
+        self.assertEqual(self.summary_as_stats(), self.aggregated())
+
+
+class LoanQueryIndexTests(TestCase):
+    def test_year_filter_is_a_date_range(self):
+        sql = str(Loan.objects.filter(approved_in_year(2024)).query)
+        self.assertIn('"date_of_approval" >= 2024-01-01', sql)
+        self.assertIn('"date_of_approval" < 2025-01-01', sql)
+
+    def test_benchmark_command_seeds_and_reports(self):
+        out = StringIO()
+        call_command('benchmark_loan_queries', '--loans', '40', '--customers', '5', '--samples', '3', stdout=out)
+        self.assertEqual(Loan.objects.count(), 40)
+        self.assertIn('score aggregate', out.getvalue())
+        self.assertIn('p95', out.getvalue())
+
+
+class ConcurrentCreateLoanTests(TransactionTestCase):
+    # The parallel tests need real row locks (Postgres, e.g. docker compose --profile test run
+    # --rm tests); SQLite has no SELECT ... FOR UPDATE and its in-memory test database fails
+    # concurrent writers with "table is locked". test_stats_are_read_under_the_customer_lock
+    # checks the locking order on every backend.
+    def setUp(self):
+        self.addCleanup(reset_id_blocks)  # the teardown flush resets the id sequences too
+        for index in range(20):
+            Customer.objects.create(
+                customer_id=9800 + index,
+                first_name="Kim",
+                last_name="Lee",
+                age=30,
+                phone_number="9444444444",
+                monthly_salary=Decimal('1000000'),
+                approved_limit=Decimal('1000000')
+            )
+
+    def fire(self, payloads, workers=32):
+        def post(payload):
+            try:
+                return APIClient().post(reverse('create_loan'), payload, format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(post, payloads))
+
+    @skipUnless(connection.features.has_select_for_update, 'needs row-level locks')
+    def test_parallel_creates_never_breach_limit(self):
+        payload = {"customer_id": 9800, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12}
+        statuses = self.fire([payload] * 300)
+
+        loans = Loan.objects.filter(customer_id=9800)
+        total = loans.aggregate(total=models.Sum('loan_amount'))['total'] or 0
+        self.assertLessEqual(total, Decimal('1000000'))
+        self.assertEqual(len(set(loans.values_list('loan_id', flat=True))), loans.count())
+        # Exactly the ten loans that fit under the limit, every other request cleanly rejected
+        self.assertEqual(loans.count(), 10)
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), 10)
+        self.assertEqual(statuses.count(status.HTTP_400_BAD_REQUEST), 290)
+
+    @skipUnless(connection.features.has_select_for_update, 'needs row-level locks')
+    def test_creates_for_different_customers_run_in_parallel(self):
+        payloads = [
+            {"customer_id": 9800 + index, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12}
+            for index in range(20)
+        ]
+        statuses = self.fire(payloads, workers=20)
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 20)
+
+    @skipUnless(connection.features.has_select_for_update, 'needs row-level locks')
+    def test_summary_rebuilds_never_overwrite_new_loans(self):
+        # Unlocked readers rebuild stale summaries while loans are created; the row they write
+        # must still count every committed loan
+        payload = {"customer_id": 9800, "loan_amount": "10000", "interest_rate": 14.0, "tenure": 12}
+
+        def rebuild():
+            try:
+                CustomerLoanSummary.objects.filter(customer_id=9800).delete()
+                get_loan_stats([Customer.objects.select_related('loan_summary').get(pk=9800)])
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            creates = pool.submit(self.fire, [payload] * 50, 8)
+            for future in [pool.submit(rebuild) for _ in range(100)]:
+                future.result()
+            self.assertEqual(creates.result(), [status.HTTP_201_CREATED] * 50)
+
+        customer = Customer.objects.select_related('loan_summary').get(pk=9800)
+        self.assertEqual(get_loan_stats([customer])[9800], aggregate_loan_stats_by_customer([9800])[9800])
+        self.assertEqual(customer.loan_summary.loan_count, 50)
+
+    def test_stats_are_read_under_the_customer_lock(self):
+        # create-loan and summary rebuilds take the customer row lock before reading the figures
+        # they act on, inside the transaction that writes
+        events = []
+        select_for_update = models.QuerySet.select_for_update
+
+        def lock(queryset, *args, **kwargs):
+            if queryset.model is Customer:
+                events.append(('lock', connection.in_atomic_block))
+            return select_for_update(queryset, *args, **kwargs)
+
+        def read(name, function):
+            def wrapper(*args, **kwargs):
+                events.append((name, connection.in_atomic_block))
+                return function(*args, **kwargs)
+            return wrapper
+
+        CustomerLoanSummary.objects.filter(customer_id=9800).delete()
+        with mock.patch.object(models.QuerySet, 'select_for_update', lock), \
+                mock.patch('core.loans.get_loan_stats', read('stats', get_loan_stats)), \
+                mock.patch('core.summaries.customer_loan_stats', read('aggregate', customer_loan_stats)):
+            payload = {"customer_id": 9800, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12}
+            response = self.client.post(reverse('create_loan'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Stale summary: the locked check rebuilds it under the lock it already holds
+        self.assertEqual(events, [('lock', True), ('stats', True), ('aggregate', True)])
+
+    def test_sequential_creates_stop_at_limit(self):
+        payload = {"customer_id": 9802, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12}
+        statuses = [self.client.post(reverse('create_loan'), payload, format='json').status_code for _ in range(12)]
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 10 + [status.HTTP_400_BAD_REQUEST] * 2)
+        loan_ids = list(Loan.objects.filter(customer_id=9802).values_list('loan_id', flat=True))
+        self.assertEqual(len(set(loan_ids)), 10)
+
+    def test_created_loan_has_schedule_fields(self):
+        payload = {"customer_id": 9801, "loan_amount": "120000", "interest_rate": 14.0, "tenure": 12}
+        response = self.client.post(reverse('create_loan'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        loan = Loan.objects.get(loan_id=response.data['loan_id'])
+        self.assertEqual(loan.emis_paid_on_time, 0)
+        self.assertEqual(loan.date_of_approval, date.today())
+        self.assertEqual(loan.end_date, date.today() + relativedelta(months=12))
+        self.assertEqual(float(loan.monthly_payment), calculate_monthly_installment(120000.0, 12, 14.0))
+
+
+class AsyncEndpointTests(TestCase):
+    # The async/ twins must answer exactly like the DRF views
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            customer_id=9850,
+            first_name="Ada",
+            last_name="Byron",
+            age=36,
+            phone_number="9555555555",
+            monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_id=9851,
+            loan_amount=Decimal('300000'),
+            tenure=24,
+            interest_rate=11.5,
+            monthly_payment=Decimal('14050'),
+            emis_paid_on_time=6,
+            date_of_approval=date.today() - timedelta(days=200),
+            end_date=date.today() + timedelta(days=500)
+        )
+        self.api = APIClient()
+
+    def assertSameAnswer(self, sync_response, async_response):
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    async def test_check_eligibility_matches_sync_view(self):
+        payload = {"customer_id": 9850, "loan_amount": "200000", "interest_rate": 13.0, "tenure": 12}
+        async_response = await self.async_client.post(
+            reverse('async_check_eligibility'), payload, content_type='application/json'
+        )
+        sync_response = await sync_to_async(self.api.post)(reverse('check_eligibility'), payload, format='json')
+        self.assertSameAnswer(sync_response, async_response)
+
+    async def test_validation_and_missing_customer_errors(self):
+        url = reverse('async_check_eligibility')
+        invalid = await self.async_client.post(url, {"customer_id": 9850}, content_type='application/json')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('loan_amount', invalid.json())
+
+        payload = {"customer_id": 1, "loan_amount": "200000", "interest_rate": 13.0, "tenure": 12}
+        missing = await self.async_client.post(url, payload, content_type='application/json')
+        sync_missing = await sync_to_async(self.api.post)(reverse('check_eligibility'), payload, format='json')
+        self.assertSameAnswer(sync_missing, missing)
+
+        broken = await self.async_client.post(url, '{"customer_id": ', content_type='application/json')
+        self.assertEqual(broken.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_create_loan(self):
+        payload = {"customer_id": 9850, "loan_amount": "100000", "interest_rate": 13.0, "tenure": 12}
+        response = await self.async_client.post(
+            reverse('async_create_loan'), payload, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.json()['loan_approved'])
+        self.assertTrue(await Loan.objects.filter(loan_id=response.json()['loan_id']).aexists())
+
+    async def test_view_loan_and_customer_loans_match_sync_views(self):
+        pairs = [
+            (reverse('view_loan', args=[9851]), reverse('async_view_loan', args=[9851])),
+            (reverse('view_loan', args=[1]), reverse('async_view_loan', args=[1])),
+            (reverse('view_loans_by_customer', args=[9850]), reverse('async_view_loans_by_customer', args=[9850])),
+            (reverse('view_loans_by_customer', args=[1]), reverse('async_view_loans_by_customer', args=[1])),
+        ]
+        for sync_url, async_url in pairs:
+            sync_response = await sync_to_async(self.api.get)(sync_url)
+            self.assertSameAnswer(sync_response, await self.async_client.get(async_url))
+
+
+class LoanPaginationTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id=9900,
+            first_name="Max",
+            last_name="Planck",
+            age=50,
+            phone_number="9666666666",
+            monthly_salary=Decimal('500000'),
+            approved_limit=Decimal('18000000')
+        )
+        for index in range(25):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_id=9901 + index,
+                loan_amount=Decimal('100000') + index,
+                tenure=12,
+                interest_rate=12.0,
+                monthly_payment=Decimal('8885'),
+                emis_paid_on_time=index % 12,
+                date_of_approval=date.today() - timedelta(days=30),
+                end_date=date.today() + timedelta(days=330)
+            )
+        self.url = reverse('view_loans_by_customer', args=[9900])
+
+    def test_pages_follow_the_cursor(self):
+        full = self.client.get(self.url).data
+        self.assertEqual(len(full), 25)
+
+        collected = []
+        url = f"{self.url}?limit=10"
+        pages = 0
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            collected.extend(response.data)
+            pages += 1
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0] or None
+        self.assertEqual(pages, 3)
+        self.assertEqual(collected, full)
+        self.assertEqual([loan['loan_id'] for loan in collected], [9901 + index for index in range(25)])
+
+    def test_cursor_header_and_last_page(self):
+        response = self.client.get(self.url, {'limit': 20})
+        self.assertEqual(response.headers['X-Next-Cursor'], '9920')
+        last = self.client.get(self.url, {'limit': 20, 'cursor': '9920'})
+        self.assertEqual(len(last.data), 5)
+        self.assertNotIn('X-Next-Cursor', last.headers)
+        self.assertNotIn('Link', last.headers)
+
+    def test_stream_returns_json_lines(self):
+        full = self.client.get(self.url).json()
+        response = self.client.get(self.url, {'stream': 1})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines, full)
+
+        after = self.client.get(self.url, {'stream': 1, 'cursor': '9920'})
+        self.assertEqual(len(b''.join(after.streaming_content).splitlines()), 5)
+
+    def test_archived_loans_follow_the_live_ones(self):
+        approved = date(date.today().year - 3, 1, 1)
+        Loan.objects.filter(loan_id__lte=9905).update(date_of_approval=approved, end_date=approved + timedelta(days=365))
+        self.assertEqual(archive_loans(after_days=30), 5)
+        full = self.client.get(self.url).data
+        self.assertEqual([loan['loan_id'] for loan in full], list(range(9906, 9926)) + list(range(9901, 9906)))
+        self.assertEqual(full[-1]['repayments_left'], 12 - 4)
+
+        collected, cursors = [], []
+        url = f"{self.url}?limit=8"
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            collected.extend(response.data)
+            cursors.append(response.headers.get('X-Next-Cursor'))
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0] or None
+        self.assertEqual(collected, full)
+        # The third page crosses into the archive, so its cursor carries the archived prefix
+        self.assertEqual(cursors, ['9913', '9921', 'a9904', None])
+        page = self.client.get(self.url, {'limit': 2, 'cursor': 'a9901'})
+        self.assertEqual([loan['loan_id'] for loan in page.data], [9902, 9903])
+        self.assertEqual(page.headers['X-Next-Cursor'], 'a9903')
+
+        stream = self.client.get(self.url, {'stream': 1})
+        lines = [json.loads(line) for line in b''.join(stream.streaming_content).decode().splitlines()]
+        self.assertEqual(lines, self.client.get(self.url).json())
+        after = self.client.get(self.url, {'stream': 1, 'cursor': 'a9902'})
+        self.assertEqual([json.loads(line)['loan_id'] for line in b''.join(after.streaming_content).splitlines()],
+                         [9903, 9904, 9905])
+
+    def test_invalid_params_and_unknown_customer(self):
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x9901'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'limit': 5001}).status_code, status.HTTP_400_BAD_REQUEST)
+        missing = self.client.get(reverse('view_loans_by_customer', args=[1]), {'stream': 1})
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_twin_pages_and_streams_the_same(self):
+        sync_page = await sync_to_async(self.client.get)(self.url, {'limit': 10, 'cursor': '9905'})
+        async_url = reverse('async_view_loans_by_customer', args=[9900])
+        async_page = await self.async_client.get(async_url, {'limit': 10, 'cursor': '9905'})
+        self.assertEqual(async_page.json(), sync_page.json())
+        self.assertEqual(async_page.headers['X-Next-Cursor'], sync_page.headers['X-Next-Cursor'])
+
+        approved = date(date.today().year - 3, 1, 1)
+        await Loan.objects.filter(loan_id__lte=9905).aupdate(
+            date_of_approval=approved, end_date=approved + timedelta(days=365)
+        )
+        await sync_to_async(archive_loans)(after_days=30)
+        for params in ({'limit': 22}, {'limit': 2, 'cursor': '9925'}, {'limit': 2, 'cursor': 'a9901'}):
+            sync_page = await sync_to_async(self.client.get)(self.url, params)
+            async_page = await self.async_client.get(async_url, params)
+            self.assertEqual(async_page.json(), sync_page.json())
+            self.assertEqual(async_page.headers.get('X-Next-Cursor'), sync_page.headers.get('X-Next-Cursor'))
+
+        stream = await self.async_client.get(async_url, {'stream': 1})
+        lines = [line async for line in stream.streaming_content]
+        self.assertEqual(len(b''.join(lines).splitlines()), 25)
+
+
+class LoanDetailTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id=9950,
+            first_name="Lise",
+            last_name="Meitner",
+            age=41,
+            phone_number="9777777777",
+            monthly_salary=Decimal('120000'),
+            approved_limit=Decimal('4300000')
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_id=9951,
+            loan_amount=Decimal('250000.50'),
+            tenure=36,
+            interest_rate=10.5,
+            monthly_payment=Decimal('8125.75'),
+            emis_paid_on_time=3,
+            date_of_approval=date.today() - timedelta(days=90),
+            end_date=date.today() + timedelta(days=1000)
+        )
+        self.url = reverse('view_loan', args=[9951])
+
+    def test_single_query_and_payload(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            "loan_id": 9951,
+            "customer": {
+                "id": 9950, "first_name": "Lise", "last_name": "Meitner",
+                "phone_number": "9777777777", "age": 41,
+            },
+            "loan_amount": 250000.5,
+            "interest_rate": 10.5,
+            "monthly_installment": 8125.75,
+            "tenure": 36,
+        })
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        # Any change to the loan or its customer yields a new validator
+        Customer.objects.filter(pk=9950).update(phone_number="9000000000")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['customer']['phone_number'], "9000000000")
+
+    def test_archived_loan_is_still_served(self):
+        live = self.client.get(self.url).json()
+        approved = date(date.today().year - 4, 1, 1)
+        Loan.objects.filter(pk=9951).update(date_of_approval=approved, end_date=approved + timedelta(days=365))
+        self.assertEqual(archive_loans(after_days=30), 1)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), live)
+
+    async def test_async_twin_serves_archived_loans(self):
+        approved = date(date.today().year - 4, 1, 1)
+        await Loan.objects.filter(pk=9951).aupdate(date_of_approval=approved, end_date=approved + timedelta(days=365))
+        await sync_to_async(archive_loans)(after_days=30)
+        sync_response = await sync_to_async(self.client.get)(self.url)
+        async_response = await self.async_client.get(reverse('async_view_loan', args=[9951]))
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+    def test_missing_loan(self):
+        response = self.client.get(reverse('view_loan', args=[1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['detail'], "No Loan matches the given query.")
+
+    async def test_async_twin_shares_etag(self):
+        sync_response = await sync_to_async(self.client.get)(self.url)
+        async_url = reverse('async_view_loan', args=[9951])
+        self.assertEqual((await self.async_client.get(async_url))['ETag'], sync_response['ETag'])
+        response = await self.async_client.get(async_url, headers={'If-None-Match': sync_response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class FastSerializerTests(SimpleTestCase):
+    # The fast validators and renderer must agree with DRF on every input
+    eligibility_payloads = [
+        {"customer_id": 1, "loan_amount": "200000", "interest_rate": 12, "tenure": 24},
+        {"customer_id": "7", "loan_amount": 1500.255, "interest_rate": "11.5", "tenure": "12.0"},
+        {"customer_id": 2.0, "loan_amount": " 99.5 ", "interest_rate": True, "tenure": 6},
+        {"customer_id": 1, "loan_amount": "1e3", "interest_rate": 10, "tenure": 1},
+        {"customer_id": 1, "loan_amount": "0.001", "interest_rate": 10, "tenure": 12},
+        {"customer_id": 1, "loan_amount": "12345678901234.5", "interest_rate": 10, "tenure": 12},
+        {"customer_id": 1, "loan_amount": "NaN", "interest_rate": 10, "tenure": 12},
+        {"customer_id": 1, "loan_amount": "-Infinity", "interest_rate": "1e400", "tenure": 0},
+        {"customer_id": 1.5, "loan_amount": None, "interest_rate": "x", "tenure": True},
+        {"customer_id": 1, "interest_rate": 10},
+        {},
+        [{"customer_id": 1}],
+        "not a dict",
+    ]
+    register_payloads = [
+        {"first_name": "Alice", "last_name": "Smith", "age": 28, "monthly_income": "50000.00", "phone_number": "9876543210"},
+        {"first_name": " Bob ", "last_name": "Lee", "monthly_income": 45000, "phone_number": 9876543210},
+        {"first_name": "Cy", "last_name": "Young", "age": None, "monthly_income": "1", "phone_number": "1"},
+        {"first_name": "", "last_name": "   ", "age": "x", "monthly_income": "1.234", "phone_number": "1" * 21},
+        {"first_name": True, "last_name": "a\x00b", "monthly_income": "12345678901", "phone_number": ["1"]},
+        {"first_name": "N" * 51, "last_name": "Lee", "monthly_income": "", "phone_number": "1"},
+    ]
+
+    def assertAgreesWithDrf(self, validator, serializer_class, payloads):
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                request, errors = validator(payload)
+                serializer = serializer_class(data=payload)
+                if serializer.is_valid():
+                    self.assertIsNone(errors)
+                    expected = dict.fromkeys(validator.request_class.__slots__)
+                    expected.update(serializer.validated_data)
+                    self.assertEqual(request.as_dict(), expected)
+                    self.assertEqual(
+                        {name: type(value) for name, value in request.as_dict().items()},
+                        {name: type(value) for name, value in expected.items()}
+                    )
+                else:
+                    self.assertIsNone(request)
+                    self.assertEqual(errors, serializer.errors)
+                    self.assertIsNone(validator.fast(payload))
+
+    def test_eligibility_and_create_loan_validators(self):
+        self.assertAgreesWithDrf(validate_eligibility, CheckEligibilitySerializer, self.eligibility_payloads)
+        self.assertAgreesWithDrf(validate_create_loan, CreateLoanSerializer, self.eligibility_payloads)
+
+    def test_register_validator(self):
+        self.assertAgreesWithDrf(validate_register, CustomerRegisterSerializer, self.register_payloads)
+
+    def test_common_payloads_take_the_fast_path(self):
+        self.assertIsNotNone(validate_eligibility.fast(self.eligibility_payloads[0]))
+        self.assertIsNotNone(validate_register.fast(self.register_payloads[0]))
+        self.assertIsNotNone(validate_register.fast(self.register_payloads[1]))
+
+    def test_customer_response_matches_drf(self):
+        customers = [
+            Customer(customer_id=1, first_name="Alice", last_name="Smith", age=28, phone_number="9876543210",
+                     monthly_salary=Decimal('50000.00'), approved_limit=round(36 * Decimal('50000.00'), -5)),
+            Customer(customer_id=2, first_name="Bob", last_name="Lee", age=None, phone_number="1",
+                     monthly_salary=Decimal('45000.555'), approved_limit=Decimal('1600000')),
+        ]
+        for customer in customers:
+            self.assertEqual(serialize_customer(customer), CustomerResponseSerializer(customer).data)
+
+    def test_renderer_matches_json_renderer(self):
+        payloads = [
+            {"customer_id": "1", "approval": True, "interest_rate": 12.0, "corrected_interest_rate": 12.0,
+             "tenure": 24, "monthly_installment": 9414.69},
+            [{"errors": {"tenure": [ErrorDetail("Ensure this value is greater than or equal to 1.", code='min_value')]}}],
+            {"loan_id": None, "message": "Zoë ₹", "amount": Decimal('12.50'), "when": date(2024, 1, 2)},
+        ]
+        for payload in payloads:
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+            self.assertEqual(dumps(payload), JSONRenderer().render(payload))
+
+
+class PortfolioAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_database(40, 400, seed=3)
+        today = date.today()
+        edge_cases = [
+            # (customer id, limit, [(amount, end date offset in days, approved this year)])
+            (9990, Decimal('500000'), [(Decimal('299999.55'), 100, True), (Decimal('200000.45'), 50, False)]),  # at limit
+            (9991, Decimal('500000'), [(Decimal('299999.55'), 100, True), (Decimal('200000.46'), 50, False)]),  # over by 1 paisa
+            (9992, Decimal('700000'), []),  # no loans
+            (9993, Decimal('300000'), [(Decimal('999999.99'), -10, False)]),  # only closed loans, volume over limit
+        ]
+        for customer_id, limit, loans in edge_cases:
+            customer = Customer.objects.create(
+                customer_id=customer_id, first_name="Edge", last_name="Case", age=30, phone_number="9000000000",
+                monthly_salary=Decimal('25000.50'), approved_limit=limit
+            )
+            for index, (amount, end_offset, this_year) in enumerate(loans):
+                Loan.objects.create(
+                    customer=customer, loan_id=customer_id * 10 + index, loan_amount=amount, tenure=12,
+                    interest_rate=12.0, monthly_payment=Decimal('8888.88'), emis_paid_on_time=7,
+                    date_of_approval=today if this_year else date(today.year - 1, 6, 1),
+                    end_date=today + timedelta(days=end_offset)
+                )
+
+    def test_vectorized_scores_match_scalar(self):
+        book = score_customers()
+        self.assertEqual(len(book), 44)
+        for customer in Customer.objects.select_related('loan_summary'):
+            with self.subTest(customer=customer.pk):
+                self.assertEqual(book.loc[customer.pk, 'credit_score'], calculate_credit_score(customer))
+        self.assertEqual(book.loc[9991, 'credit_score'], 0)
+        self.assertGreater(book.loc[9990, 'credit_score'], 0)
+
+    def test_scoring_the_book_takes_three_queries(self):
+        with self.assertNumQueries(3):  # customers, loans, archived totals
+            score_customers()
+
+    def test_report_endpoint(self):
+        response = self.client.get(reverse('portfolio_analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.json()
+        today = date.today()
+        active = Loan.objects.filter(end_date__gte=today).aggregate(
+            principal=models.Sum('loan_amount'), emi=models.Sum('monthly_payment')
+        )
+        self.assertEqual(report['customers'], 44)
+        self.assertEqual(report['loans'], Loan.objects.count())
+        self.assertEqual(report['total_outstanding'], float(active['principal']))
+        self.assertEqual(report['total_monthly_emi'], float(active['emi']))
+        self.assertEqual(sum(bucket['customers'] for bucket in report['credit_score']['histogram']), 44)
+        self.assertEqual(sum(report['credit_score']['slabs'].values()), 44)
+        self.assertEqual(
+            sum(vintage['loans'] for vintage in report['on_time_by_vintage']), Loan.objects.count()
+        )
+        self.assertEqual(
+            sum(bucket['customers'] for bucket in report['emi_to_income']['histogram']),
+            report['emi_to_income']['borrowers']
+        )
+
+        # Served from cache until it expires
+        with self.assertNumQueries(0):
+            self.client.get(reverse('portfolio_analytics'))
+
+
+class RescoreCustomersTests(TestCase):
+    def setUp(self):
+        seed_database(25, 200, seed=5)
+        self.checkpoint_path = os.path.join(tempfile.mkdtemp(), 'rescore.json')
+
+    def test_ranges_cover_every_customer_once(self):
+        ranges = customer_id_ranges(range_size=10)
+        self.assertEqual(len(ranges), 3)
+        self.assertIsNone(ranges[0][0])
+        self.assertIsNone(ranges[-1][1])
+        for (_, high), (low, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(high, low)
+
+    def test_scores_match_scalar_and_checkpoint_is_removed(self):
+        stats = rescore_customers(self.checkpoint_path, workers=1, range_size=7)
+        self.assertEqual(stats.scored, 25)
+        self.assertEqual(stats.completed, 4)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+        scores = dict(CustomerCreditScore.objects.values_list('customer_id', 'credit_score'))
+        for customer in Customer.objects.all():
+            with self.subTest(customer=customer.pk):
+                self.assertEqual(scores[customer.pk], calculate_credit_score(customer))
+        self.assertEqual(set(CustomerCreditScore.objects.values_list('scored_on', flat=True)), {date.today()})
+
+    def test_interrupted_run_resumes_pending_ranges(self):
+        run_day = date.today() - timedelta(days=1)
+        ranges = customer_id_ranges(range_size=10)
+        checkpoint = Checkpoint(self.checkpoint_path, run_day, ranges)
+        checkpoint.mark_done(ranges[0])  # the run was killed after its first range
+
+        stats = rescore_customers(self.checkpoint_path, workers=1, range_size=10)
+        self.assertEqual(stats.resumed, 1)
+        self.assertEqual(stats.completed, 2)
+        self.assertEqual(stats.scored, 15)
+        # The resumed run keeps scoring for the day it started on
+        self.assertEqual(CustomerCreditScore.objects.filter(scored_on=run_day).count(), 15)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_restart_ignores_checkpoint_and_overwrites_scores(self):
+        ranges = customer_id_ranges(range_size=10)
+        checkpoint = Checkpoint(self.checkpoint_path, date.today(), ranges)
+        checkpoint.mark_done(ranges[0])
+        CustomerCreditScore.objects.create(
+            customer=Customer.objects.order_by('pk').first(), credit_score=-1, scored_on=date(2000, 1, 1)
+        )
+
+        out = StringIO()
+        call_command('rescore_customers', workers=1, checkpoint=self.checkpoint_path, restart=True, stdout=out)
+        self.assertIn('Scored 25 customers', out.getvalue())
+        self.assertEqual(CustomerCreditScore.objects.count(), 25)
+        self.assertFalse(CustomerCreditScore.objects.filter(credit_score=-1).exists())
+
+    def test_resume_with_other_options_is_rejected(self):
+        ranges = customer_id_ranges(range_size=10)
+        checkpoint = Checkpoint(self.checkpoint_path, date.today(), ranges, incremental=True, range_size=10)
+        checkpoint.mark_done(ranges[0])
+
+        for options in ({'range_size': 10}, {'range_size': 7, 'incremental': True}):
+            with self.subTest(options=options), self.assertRaisesMessage(CommandError, '--restart'):
+                call_command('rescore_customers', workers=1, checkpoint=self.checkpoint_path, stdout=StringIO(), **options)
+        self.assertTrue(os.path.exists(self.checkpoint_path))  # left for a matching resume
+        self.assertFalse(CreditScoreSnapshot.objects.exists())
+
+    def test_rerun_on_the_same_day_keeps_one_snapshot_per_customer(self):
+        rescore_customers(self.checkpoint_path, workers=1, range_size=10)
+        rescore_customers(self.checkpoint_path, workers=1, range_size=7, restart=True)
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 25)
+        self.assertEqual(CreditScoreSnapshot.objects.filter(as_of=date.today()).count(), 25)
+
+
+class CreditScoreSnapshotTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        seed_database(20, 160, seed=11)
+        today = date.today()
+        self.customer = Customer.objects.create(
+            customer_id=8800, first_name="Snap", last_name="Shot", age=40, phone_number="9000000001",
+            monthly_salary=Decimal('90000'), approved_limit=Decimal('3200000')
+        )
+        self.expiry = today + timedelta(days=1)
+        for index, end_date in enumerate([self.expiry, today + timedelta(days=400), today - timedelta(days=30)]):
+            Loan.objects.create(
+                customer=self.customer, loan_id=880 + index, loan_amount=Decimal('150000.25'), tenure=12,
+                interest_rate=12.0, monthly_payment=Decimal('4000'), emis_paid_on_time=10,
+                date_of_approval=date(today.year - 1, 3, 1), end_date=end_date
+            )
+
+    def eligibility(self, customer_id):
+        return self.client.post(reverse('check_eligibility'), {
+            "customer_id": customer_id, "loan_amount": "100000", "interest_rate": 8, "tenure": 12
+        }, format='json')
+
+    def test_components_add_up_to_the_score(self):
+        snapshot_credit_scores()
+        for customer in Customer.objects.select_related('loan_summary'):
+            with self.subTest(customer=customer.pk):
+                snapshot = score_history(customer.pk).get()
+                stats = get_loan_stats([customer])[customer.pk]
+                components = credit_score_components(to_paise(customer.approved_limit), stats)
+                self.assertEqual(snapshot.credit_score, calculate_credit_score(customer))
+                self.assertEqual(snapshot.credit_score, score_from_components(components))
+                self.assertEqual(snapshot.on_time_factor, components['on_time_factor'])
+                self.assertEqual(snapshot.loan_count_factor, components['loan_count_factor'])
+                self.assertEqual(snapshot.current_year_factor, components['current_year_factor'])
+                self.assertEqual(snapshot.volume_factor, components['volume_factor'])
+                self.assertEqual(snapshot.limit_breached, components['limit_breached'])
+
+    def test_latest_score_is_valid_until_next_loan_expiry(self):
+        snapshot_credit_scores()
+        self.assertEqual(CustomerCreditScore.objects.get(customer=self.customer).valid_until, self.expiry)
+        self.assertFalse(stale_customer_ids().exists())
+        # After that loan ends, the running-principal check changes
+        self.assertEqual(list(stale_customer_ids(self.expiry + timedelta(days=1)).filter(pk=8800)), [8800])
+
+    def test_refresh_only_touches_changed_customers(self):
+        self.assertEqual(refresh_credit_scores(), 21)
+        self.assertEqual(refresh_credit_scores(), 0)
+
+        Loan.objects.create(
+            customer=self.customer, loan_id=889, loan_amount=Decimal('50000'), tenure=6,
+            interest_rate=12.0, monthly_payment=Decimal('8600'), emis_paid_on_time=0,
+            date_of_approval=date.today(), end_date=date.today() + timedelta(days=180)
+        )
+        self.assertEqual(list(stale_customer_ids()), [8800])
+        self.assertEqual(refresh_credit_scores(), 1)
+
+        # A same-day re-score overwrites the day's snapshot instead of adding one
+        history = list(score_history(8800))
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0].current_year_factor, 4)
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 21)
+
+    def test_eligibility_reads_the_latest_valid_snapshot(self):
+        snapshot_credit_scores()
+        CustomerCreditScore.objects.filter(customer=self.customer).update(credit_score=5)
+        response = self.eligibility(8800)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['approval'])  # the recorded score, not a recomputed one
+
+        # An expired snapshot is ignored and the score is computed from the loans again
+        cache.clear()
+        CustomerCreditScore.objects.filter(customer=self.customer).update(valid_until=date.today() - timedelta(days=1))
+        response = self.eligibility(8800)
+        self.assertTrue(response.data['approval'])
+
+    def test_limit_change_discards_latest_score(self):
+        snapshot_credit_scores()
+        self.customer.approved_limit = Decimal('100000')
+        self.customer.save()
+        self.assertFalse(CustomerCreditScore.objects.filter(customer=self.customer).exists())
+        self.assertEqual(score_history(8800).count(), 1)
+
+    def test_bulk_ingest_discards_latest_score(self):
+        # inject_data writes with bulk_create, which skips the signals that discard scores
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        customers_path = os.path.join(tmp.name, 'customers.csv')
+        loans_path = os.path.join(tmp.name, 'loans.csv')
+        pd.DataFrame({
+            'Customer ID': [8800], 'First Name': ['Snap'], 'Last Name': ['Shot'], 'Age': [40],
+            'Phone Number': [9000000001], 'Monthly Salary': [90000], 'Approved Limit': [100000],
+        }).to_csv(customers_path, index=False)
+        pd.DataFrame(columns=list(LOAN_COLUMNS)).to_csv(loans_path, index=False)
+
+        snapshot_credit_scores()
+        self.assertGreater(get_credit_profile(8800).credit_score, 0)
+        call_command('inject_data', '--customers', customers_path, '--loans', loans_path, stdout=StringIO())
+        self.assertFalse(CustomerCreditScore.objects.filter(customer=self.customer).exists())
+        self.assertEqual(get_credit_profile(8800).credit_score, 0)  # running principal is over the new limit
+
+        # Loans loaded for a customer discard their latest score too (no customer rows this time)
+        snapshot_credit_scores()
+        self.assertTrue(CustomerCreditScore.objects.filter(customer=self.customer).exists())
+        pd.DataFrame(columns=list(CUSTOMER_COLUMNS)).to_csv(customers_path, index=False)
+        today = date.today()
+        pd.DataFrame({
+            'Customer ID': [8800], 'Loan ID': [8899], 'Loan Amount': [1000], 'Tenure': [12],
+            'Interest Rate': [12.0], 'Monthly payment': [90], 'EMIs paid on Time': [0],
+            'Date of Approval': [today.isoformat()], 'End Date': [(today + timedelta(days=365)).isoformat()],
+        }).to_csv(loans_path, index=False)
+        call_command('inject_data', '--customers', customers_path, '--loans', loans_path, stdout=StringIO())
+        self.assertFalse(CustomerCreditScore.objects.filter(customer=self.customer).exists())
+
+
+@override_settings(ENFORCE_QUERY_BUDGETS=True)
+class QueryBudgetTests(APITestCase):
+    """
+    Runs every budgeted endpoint in its most expensive normal case (cold profile cache, stale
+    loan summaries) with budgets enforced: a change that adds queries to a view fails here.
+    """
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        seed_database(5, 40, seed=17)
+        CustomerLoanSummary.objects.all().delete()
+        allocate_id(Customer)  # id sequences exist in any running system
+        allocate_id(Loan)
+        self.customer_id = int(Customer.objects.order_by('pk').values_list('pk', flat=True).first())
+        self.loan_id = int(Loan.objects.filter(customer_id=self.customer_id).values_list('pk', flat=True).first())
+        self.application = {"customer_id": self.customer_id, "loan_amount": "1000", "interest_rate": 16, "tenure": 12}
+
+    def test_endpoints_stay_within_budget(self):
+        customer_ids = list(Customer.objects.values_list('pk', flat=True))
+        requests = [
+            ('register_customer', 'post', reverse('register_customer'), {
+                "first_name": "Budget", "last_name": "Check", "age": 30,
+                "monthly_income": 40000, "phone_number": "9000000002"
+            }),
+            ('register_customers_bulk', 'post', reverse('register_customers_bulk'), [
+                {"first_name": "Bulk", "last_name": str(index), "age": 30,
+                 "monthly_income": 40000 + index, "phone_number": "9000000002"} for index in range(20)
+            ]),
+            ('check_eligibility', 'post', reverse('check_eligibility'), self.application),
+            ('check_eligibility_batch', 'post', reverse('check_eligibility_batch'), [
+                dict(self.application, customer_id=int(customer_id)) for customer_id in customer_ids
+            ]),
+            ('loan_quotes', 'post', reverse('loan_quotes'), {
+                "customer_id": self.customer_id, "loan_amount": "1000", "tenures": [12, 24], "interest_rates": [12, 16]
+            }),
+            ('create_loan', 'post', reverse('create_loan'), self.application),
+            ('view_loan', 'get', reverse('view_loan', args=[self.loan_id]), None),
+            ('view_loans_by_customer', 'get', reverse('view_loans_by_customer', args=[self.customer_id]), None),
+            ('portfolio_analytics', 'get', reverse('portfolio_analytics'), None),
+            ('async_check_eligibility', 'post', reverse('async_check_eligibility'), self.application),
+            ('async_create_loan', 'post', reverse('async_create_loan'), self.application),
+            ('async_view_loan', 'get', reverse('async_view_loan', args=[self.loan_id]), None),
+            ('async_view_loans_by_customer', 'get',
+             reverse('async_view_loans_by_customer', args=[self.customer_id]), None),
+        ]
+        for view, method, url, payload in requests:
+            with self.subTest(view=view):
+                cache.clear()
+                CustomerLoanSummary.objects.all().delete()
+                if method == 'post':
+                    response = self.client.post(url, payload, format='json')
+                else:
+                    response = self.client.get(url)
+                self.assertLess(response.status_code, 300)
+                self.assertIn(view, registry.budgets)  # every endpoint declares one
+                # and it is exactly this worst case, so a view that sheds queries tightens it too
+                self.assertEqual(registry.views[view].queries, registry.budgets[view])
+
+    def test_going_over_budget_fails(self):
+        with mock.patch.object(CheckEligibilityAPIView, 'query_budget', 0):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'check_eligibility ran'):
+                self.client.post(reverse('check_eligibility'), self.application, format='json')
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse('view_loan', args=[self.loan_id]))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+$'
+        )
+
+        metrics = self.client.get(reverse('metrics'))
+        self.assertEqual(metrics.status_code, status.HTTP_200_OK)
+        self.assertTrue(metrics['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = metrics.content.decode()
+        self.assertIn('credit_approval_requests_total{view="view_loan",status="200"} 1', body)
+        self.assertIn('credit_approval_request_duration_seconds_count{view="view_loan"} 1', body)
+        self.assertIn('credit_approval_db_queries_total{view="view_loan"} 1', body)
+        self.assertIn('credit_approval_query_budget{view="view_loan"} 1', body)
+        self.assertNotIn('view="metrics"', body)
+
+    def test_metrics_only_answer_allowed_addresses(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SyntheticDataTests(TestCase):
+    def test_frames_are_reproducible_and_shaped_like_the_sheets(self):
+        customers = customer_frame(500, seed=4)
+        loans = loan_frame(customers['customer_id'], 1300, seed=4, today=date(2025, 6, 30))
+        pd.testing.assert_frame_equal(loans, loan_frame(customers['customer_id'], 1300, seed=4, today=date(2025, 6, 30)))
+        self.assertFalse(loans.equals(loan_frame(customers['customer_id'], 1300, seed=5, today=date(2025, 6, 30))))
+
+        self.assertTrue(customers['monthly_salary'].between(30000, 300000).all())
+        self.assertTrue((customers['approved_limit'] % 100000 == 0).all())
+        self.assertTrue((loans['loan_amount'] % 100000 == 0).all())
+        self.assertTrue((loans['tenure'] % 3 == 0).all())
+        self.assertTrue((loans['emis_paid_on_time'] <= loans['tenure']).all())
+        self.assertTrue((loans['end_date'] > loans['date_of_approval']).all())
+        self.assertTrue((loans['date_of_approval'] <= pd.Timestamp('2025-06-30')).all())
+        self.assertTrue(loans['customer_id'].isin(customers['customer_id']).all())
+
+    def test_written_dataset_loads_through_inject_data(self):
+        for file_format in ('csv', 'jsonl', 'parquet'):
+            with self.subTest(file_format=file_format), tempfile.TemporaryDirectory() as directory:
+                customer_path, loan_path = write_dataset(directory, 60, 25, file_format=file_format, chunk_size=20)
+                call_command('inject_data', customers=customer_path, loans=loan_path, stdout=StringIO())
+                self.assertEqual(Customer.objects.count(), 25)
+                self.assertEqual(Loan.objects.count(), 60)
+                loan = Loan.objects.get(pk=1)
+                expected = loan_frame(np.arange(1, 26), 20, seed=0).iloc[0]
+                self.assertEqual(loan.tenure, expected['tenure'])
+                self.assertEqual(loan.end_date, expected['end_date'].date())
+                Loan.objects.all().delete()
+                Customer.objects.all().delete()
+
+
+class RequestReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_database(10, 30, seed=21)
+        # Keep the test's connection open across the replayed requests, like the test client
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def test_request_mix_is_reproducible(self):
+        mix = {'check-eligibility': 3, 'view-loans': 1}
+        requests = generate_request_mix(200, mix, seed=2)
+        self.assertEqual(requests, generate_request_mix(200, mix, seed=2))
+        self.assertEqual({request['name'] for request in requests}, set(mix))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mix.jsonl')
+            write_request_mix(path, requests)
+            self.assertEqual(load_request_mix(path), requests)
+        with self.assertRaises(ValueError):
+            parse_mix('check-eligibility=1,delete-everything=2')
+
+    def test_replay_reports_latency_and_queries_for_wsgi_and_asgi(self):
+        requests = generate_request_mix(30, {'check-eligibility': 2, 'create-loan': 1, 'view-loans': 1}, seed=3)
+        counts = {name: sum(request['name'] == name for request in requests) for name in ('check-eligibility', 'view-loans')}
+        for stats in (replay_wsgi(requests), replay_asgi(requests), replay_asgi(requests, async_endpoints=True)):
+            with self.subTest(app=stats.app):
+                summary = stats.summary()
+                self.assertEqual(summary['all']['requests'], 30)
+                self.assertEqual(summary['all']['errors'], 0)
+                self.assertEqual(summary['view-loans']['requests'], counts['view-loans'])
+                self.assertEqual(summary['view-loans']['queries_per_request'], 2)
+                self.assertGreater(summary['create-loan']['queries_per_request'], 0)
+                self.assertLessEqual(summary['all']['p50_ms'], summary['all']['p99_ms'])
+                self.assertIn('check-eligibility', stats.report())
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    def test_connections_persist_and_are_health_checked(self):
+        database = settings.DATABASES['default']
+        self.assertGreater(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', database.get('OPTIONS', {}))  # SQLite here; the pool is Postgres-only
+
+
+@mock.patch('core.routers.replica_aliases', return_value=['replica_1', 'replica_2'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def read_alias(self):
+        return self.router.db_for_read(Loan)
+
+    def test_reads_outside_replica_reads_use_the_primary(self, replicas):
+        self.assertIsNone(self.read_alias())
+        self.assertEqual(self.router.db_for_write(Loan), 'default')
+
+    def test_requests_are_spread_round_robin(self, replicas):
+        aliases = []
+        for _ in range(4):
+            with replica_reads() as alias:
+                aliases.append(alias)
+                self.assertEqual(self.read_alias(), alias)
+        self.assertEqual(sorted(aliases), ['replica_1', 'replica_1', 'replica_2', 'replica_2'])
+        self.assertNotEqual(aliases[0], aliases[1])
+        self.assertIsNone(self.read_alias())
+
+    def test_recently_written_rows_are_read_from_the_primary(self, replicas):
+        pin_to_primary(customer_ids=[7], loan_ids=[70])
+        with replica_reads(customer_ids=[7]) as alias:
+            self.assertIsNone(alias)
+            self.assertIsNone(self.read_alias())
+        with replica_reads(loan_ids=[70]) as alias:
+            self.assertIsNone(alias)
+        with replica_reads(customer_ids=[8], loan_ids=[80]) as alias:
+            self.assertIsNotNone(alias)
+
+    def test_writes_pin_the_customer_and_loan(self, replicas):
+        customer = Customer.objects.create(
+            customer_id=9601, first_name="Pin", last_name="Ned", age=30, phone_number="9000000601",
+            monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+        )
+        loan = Loan.objects.create(
+            loan_id=9602, customer=customer, loan_amount=Decimal('100000'), tenure=12, interest_rate=10.0,
+            monthly_payment=Decimal('8792'), emis_paid_on_time=0, date_of_approval=date.today(),
+            end_date=date.today() + timedelta(days=365)
+        )
+        with replica_reads(customer_ids=[customer.pk]) as alias:
+            self.assertIsNone(alias)
+        with replica_reads(loan_ids=[loan.pk]) as alias:
+            self.assertIsNone(alias)
+
+    def test_reads_in_a_transaction_use_the_primary(self, replicas):
+        with replica_reads() as alias, transaction.atomic():
+            self.assertIsNotNone(alias)
+            self.assertIsNone(self.read_alias())
+
+    def test_summary_rebuilds_read_from_the_primary(self, replicas):
+        customer = Customer.objects.create(
+            customer_id=9603, first_name="Re", last_name="Build", age=30, phone_number="9000000603",
+            monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+        )
+        Loan.objects.create(
+            loan_id=9604, customer=customer, loan_amount=Decimal('100000'), tenure=12, interest_rate=10.0,
+            monthly_payment=Decimal('8792'), emis_paid_on_time=0, date_of_approval=date.today(),
+            end_date=date.today() + timedelta(days=365)
+        )
+        CustomerLoanSummary.objects.filter(customer=customer).delete()
+        customer = Customer.objects.select_related('loan_summary').get(pk=customer.pk)
+        cache.clear()  # drop the write pins so the block gets a replica
+
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            routed.append(alias)
+            return alias
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record), replica_reads() as alias:
+            self.assertIsNotNone(alias)
+            stats = get_loan_stats([customer])[customer.pk]
+        # The rebuild's aggregate was read from the primary it writes the summary to
+        self.assertTrue(routed)
+        self.assertEqual(set(routed), {None})
+        self.assertEqual(stats['sum_current_loans'], to_paise(Decimal('100000')))
+        self.assertEqual(CustomerLoanSummary.objects.get(customer=customer).active_principal_paise, 10000000)
+
+    def test_no_replicas_configured(self, replicas):
+        replicas.return_value = []
+        pin_to_primary(customer_ids=[7])
+        self.assertIsNone(cache.get('primary-pin:customer:7'))
+        with replica_reads(customer_ids=[7]) as alias:
+            self.assertIsNone(alias)
+
+
+class IdAllocatorTests(TestCase):
+    def setUp(self):
+        reset_id_blocks()
+        self.addCleanup(reset_id_blocks)
+
+    def test_ids_come_from_a_process_local_block(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = allocate_id(Customer)
+        with self.assertNumQueries(0):
+            following = [allocate_id(Customer) for _ in range(ID_BLOCK_SIZE - 1)]
+        self.assertEqual(following, list(range(first + 1, first + ID_BLOCK_SIZE)))
+        self.assertEqual(allocate_id(Customer), first + ID_BLOCK_SIZE)
+
+    def test_block_of_rolled_back_reservation_is_not_reused(self):
+        first = allocate_id(Loan)  # on_commit never runs inside the test transaction
+        self.assertEqual(allocate_id(Loan), first + ID_BLOCK_SIZE)
+
+    def test_registration_bulk_and_imported_ids_never_collide(self):
+        seeded = seed_database(3, 6, seed=9)
+        response = self.client.post(reverse('register_customer'), {
+            "first_name": "Ada", "last_name": "Byron", "age": 36, "monthly_income": 50000, "phone_number": "9000000003"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsInstance(response.data['customer_id'], int)
+        self.assertGreater(response.data['customer_id'], max(seeded))
+
+        with tempfile.TemporaryDirectory() as directory:
+            customer_path, loan_path = write_dataset(directory, 10, 500, file_format='csv')
+            call_command('inject_data', customers=customer_path, loans=loan_path, stdout=StringIO())
+        reset_id_blocks()
+        self.assertEqual(allocate_id(Customer), 501)
+        self.assertEqual(allocate_id(Loan), 11)
+
+
+    def test_archived_loan_ids_are_never_reissued(self):
+        customer = Customer.objects.create(
+            customer_id=9010, first_name="Arc", last_name="Hive", age=30, phone_number="9000000010",
+            monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+        )
+        for loan_id, approved, end_date in ((1, date.today(), date.today() + timedelta(days=365)),
+                                            (2, date(2019, 1, 1), date(2020, 1, 1))):
+            Loan.objects.create(
+                loan_id=loan_id, customer=customer, loan_amount=Decimal('1000'), tenure=12, interest_rate=10.0,
+                monthly_payment=Decimal('90'), emis_paid_on_time=12, date_of_approval=approved, end_date=end_date
+            )
+        self.assertEqual(archive_loans(after_days=30), 1)
+        IdSequence.objects.all().delete()
+        self.assertEqual(allocate_id(Loan), 3)
+
+        # Imports after archiving put a missing sequence row past the archived ids too
+        IdSequence.objects.all().delete()
+        reset_id_blocks()
+        advance_sequence(Loan)
+        self.assertEqual(IdSequence.objects.get(name='core.loan').next_value, 3)
+
+
+class BulkRegistrationTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('register_customers_bulk')
+        self.items = [
+            {"first_name": "Ada", "last_name": "Lovelace", "age": 36, "monthly_income": 51234, "phone_number": "9000000001"},
+            {"first_name": "Alan", "last_name": "Turing", "monthly_income": "-", "phone_number": "9000000002"},
+            {"first_name": "Grace", "last_name": "Hopper", "age": None, "monthly_income": "48000.50", "phone_number": 9000000003},
+        ]
+
+    def test_results_match_single_registration_in_input_order(self):
+        response = self.client.post(self.url, self.items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        results = response.data
+        self.assertEqual(len(results), 3)
+        self.assertIn('monthly_income', results[1]['errors'])
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(CustomerLoanSummary.objects.count(), 2)
+
+        for item, result in ((self.items[0], results[0]), (self.items[2], results[2])):
+            single = self.client.post(reverse('register_customer'), item, format='json').data
+            self.assertEqual(
+                {key: value for key, value in result.items() if key != 'customer_id'},
+                {key: value for key, value in single.items() if key != 'customer_id'},
+            )
+            customer = Customer.objects.get(pk=result['customer_id'])
+            self.assertEqual(customer.approved_limit, round(36 * customer.monthly_salary, -5))
+        self.assertNotEqual(results[0]['customer_id'], results[2]['customer_id'])
+
+    def test_inserts_in_batched_transactions(self):
+        items = [dict(self.items[0], last_name=f"Lovelace{index}") for index in range(7)]
+        results = register_customers(items, batch_size=3)
+        self.assertEqual([customer.last_name for customer in results], [item['last_name'] for item in items])
+        self.assertEqual(len({customer.pk for customer in results}), 7)
+        self.assertEqual(CustomerLoanSummary.objects.filter(customer__in=results).count(), 7)
+        # Registered customers are scored from their summary row without a rebuild
+        cache.clear()
+        with self.assertNumQueries(1):
+            profile = get_credit_profile(results[-1].pk)
+        self.assertEqual(profile.stats['num_loans'], 0)
+
+    def test_requires_a_bounded_list(self):
+        response = self.client.post(self.url, self.items[0], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.object(BulkRegisterCustomersAPIView, 'max_batch_size', 2):
+            response = self.client.post(self.url, self.items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Customer.objects.exists())
+
+
+class LoanArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer_ids = seed_database(25, 120, seed=4)
+        self.today = date.today()
+
+    def scores(self):
+        customers = Customer.objects.select_related('loan_summary', 'archived_totals').order_by('pk')
+        return {
+            customer.pk: (calculate_credit_score(customer), calculate_credit_score(customer, customer.loans.all()))
+            for customer in customers
+        }
+
+    def snapshot(self):
+        snapshot_credit_scores(self.today)
+        return list(CreditScoreSnapshot.objects.order_by('pk').values(
+            'customer_id', 'credit_score', 'on_time_factor', 'loan_count_factor', 'current_year_factor',
+            'volume_factor', 'limit_breached',
+        ))
+
+    def test_scores_are_unchanged_by_archiving(self):
+        scores = self.scores()  # also builds the summary rows, which archiving leaves current
+        stats = aggregate_loan_stats_by_customer(self.customer_ids)
+        book = score_customers(today=self.today)
+        snapshots = self.snapshot()
+        report = portfolio_report(self.today)
+
+        archived = archive_loans(self.today, after_days=30, batch_size=7)
+        self.assertGreater(archived, 7)
+        self.assertEqual(LoanArchive.objects.count(), archived)
+        self.assertEqual(Loan.objects.count(), 120 - archived)
+        self.assertEqual(sum(CustomerArchivedTotals.objects.values_list('loan_count', flat=True)), archived)
+
+        self.assertEqual(self.scores(), scores)
+        rebuild_all_loan_summaries(self.today)
+        self.assertEqual(self.scores(), scores)
+        self.assertEqual(aggregate_loan_stats_by_customer(self.customer_ids), stats)
+        pd.testing.assert_frame_equal(score_customers(today=self.today), book)
+        self.assertEqual(self.snapshot(), snapshots)  # the same day's snapshots, rewritten in place
+        self.assertEqual(portfolio_report(self.today), report)
+
+    def test_only_loans_that_can_no_longer_change_a_score_are_archived(self):
+        customer = Customer.objects.get(pk=self.customer_ids[0])
+        loan_fields = dict(
+            customer=customer, loan_amount=Decimal('10000'), tenure=1, interest_rate=10.0,
+            monthly_payment=Decimal('10083.33'), emis_paid_on_time=1,
+        )
+        Loan.objects.create(loan_id=9801, date_of_approval=self.today - timedelta(days=2000),
+                            end_date=self.today - timedelta(days=10), **loan_fields)   # ended recently
+        Loan.objects.create(loan_id=9802, date_of_approval=date(self.today.year, 1, 1),
+                            end_date=date(self.today.year, 1, 1), **loan_fields)        # approved this year
+        Loan.objects.create(loan_id=9803, date_of_approval=self.today - timedelta(days=2000),
+                            end_date=self.today - timedelta(days=1900), **loan_fields)  # long over
+        archive_loans(self.today, after_days=30)
+        self.assertTrue(Loan.objects.filter(pk=9801).exists())
+        self.assertTrue(Loan.objects.filter(pk=9802).exists())
+        self.assertTrue(LoanArchive.objects.filter(pk=9803, archived_on=self.today).exists())
+        self.assertFalse(Loan.objects.filter(end_date__lt=date(self.today.year, 1, 1) - timedelta(days=30)).exists())
+        self.assertEqual(archive_loans(self.today, after_days=30), 0)
+
+    def test_archive_command(self):
+        out = StringIO()
+        call_command('archive_loans', after_days=30, stdout=out)
+        self.assertIn(f"Archived {LoanArchive.objects.count()} loans", out.getvalue())
+
+
+class PaiseMoneyTests(SimpleTestCase):
+    def test_conversions(self):
+        self.assertEqual(to_paise(Decimal('14122.04')), 1412204)
+        self.assertEqual(to_paise(8792.59), 879259)
+        self.assertEqual(to_paise('100000'), 10000000)
+        self.assertEqual(to_paise(5), 500)
+        self.assertEqual(to_paise(Decimal('0.125')), 12)  # banker's rounding, as DecimalField stores it
+        for value in ('0.10', '14122.04', '9999999999.99', '1800000'):
+            self.assertEqual(to_rupees(to_paise(Decimal(value))), float(Decimal(value)))
+
+    def test_results_identical_to_decimal_scoring(self):
+        rng = random.Random(7)
+        for index in range(5000):
+            customer, stats, (loan_amount, interest_rate, tenure) = random_case(rng)
+            if index % 2:
+                # EMI burden and running principal on, or one paisa either side of, the limits
+                salary, limit = to_paise(customer.monthly_salary), to_paise(customer.approved_limit)
+                stats.update(
+                    sum_current_emis=salary // 2 + rng.choice([-1, 0, 1]),
+                    sum_current_loans=limit + rng.choice([-1, 0, 1]),
+                    approved_volume=limit + rng.choice([-1, 0, 1]),
+                )
+            legacy = decimal_stats(stats)
+            with self.subTest(customer=customer.pk, stats=stats):
+                self.assertEqual(
+                    credit_score_from_stats(to_paise(customer.approved_limit), stats),
+                    decimal_credit_score(customer.approved_limit, legacy)
+                )
+                self.assertEqual(
+                    check_loan_eligibility(customer, stats, loan_amount, interest_rate, tenure),
+                    decimal_check_loan_eligibility(customer, legacy, loan_amount, interest_rate, tenure)
+                )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_scoring', iterations=1000, stdout=out)
+        self.assertIn('eligibility check', out.getvalue())
@@ -1,13 +1,29 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from .views import (
-    RegisterCustomerAPIView, CheckEligibilityAPIView,
-    CreateLoanAPIView, ViewLoanAPIView, ViewLoansByCustomerAPIView
+    RegisterCustomerAPIView, BulkRegisterCustomersAPIView, CheckEligibilityAPIView, BatchCheckEligibilityAPIView,
+    LoanQuoteAPIView,
+    CreateLoanAPIView, ViewLoanAPIView, ViewLoansByCustomerAPIView,
+    PortfolioAnalyticsAPIView
+)
+from .async_views import (
+    AsyncCheckEligibilityView, AsyncCreateLoanView, AsyncViewLoanView, AsyncViewLoansByCustomerView
 )
 #  my urls
 urlpatterns = [
     path('register', RegisterCustomerAPIView.as_view(), name='register_customer'),
+    path('register/bulk', BulkRegisterCustomersAPIView.as_view(), name='register_customers_bulk'),
     path('check-eligibility', CheckEligibilityAPIView.as_view(), name='check_eligibility'),
+    path('check-eligibility/batch', BatchCheckEligibilityAPIView.as_view(), name='check_eligibility_batch'),
+    path('loan-quotes', LoanQuoteAPIView.as_view(), name='loan_quotes'),
     path('create-loan', CreateLoanAPIView.as_view(), name='create_loan'),
     path('view-loan/<int:loan_id>', ViewLoanAPIView.as_view(), name='view_loan'),
     path('view-loans/<int:customer_id>', ViewLoansByCustomerAPIView.as_view(), name='view_loans_by_customer'),
+    path('analytics/portfolio', PortfolioAnalyticsAPIView.as_view(), name='portfolio_analytics'),
+
+    # Async (ASGI) twins, same payloads; csrf_exempt like DRF's APIView
+    path('async/check-eligibility', csrf_exempt(AsyncCheckEligibilityView.as_view()), name='async_check_eligibility'),
+    path('async/create-loan', csrf_exempt(AsyncCreateLoanView.as_view()), name='async_create_loan'),
+    path('async/view-loan/<int:loan_id>', AsyncViewLoanView.as_view(), name='async_view_loan'),
+    path('async/view-loans/<int:customer_id>', AsyncViewLoansByCustomerView.as_view(), name='async_view_loans_by_customer'),
 ]
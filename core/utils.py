@@ -1,7 +1,9 @@
 from django.db import models
-from datetime import datetime
-
+from datetime import date, datetime
 import math
+import numpy as np
+
+from .money import customer_paise, sum_paise
 
 def calculate_monthly_installment(principal, tenure_in_months, annual_interest_rate):
     # Calculates EMI using compound interest formula
@@ -13,31 +15,312 @@ def calculate_monthly_installment(principal, tenure_in_months, annual_interest_r
     emi = principal * r * (1 + r)**n / ((1 + r)**n - 1)
     return round(emi, 2)
 
-def calculate_credit_score(customer, loans_queryset):
-    # Calculates credit score based on various factors
+def round_to_paise(values):
+    # Vectorized round(x, 2) that agrees with Python's correctly rounded round()
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 2)
+    # np.round scales by 100 first, which can tip values sitting on a half-paisa tie
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    for index in np.flatnonzero(near_tie):
+        rounded.flat[index] = round(float(values.flat[index]), 2)
+    return rounded
 
-    sum_current_loans = loans_queryset.filter(end_date__gte=datetime.now().date()).aggregate(
-        total=models.Sum('loan_amount')
-    )['total'] or 0
+def calculate_monthly_installments(principals, tenures_in_months, annual_interest_rates):
+    # Vectorized calculate_monthly_installment, inputs broadcast against each other
+    principal = np.asarray(principals, dtype=float)
+    n = np.asarray(tenures_in_months, dtype=float)
+    annual_rate = np.asarray(annual_interest_rates, dtype=float)
 
-    if sum_current_loans > customer.approved_limit:
-        return 0  # Breaching approved limit results in score 0
+    r = annual_rate / 12 / 100
+    growth = (1 + r)**n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = round_to_paise(principal * r * growth / (growth - 1))
+        flat = principal / n  # zero interest EMIs are left unrounded, like the scalar version
+    return np.where(annual_rate == 0, flat, emi)
+
+def amortization_schedules(principals, tenures_in_months, annual_interest_rates):
+    # Month-by-month principal/interest split for many loans at once.
+    # Returns 2D arrays shaped (loans, longest tenure); months after a loan ends are zero.
+    principal, n, annual_rate = np.broadcast_arrays(
+        np.asarray(principals, dtype=float),
+        np.asarray(tenures_in_months, dtype=int),
+        np.asarray(annual_interest_rates, dtype=float),
+    )
+    principal, n, annual_rate = principal.ravel(), n.ravel(), annual_rate.ravel()
+    emi = calculate_monthly_installments(principal, n, annual_rate)
+    r = annual_rate / 12 / 100
+
+    months = np.arange(1, (n.max() if n.size else 0) + 1)
+    growth = (1 + r[:, None])**months  # (1 + r)^k for every loan and month
+
+    # Closed-form balance after k payments of the (rounded) EMI
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(r[:, None] == 0, months, (growth - 1) / r[:, None])
+    balance = principal[:, None] * growth - emi[:, None] * annuity
+    opening = np.hstack([principal[:, None], balance[:, :-1]])
+
+    interest = opening * r[:, None]
+    principal_paid = emi[:, None] - interest
+    active = months <= n[:, None]
+
+    # Last instalment clears whatever rounding left on the balance
+    last = months == n[:, None]
+    principal_paid = np.where(last, opening, principal_paid)
+    balance = np.where(last, 0.0, balance)
+
+    return {
+        'month': np.where(active, months, 0),
+        'installment': np.where(active, principal_paid + interest, 0.0),
+        'interest': np.where(active, interest, 0.0),
+        'principal': np.where(active, principal_paid, 0.0),
+        'balance': np.where(active, balance, 0.0),
+    }
+
+# Defaults used when a customer has no loans (SUM over zero rows is NULL).
+# Money stats are integer paise (see core.money).
+EMPTY_LOAN_STATS = {
+    'num_loans': 0,                          # Total number of loans ever taken
+    'total_emis': 0,                         # Sum of tenures across all loans
+    'total_onschedule_emis': 0,              # Sum of EMIs paid on time
+    'approved_volume': 0,                    # Sum of all loan amounts
+    'current_year_loans': 0,                 # Loans approved in the current year
+    'sum_current_loans': 0,                  # Principal of loans still running
+    'sum_current_emis': 0,                   # EMIs of loans still running
+}
 
-    num_loans = loans_queryset.count()
-    total_emis = loans_queryset.aggregate(total=models.Sum('tenure'))['total'] or 1
-    total_onschedule_emis = loans_queryset.aggregate(
-        total_on_time=models.Sum('emis_paid_on_time')
-    )['total_on_time'] or 0
-    paid_on_time_ratio = total_onschedule_emis / total_emis
+# Stats that archived loans still count towards, and their CustomerArchivedTotals field
+# (archived loans are neither running nor approved this year, see core.archive)
+ARCHIVED_LOAN_STATS = {
+    'num_loans': 'loan_count',
+    'total_emis': 'tenure_sum',
+    'total_onschedule_emis': 'on_time_emi_sum',
+    'approved_volume': 'total_volume_paise',
+}
 
-    current_year = datetime.now().year
-    current_year_loans = loans_queryset.filter(date_of_approval__year=current_year).count()
-    approved_volume = loans_queryset.aggregate(total=models.Sum('loan_amount'))['total'] or 0
+def approved_in_year(year, prefix=''):
+    # Plain date range instead of __year so the (customer, date_of_approval) index is usable
+    return models.Q(**{
+        f'{prefix}date_of_approval__gte': date(year, 1, 1), f'{prefix}date_of_approval__lt': date(year + 1, 1, 1)
+    })
+
+def loan_stats_aggregates(today=None, prefix=''):
+    # Conditional aggregates for every scoring input, usable with aggregate() or annotate().
+    # `prefix` is the path to the loans, e.g. 'loans__' when aggregating from Customer.
+    today = today or datetime.now().date()
+    active = models.Q(**{f'{prefix}end_date__gte': today})
+    return {
+        'num_loans': models.Count(f'{prefix}pk'),
+        'total_emis': models.Sum(f'{prefix}tenure'),
+        'total_onschedule_emis': models.Sum(f'{prefix}emis_paid_on_time'),
+        'approved_volume': sum_paise(f'{prefix}loan_amount'),
+        'current_year_loans': models.Count(f'{prefix}pk', filter=approved_in_year(today.year, prefix)),
+        'sum_current_loans': sum_paise(f'{prefix}loan_amount', filter=active),
+        'sum_current_emis': sum_paise(f'{prefix}monthly_payment', filter=active),
+    }
+
+def archived_totals_annotations():
+    # Each customer's archived totals as archived_<stat> columns, for customer-level queries
+    return {
+        f'archived_{key}': models.F(f'archived_totals__{field}') for key, field in ARCHIVED_LOAN_STATS.items()
+    }
+
+def normalize_loan_stats(row):
+    # Replaces NULL aggregates with their zero value and adds archived_<stat> columns, if any
+    stats = {key: row.get(key) or default for key, default in EMPTY_LOAN_STATS.items()}
+    for key in ARCHIVED_LOAN_STATS:
+        stats[key] += row.get(f'archived_{key}') or 0
+    return stats
+
+def customer_loan_stats(customer_ids, today=None, **extra_aggregates):
+    # Live loan aggregates plus archived totals per customer in one grouped statement, so an
+    # archive run committing in between can't make a loan count twice or not at all
+    from .models import Customer
+
+    return (
+        Customer.objects.filter(pk__in=customer_ids)
+        .values('pk')
+        .order_by()
+        .annotate(**archived_totals_annotations(), **loan_stats_aggregates(today, 'loans__'), **extra_aggregates)
+    )
+
+def aggregate_loan_stats(loans_queryset):
+    # Fetches all credit score inputs in one query
+    return normalize_loan_stats(loans_queryset.aggregate(**loan_stats_aggregates()))
+
+def add_archived_loan_stats(customer, stats):
+    # stats of the customer's live loans plus their archived totals (one query unless the
+    # customer was loaded with select_related('archived_totals'))
+    from .models import CustomerArchivedTotals
+
+    try:
+        totals = customer.archived_totals
+    except CustomerArchivedTotals.DoesNotExist:
+        return stats
+    return dict(stats, **{key: stats[key] + getattr(totals, field) for key, field in ARCHIVED_LOAN_STATS.items()})
+
+def credit_score_components(approved_limit_paise, stats):
+    # The five factors a credit score is made of, from pre-aggregated loan stats.
+    # The volume ratio divides rupee floats (paise / 100), as the vectorized version does.
+    total_emis = stats['total_emis'] or 1
+    paid_on_time_ratio = stats['total_onschedule_emis'] / total_emis
+    volume_ratio = (
+        (stats['approved_volume'] / 100) / (approved_limit_paise / 100) if approved_limit_paise else math.inf
+    )
+    return {
+        'on_time_factor': min(30, paid_on_time_ratio * 30),                     # Timely payment factor
+        'loan_count_factor': min(20, max(0, 20 - stats['num_loans'])),          # Fewer loans means better score
+        'current_year_factor': min(20, stats['current_year_loans'] * 4),        # Recent activity adds value
+        'volume_factor': min(30, max(0, 30 - volume_ratio * 30)),               # Volume used against the limit
+        'limit_breached': stats['sum_current_loans'] > approved_limit_paise,    # Running principal over the limit
+    }
+
+def score_from_components(components):
+    if components['limit_breached']:
+        return 0  # Breaching approved limit results in score 0
 
     score = 0
-    score += min(30, paid_on_time_ratio * 30)  # Timely payment factor
-    score += min(20, max(0, 20 - num_loans))  # Fewer loans means better score
-    score += min(20, current_year_loans * 4)  # Recent activity adds value
-    score += min(30, max(0, 30 - (float(approved_volume) / float(customer.approved_limit)) * 30))
+    score += components['on_time_factor']
+    score += components['loan_count_factor']
+    score += components['current_year_factor']
+    score += components['volume_factor']
 
     return int(min(100, score))
+
+def credit_score_from_stats(approved_limit_paise, stats):
+    # Scores a customer from pre-aggregated loan stats without touching the DB
+    return score_from_components(credit_score_components(approved_limit_paise, stats))
+
+def credit_score_components_from_stats(approved_limit_paise, stats):
+    # Vectorized credit_score_components over many customers, one array per factor.
+    # Money comes as integer paise like in the scalar version, and the float operations run
+    # in the same order, so results are identical.
+    approved_limit_paise = np.asarray(approved_limit_paise, dtype=np.int64)
+    num_loans = np.asarray(stats['num_loans'], dtype=np.int64)
+    total_emis = np.asarray(stats['total_emis'], dtype=np.int64)
+    total_emis = np.where(total_emis == 0, 1, total_emis)
+    paid_on_time_ratio = np.asarray(stats['total_onschedule_emis'], dtype=np.int64) / total_emis
+    current_year_loans = np.asarray(stats['current_year_loans'], dtype=np.int64)
+    volume_ratio = np.divide(
+        np.asarray(stats['approved_volume'], dtype=np.int64) / 100, approved_limit_paise / 100,
+        out=np.full(approved_limit_paise.shape, np.inf), where=approved_limit_paise != 0
+    )
+    return {
+        'on_time_factor': np.minimum(30, paid_on_time_ratio * 30),
+        'loan_count_factor': np.minimum(20, np.maximum(0, 20 - num_loans)),
+        'current_year_factor': np.minimum(20, current_year_loans * 4),
+        'volume_factor': np.minimum(30, np.maximum(0, 30 - volume_ratio * 30)),
+        'limit_breached': np.asarray(stats['sum_current_loans'], dtype=np.int64) > approved_limit_paise,
+    }
+
+def scores_from_components(components):
+    # Vectorized score_from_components, returning an int array
+    score = components['on_time_factor'] + components['loan_count_factor']
+    score = score + components['current_year_factor']
+    score = score + components['volume_factor']
+    return np.where(components['limit_breached'], 0, np.minimum(100, score)).astype(np.int64)
+
+def credit_scores_from_stats(approved_limit_paise, stats):
+    # Vectorized credit_score_from_stats over many customers, returning an int array
+    return scores_from_components(credit_score_components_from_stats(approved_limit_paise, stats))
+
+def calculate_credit_score(customer, loans_queryset=None, stats=None):
+    # Calculates credit score based on various factors.
+    # Reads the customer's loan summary row unless a loan queryset or stats are given;
+    # a queryset of live loans is combined with the customer's archived totals.
+    if stats is None:
+        if loans_queryset is None:
+            from .summaries import get_loan_stats
+            stats = get_loan_stats([customer])[customer.pk]
+        else:
+            stats = add_archived_loan_stats(customer, aggregate_loan_stats(loans_queryset))
+    return credit_score_from_stats(customer_paise(customer)[1], stats)
+
+def aggregate_loan_stats_by_customer(customer_ids, batch_size=900):
+    # Fetches scoring inputs for many customers (archived loans included) with one grouped
+    # query per batch
+    customer_ids = list(customer_ids)
+    stats_by_customer = {customer_id: dict(EMPTY_LOAN_STATS) for customer_id in customer_ids}
+    for start in range(0, len(customer_ids), batch_size):
+        for row in customer_loan_stats(customer_ids[start:start + batch_size]):
+            stats_by_customer[row['pk']] = normalize_loan_stats(row)
+    return stats_by_customer
+
+def apply_interest_slab(credit_score, interest_rate):
+    # Interest rate slab logic based on credit score, returns (approved, corrected_interest_rate)
+    if credit_score > 50:
+        return True, interest_rate
+    elif 30 < credit_score <= 50:
+        approved = interest_rate >= 12.0
+        return approved, 12.0 if not approved else interest_rate
+    elif 10 < credit_score <= 30:
+        approved = interest_rate >= 16.0
+        return approved, 16.0 if not approved else interest_rate
+    return False, interest_rate  # credit score too low
+
+def eligibility_decision(customer, stats, interest_rate, credit_score=None):
+    # Approval and corrected interest rate for one offered rate, returns (approval, corrected_interest_rate)
+    salary_paise, limit_paise = customer_paise(customer)
+    if credit_score is None:
+        credit_score = credit_score_from_stats(limit_paise, stats)
+
+    # Reject loan if EMI burden is too high: total EMIs currently being paid over half the salary
+    if stats['sum_current_emis'] * 2 > salary_paise:
+        return False, float(interest_rate)  # rate unchanged
+
+    approval, corrected_interest_rate = apply_interest_slab(credit_score, float(interest_rate))
+
+    # Ensure customer hasn't crossed approved loan limit
+    if stats['sum_current_loans'] > limit_paise:
+        approval = False
+    return approval, corrected_interest_rate
+
+def check_loan_eligibility(customer, stats, loan_amount, interest_rate, tenure, credit_score=None):
+    # Eligibility decision for one application, based on pre-aggregated loan stats
+    # (and a precomputed credit score, when the caller has one)
+    approval, corrected_interest_rate = eligibility_decision(customer, stats, interest_rate, credit_score)
+
+    # Calculate EMI based on corrected interest rate
+    emi = calculate_monthly_installment(float(loan_amount), int(tenure), corrected_interest_rate)
+
+    return {
+        "customer_id": customer.customer_id,
+        "approval": approval,
+        "interest_rate": float(interest_rate),
+        "corrected_interest_rate": corrected_interest_rate,
+        "tenure": tenure,
+        "monthly_installment": emi
+    }
+
+def quote_loan_grid(customer, stats, loan_amount, tenures, interest_rates, credit_score=None):
+    # Evaluates every tenure x rate combination with one credit score and one vectorized EMI pass
+    if credit_score is None:
+        credit_score = credit_score_from_stats(customer_paise(customer)[1], stats)
+
+    # The decision depends only on the offered rate, so it is computed once per column
+    decisions = [eligibility_decision(customer, stats, rate, credit_score) for rate in interest_rates]
+    corrected_rates = np.array([corrected for _, corrected in decisions], dtype=float)
+    emis = calculate_monthly_installments(
+        float(loan_amount), np.asarray(tenures, dtype=int)[:, None], corrected_rates[None, :]
+    ).tolist()
+
+    quotes = []
+    for row, tenure in enumerate(tenures):
+        quotes.append([
+            {
+                "tenure": tenure,
+                "interest_rate": float(rate),
+                "approval": approval,
+                "corrected_interest_rate": corrected,
+                "monthly_installment": emis[row][column]
+            }
+            for column, (rate, (approval, corrected)) in enumerate(zip(interest_rates, decisions))
+        ])
+
+    return {
+        "customer_id": customer.customer_id,
+        "loan_amount": float(loan_amount),
+        "tenures": list(tenures),
+        "interest_rates": [float(rate) for rate in interest_rates],
+        "quotes": quotes
+    }
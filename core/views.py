@@ -1,5 +1,7 @@
 # Imports for Django and DRF
 from django.shortcuts import render, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
 from datetime import datetime
 from django.db import models
 from rest_framework.views import APIView
@@ -15,12 +17,40 @@ from .models import Customer, Loan
 from .serializers import (
     CustomerRegisterSerializer, CustomerResponseSerializer,
     CheckEligibilitySerializer, CheckEligibilityResponseSerializer,
+    LoanQuoteSerializer, LoanQuoteResponseSerializer,
+    LoanPageSerializer,
     CreateLoanSerializer, CreateLoanResponseSerializer,
     LoanWithCustomerSerializer, LoanDetailSerializer
 )
 
 # Utility functions for credit score and EMI calculation
-from .utils import calculate_monthly_installment, calculate_credit_score
+from .utils import check_loan_eligibility, quote_loan_grid
+
+# Locked, transactional loan creation
+from .loans import create_loan
+
+# Batched bulk_create registration
+from .registration import register_customers
+
+# Keyset pages and JSON-lines streams of a customer's loans
+from .archive import live_or_archived
+from .pagination import STREAM_CONTENT_TYPE, loan_lines, loan_page, next_page_headers
+
+# Precompiled row serializers for the read-heavy endpoints
+from .fast_serializers import (
+    LOAN_DETAIL_FIELDS, row_etag, serialize_customer, serialize_loan_detail,
+    validate_create_loan, validate_eligibility, validate_register
+)
+from .renderers import FAST_RENDERERS
+
+# Read-replica routing for the read-only endpoints
+from .routers import replica_reads
+
+# Cached per-customer credit profiles
+from .profiles import get_credit_profile, get_credit_profiles
+
+# Book-level analytics computed in bulk with pandas/NumPy
+from .analytics import cached_portfolio_report
 
 # Swagger decorators for documentation
 from drf_yasg.utils import swagger_auto_schema
@@ -28,23 +58,74 @@ from drf_yasg.utils import swagger_auto_schema
 from decimal import Decimal
 
 
+def get_profile_or_404(customer_id):
+    # Credit profile lookup that 404s like get_object_or_404(Customer, ...)
+    profile = get_credit_profile(customer_id)
+    if profile is None:
+        raise Http404("No Customer matches the given query.")
+    return profile
+
+
 # ----------------------- Customer Registration API -----------------------
 class RegisterCustomerAPIView(APIView):
     """
     API to register a new customer in the system.
     """
 
+    # Worst case, the id block refill every ID_BLOCK_SIZE registrations: sequence lock and bump
+    # in a savepoint pair (4), then the customer insert and its empty summary row (2)
+    query_budget = 6
+    renderer_classes = FAST_RENDERERS
+
     @swagger_auto_schema(
         request_body=CustomerRegisterSerializer,
         responses={201: CustomerResponseSerializer}
     )
     def post(self, request):
-        serializer = CustomerRegisterSerializer(data=request.data)
-        if serializer.is_valid():
-            customer = serializer.save()
-            response_serializer = CustomerResponseSerializer(customer)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data, errors = validate_register(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        customer = CustomerRegisterSerializer().create(data.as_dict())
+        return Response(serialize_customer(customer), status=status.HTTP_201_CREATED)
+
+
+# ----------------------- Bulk Customer Registration API -----------------------
+class BulkRegisterCustomersAPIView(APIView):
+    """
+    API to register many customers in one request (partner portfolio onboarding).
+    Each item is validated like a single registration; valid ones are inserted with
+    bulk_create in batched transactions. Results keep input order: the registered
+    customer, or that item's errors.
+    """
+
+    # Up to 2000 customers: id range reservation (sequence lock and bump in a savepoint pair, 4),
+    # then one batch transaction inserting the customers and their summary rows (2 + savepoint pair)
+    query_budget = 8
+    max_batch_size = 50000
+    renderer_classes = FAST_RENDERERS
+
+    @swagger_auto_schema(
+        request_body=CustomerRegisterSerializer(many=True),
+        responses={201: CustomerResponseSerializer(many=True)}
+    )
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"non_field_errors": [f'Expected a list of items but got type "{type(items).__name__}".']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {"non_field_errors": [f"Ensure this list has no more than {self.max_batch_size} items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [
+            serialize_customer(result) if isinstance(result, Customer) else {"errors": result}
+            for result in register_customers(items)
+        ]
+        return Response(results, status=status.HTTP_201_CREATED)
 
 
 # ----------------------- Check Loan Eligibility API -----------------------
@@ -54,77 +135,119 @@ class CheckEligibilityAPIView(APIView):
     Based on credit score, salary vs EMI burden, and interest rate slabs.
     """
 
+    # Cold cache, stale summary: customer with its summary row (1), then the rebuild: lock,
+    # aggregate and upsert in a savepoint pair (3 + 2)
+    query_budget = 6
+    renderer_classes = FAST_RENDERERS
+
     @swagger_auto_schema(
         request_body=CheckEligibilitySerializer,
         responses={201: CheckEligibilityResponseSerializer}
     )
     def post(self, request):
-        serializer = CheckEligibilitySerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data, errors = validate_eligibility(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
-        data = serializer.validated_data
-        customer = get_object_or_404(Customer, customer_id=data['customer_id'])
-        loans = Loan.objects.filter(customer=customer)
-
-        # Calculate credit score
-        credit_score = calculate_credit_score(customer, loans)
-
-        # Check active loans only
-        active_loans = loans.filter(end_date__gte=datetime.now().date())
-
-        # Calculate total EMIs currently being paid
-        sum_emis = sum([float(loan.monthly_payment) for loan in active_loans]) or 0.0
-        monthly_salary = float(customer.monthly_salary)
-
-        # Reject loan if EMI burden is too high
-        if sum_emis > monthly_salary * 0.5:
-            approval = False
-            corrected_interest_rate = float(data['interest_rate'])  # unchanged
-        else:
-            interest_rate = float(data['interest_rate'])
-            approved = False
-            corrected_interest_rate = interest_rate
-
-            # Interest rate slab logic based on credit score
-            if credit_score > 50:
-                approved = True
-            elif 30 < credit_score <= 50:
-                approved = interest_rate >= 12.0
-                corrected_interest_rate = 12.0 if not approved else interest_rate
-            elif 10 < credit_score <= 30:
-                approved = interest_rate >= 16.0
-                corrected_interest_rate = 16.0 if not approved else interest_rate
+        # Customer row and every scoring input, served from cache for repeat checks
+        with replica_reads(customer_ids=[data.customer_id]):
+            profile = get_profile_or_404(data.customer_id)
+
+        response_data = check_loan_eligibility(
+            profile.customer, profile.stats, data.loan_amount, data.interest_rate, data.tenure,
+            profile.credit_score
+        )
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+# ----------------------- Batch Check Loan Eligibility API -----------------------
+class BatchCheckEligibilityAPIView(APIView):
+    """
+    API to check eligibility for many applications in one request.
+    Customers and their loan stats are loaded with a fixed number of set-based
+    queries and every application is scored in memory. Results keep input order;
+    invalid items carry their own errors instead of failing the whole batch.
+    """
+
+    # Up to 900 customers, all with stale summaries: customers with their summary rows (1), then
+    # one rebuild batch: lock, aggregate and upsert in a savepoint pair (3 + 2)
+    query_budget = 6
+    max_batch_size = 10000
+    renderer_classes = FAST_RENDERERS
+
+    @swagger_auto_schema(
+        request_body=CheckEligibilitySerializer(many=True),
+        responses={200: CheckEligibilityResponseSerializer(many=True)}
+    )
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"non_field_errors": [f'Expected a list of items but got type "{type(items).__name__}".']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.max_batch_size:
+            return Response(
+                {"non_field_errors": [f"Ensure this list has no more than {self.max_batch_size} items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate every item on its own so one bad payload doesn't reject the batch
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            data, errors = validate_eligibility(item)
+            if errors:
+                results[index] = {"errors": errors}
             else:
-                approved = False  # credit score too low
+                valid.append((index, data))
+
+        # Set-based loading: cached profiles first, then one customer query and
+        # one grouped aggregate per id batch for the misses
+        to_pk = Customer._meta.pk.to_python
+        customer_ids = [data.customer_id for _, data in valid]
+        with replica_reads(customer_ids=customer_ids):
+            profiles = get_credit_profiles(customer_ids)
+
+        for index, data in valid:
+            profile = profiles.get(to_pk(data.customer_id))
+            if profile is None:
+                results[index] = {"errors": {"customer_id": ["Customer not found."]}}
+                continue
+            results[index] = check_loan_eligibility(
+                profile.customer, profile.stats, data.loan_amount, data.interest_rate, data.tenure,
+                profile.credit_score
+            )
 
-            # Ensure customer hasn't crossed approved loan limit
-            sum_current_loans = loans.filter(end_date__gte=datetime.now().date()).aggregate(
-                total=models.Sum('loan_amount')
-            )['total'] or Decimal(0)
+        return Response(results, status=status.HTTP_200_OK)
 
-            if float(sum_current_loans) > float(customer.approved_limit):
-                approved = False
-                credit_score = 0
 
-            approval = approved
+# ----------------------- Loan Quote Grid API -----------------------
+class LoanQuoteAPIView(APIView):
+    """
+    API to quote approval, corrected rate and EMI over a grid of tenures x interest rates.
+    The credit score and EMI burden are computed once for the whole grid.
+    """
 
-        # Calculate EMI based on corrected interest rate
-        emi = calculate_monthly_installment(
-            float(data['loan_amount']),
-            int(data['tenure']),
-            corrected_interest_rate
-        )
+    query_budget = 6  # same as CheckEligibilityAPIView
 
-        response_data = {
-            "customer_id": customer.customer_id,
-            "approval": approval,
-            "interest_rate": float(data['interest_rate']),
-            "corrected_interest_rate": corrected_interest_rate,
-            "tenure": data['tenure'],
-            "monthly_installment": emi
-        }
+    @swagger_auto_schema(
+        request_body=LoanQuoteSerializer,
+        responses={200: LoanQuoteResponseSerializer}
+    )
+    def post(self, request):
+        serializer = LoanQuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        data = serializer.validated_data
+        with replica_reads(customer_ids=[data['customer_id']]):
+            profile = get_profile_or_404(data['customer_id'])
+
+        response_data = quote_loan_grid(
+            profile.customer, profile.stats, data['loan_amount'], data['tenures'], data['interest_rates'],
+            profile.credit_score
+        )
         return Response(response_data, status=status.HTTP_200_OK)
 
 
@@ -133,117 +256,60 @@ class CreateLoanAPIView(APIView):
     """
     API to create a new loan for a customer if eligible.
     Checks EMI burden and interest rate slab based on credit score.
+    The check and insert run under a per-customer row lock (see core.loans.create_loan).
     """
 
+    # Worst case, id block refill and stale summary: sequence lock and bump in a savepoint pair
+    # (4); then one transaction (savepoint pair, 2) holding the customer lock (1) to read the
+    # summary row (1), rebuild it (aggregate and upsert, 2), insert the loan (1), fold it into the
+    # summary (1) and drop the latest score (1)
+    query_budget = 13
+    renderer_classes = FAST_RENDERERS
+
     @swagger_auto_schema(
         request_body=CreateLoanSerializer,
         responses={201: CreateLoanResponseSerializer}
     )
     def post(self, request):
-        serializer = CreateLoanSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data, errors = validate_create_loan(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
-        data = serializer.validated_data
-        customer = get_object_or_404(Customer, customer_id=data['customer_id'])
-        loans = Loan.objects.filter(customer=customer)
-
-        # Recheck eligibility logic
-        credit_score = calculate_credit_score(customer, loans)
-        active_loans = loans.filter(end_date__gte=datetime.now().date())
-
-        sum_emis = sum([loan.monthly_payment for loan in active_loans]) or Decimal(0)
-        monthly_salary = customer.monthly_salary
-
-        # EMI burden check
-        if sum_emis > monthly_salary * Decimal('0.5'):
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.customer_id,
-                "loan_approved": False,
-                "message": "Total EMIs exceed 50% of monthly salary.",
-                "monthly_installment": 0
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Interest rate check based on credit score
-        interest_rate = data['interest_rate']
-        approved = False
-        corrected_interest_rate = interest_rate
-
-        if credit_score > 50:
-            approved = True
-        elif 30 < credit_score <= 50:
-            approved = interest_rate >= 12.0
-            corrected_interest_rate = 12.0 if not approved else interest_rate
-        elif 10 < credit_score <= 30:
-            approved = interest_rate >= 16.0
-            corrected_interest_rate = 16.0 if not approved else interest_rate
-        else:
-            approved = False
-
-        # Approved limit check
-        sum_current_loans = active_loans.aggregate(total=models.Sum('loan_amount'))['total'] or 0
-        if sum_current_loans + data['loan_amount'] > customer.approved_limit:
-            approved = False
-
-        # Calculate EMI
-        emi = calculate_monthly_installment(data['loan_amount'], data['tenure'], corrected_interest_rate)
-
-        if approved:
-            # Create loan in DB
-            loan = Loan.objects.create(
-                customer=customer,
-                loan_amount=data['loan_amount'],
-                tenure=data['tenure'],
-                interest_rate=corrected_interest_rate,
-                monthly_payment=emi
+        try:
+            response_data, response_status = create_loan(
+                data.customer_id, data.loan_amount, data.interest_rate, data.tenure
             )
-            response_data = {
-                "loan_id": loan.loan_id,
-                "customer_id": customer.customer_id,
-                "loan_approved": True,
-                "message": "Loan approved successfully.",
-                "monthly_installment": emi
-            }
-            return Response(response_data, status=status.HTTP_201_CREATED)
-        else:
-            # Loan not approved
-            response_data = {
-                "loan_id": None,
-                "customer_id": customer.customer_id,
-                "loan_approved": False,
-                "message": "Loan not approved due to credit rating or limits.",
-                "monthly_installment": emi
-            }
-            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except Customer.DoesNotExist:
+            raise Http404("No Customer matches the given query.")
+        return Response(response_data, status=response_status)
 
 
 # ----------------------- View Loan By Loan ID API -----------------------
 class ViewLoanAPIView(APIView):
     """
-    API to fetch a specific loan with customer details by loan ID.
+    API to fetch a specific loan with customer details by loan ID, archived loans included.
+    Loan and customer come from one joined values() query (live and archived tables in a
+    UNION) and are rendered by a precompiled serializer. Responses carry an ETag, and a
+    matching If-None-Match gets a 304 without the body being built.
     """
 
+    query_budget = 1  # the joined loan and customer query
+
     @swagger_auto_schema(
         responses={201: LoanDetailSerializer}
     )
     def get(self, request, loan_id):
-        loan = get_object_or_404(Loan, loan_id=loan_id)
-        loan_data = {
-            "loan_id": loan.loan_id,
-            "customer": {
-                "id": loan.customer.customer_id,
-                "first_name": loan.customer.first_name,
-                "last_name": loan.customer.last_name,
-                "phone_number": loan.customer.phone_number,
-                "age": loan.customer.age,
-            },
-            "loan_amount": float(loan.loan_amount),
-            "interest_rate": loan.interest_rate,
-            "monthly_installment": float(loan.monthly_payment),
-            "tenure": loan.tenure,
-        }
-        return Response(loan_data, status=status.HTTP_200_OK)
+        loan = models.Q(loan_id=loan_id)
+        with replica_reads(loan_ids=[loan_id]):
+            row = next(iter(live_or_archived(LOAN_DETAIL_FIELDS, loan, loan)[:1]), None)
+        if row is None:
+            raise Http404("No Loan matches the given query.")
+
+        etag = quote_etag(row_etag(row))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return Response(serialize_loan_detail(row), status=status.HTTP_200_OK, headers={"ETag": etag})
 
 
 # ----------------------- View All Loans for a Customer API -----------------------
@@ -251,25 +317,47 @@ class ViewLoansByCustomerAPIView(APIView):
     """
     API to fetch all loans taken by a customer.
     Includes info like repayments left and EMI details.
+    Live loans come first, then archived ones, each in loan_id order.
+    Keyset-paginated on loan_id: the list body holds at most `limit` loans and the next page
+    is linked from the Link / X-Next-Cursor headers. `?stream=1` streams every remaining loan
+    as JSON lines instead, with flat memory however many loans the customer has.
     """
 
+    query_budget = 2  # customer check + one page
+
     @swagger_auto_schema(
+        query_serializer=LoanPageSerializer,
         responses={201: LoanWithCustomerSerializer}
     )
     def get(self, request, customer_id):
-        customer = get_object_or_404(Customer, customer_id=customer_id)
-        loans = Loan.objects.filter(customer=customer)
-
-        results = []
-        for loan in loans:
-            # Estimate repayments left
-            repayments_left = max(0, loan.tenure - loan.emis_paid_on_time)
-            results.append({
-                "loan_id": loan.loan_id,
-                "loan_amount": float(loan.loan_amount),
-                "interest_rate": loan.interest_rate,
-                "monthly_installment": float(loan.monthly_payment),
-                "repayments_left": repayments_left
-            })
+        params = LoanPageSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        cursor = params.validated_data.get('cursor')
+        with replica_reads(customer_ids=[customer_id]) as using:
+            if not Customer.objects.filter(customer_id=customer_id).exists():
+                raise Http404("No Customer matches the given query.")
 
-        return Response(results, status=status.HTTP_200_OK)
+            if params.validated_data['stream']:
+                return StreamingHttpResponse(
+                    loan_lines(customer_id, cursor, using), content_type=STREAM_CONTENT_TYPE
+                )
+
+            results, next_cursor = loan_page(customer_id, cursor, params.validated_data['limit'])
+        return Response(results, status=status.HTTP_200_OK, headers=next_page_headers(request, next_cursor))
+
+
+# ----------------------- Portfolio Analytics API -----------------------
+class PortfolioAnalyticsAPIView(APIView):
+    """
+    API to fetch portfolio-level numbers: total outstanding, EMI-to-income distribution,
+    credit score histogram and on-time repayment ratio by vintage year.
+    Every customer is scored in bulk from three queries; the report is cached for a few minutes.
+    """
+
+    query_budget = 5  # uncached: customers, loans, archived totals, live and archived vintages
+
+    def get(self, request):
+        with replica_reads():
+            report = cached_portfolio_report()
+        return Response(report, status=status.HTTP_200_OK)
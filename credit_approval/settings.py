@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 
 # Middleware stack for request/response processing
 MIDDLEWARE = [
+    'core.instrumentation.PerformanceMiddleware',  # First, so its wall time covers the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,11 +71,72 @@ TEMPLATES = [
 # WSGI entry point for production servers
 WSGI_APPLICATION = 'credit_approval.wsgi.application'
 
-# PostgreSQL database configuration pulled from environment
+# PostgreSQL database configuration pulled from environment.
+# Connections are kept open between requests for SAI_DB_CONN_MAX_AGE seconds (0 opens one per
+# request) and checked before reuse, so a worker doesn't pay the connect/TLS/auth round trips
+# on every call.
 DATABASES = {
-    'default': dj_database_url.parse(os.getenv('SAI_DB'))
+    'default': dj_database_url.parse(
+        os.getenv('SAI_DB'),
+        conn_max_age=int(os.getenv('SAI_DB_CONN_MAX_AGE', '600')),
+        conn_health_checks=True,
+    )
 }
 
+# Optional read replicas (comma-separated URLs) for the read-only endpoints, used round-robin
+# (see core.routers). Tests read them from the primary's test database.
+for index, url in enumerate(filter(None, os.getenv('SAI_DB_REPLICA', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = dict(
+        dj_database_url.parse(url, conn_max_age=DATABASES['default']['CONN_MAX_AGE'], conn_health_checks=True),
+        TEST={'MIRROR': 'default'},
+    )
+
+# Native psycopg 3 connection pool (Postgres only), one per database per worker process,
+# instead of persistent connections: use it under ASGI, where requests don't keep to one
+# thread. Size it so workers x SAI_DB_POOL_MAX_SIZE stays below Postgres' max_connections.
+if os.getenv('SAI_DB_POOL', 'False') == 'True':
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database['CONN_MAX_AGE'] = 0  # Django requires it with a pool
+            database.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.getenv('SAI_DB_POOL_MIN_SIZE', '1')),
+                'max_size': int(os.getenv('SAI_DB_POOL_MAX_SIZE', '4')),
+                'timeout': float(os.getenv('SAI_DB_POOL_TIMEOUT', '10')),  # Seconds to wait for a free connection
+            }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds reads of a just-written customer or loan stay on the primary; keep it above replica lag
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
+# Cache backend: local memory by default, Redis when SAI_CACHE_URL is set
+if os.getenv('SAI_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('SAI_CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Upper bound (seconds) for cached credit profiles; entries also expire at midnight
+CREDIT_PROFILE_CACHE_TIMEOUT = int(os.getenv('CREDIT_PROFILE_CACHE_TIMEOUT', '3600'))
+
+# Days after end_date before archive_loans moves a loan out of the hot Loan table
+LOAN_ARCHIVE_AFTER_DAYS = int(os.getenv('LOAN_ARCHIVE_AFTER_DAYS', '365'))
+
+# Addresses allowed to scrape the Prometheus metrics on /metrics ('*' for any)
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Raise when a view runs more DB queries than its declared query_budget (on in the test suite)
+ENFORCE_QUERY_BUDGETS = os.getenv('ENFORCE_QUERY_BUDGETS', 'False') == 'True'
+
 # Validators for password strength and user safety
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -4,6 +4,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 from core.views import landing_page
+from core.instrumentation import metrics_view
 
 # Configure API schema view for Swagger and ReDoc
 schema_view = get_schema_view(
@@ -24,6 +25,7 @@ urlpatterns = [
      path('', landing_page, name='landing'),
     path('admin/', admin.site.urls),                               # Django admin interface
     path('api/', include('core.urls')),                            # Core app API endpoints
+    path('metrics', metrics_view, name='metrics'),                 # Prometheus metrics (local scrapers)
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),  # Raw Swagger schema
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),                 # Swagger UI docs
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),                         # ReDoc UI docs